@@ -0,0 +1,224 @@
+"""
+Validación y benchmark del simulador de trades del backtest
+
+Compara simulate_trades (núcleo NumPy) con el bucle vela a vela original
+sobre los CSV de data/, usando probabilidades sintéticas (no requiere
+modelo), y mide el tiempo de ambos. Los trades, la equity y las métricas
+(calculate_metrics frente a la versión original con bucle) deben coincidir
+exactamente: si no, termina con AssertionError (código != 0).
+
+Uso:
+    python benchmark_backtest.py
+    python benchmark_backtest.py --files ETH_USDT_4h.csv BTC_USDT_4h.csv --seed 7
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+
+from neural_bot.backtest import NeuralBacktest
+from neural_bot.config import config
+from neural_bot.simulator import simulate_trades
+
+
+def reference_simulation(df, probs, capital_per_pair, symbol=None):
+    """Bucle vela a vela con df.iloc de NeuralBacktest.backtest_symbol (versión original)"""
+    capital = capital_per_pair
+    position = None
+    trades = []
+    equity_curve = []
+
+    for i in range(len(probs)):
+        current_time = df.iloc[i]['timestamp']
+        current_price = df.iloc[i]['close']
+
+        predicted_class = np.argmax(probs[i])
+        confidence = probs[i][predicted_class]
+
+        signal = config.CLASS_LABELS[predicted_class]
+        if signal == 'BUY' and confidence < config.MIN_CONFIDENCE_BUY:
+            signal = 'HOLD'
+        elif signal == 'SELL' and confidence < config.MIN_CONFIDENCE_SELL:
+            signal = 'HOLD'
+
+        if position is None:
+            if signal == 'BUY':
+                if config.USE_COMPOUNDING:
+                    position_size = min(capital, config.MAX_POSITION_SIZE)
+                else:
+                    position_size = capital_per_pair
+
+                position = {
+                    'entry_price': current_price,
+                    'size': position_size / current_price,
+                    'invested_capital': position_size,
+                    'entry_time': current_time,
+                    'confidence': confidence,
+                    'highest_price': current_price
+                }
+        else:
+            position['highest_price'] = max(position['highest_price'], current_price)
+            pnl_pct = (current_price - position['entry_price']) / position['entry_price']
+            trailing_drawdown = (position['highest_price'] - current_price) / position['highest_price']
+
+            exit_reason = None
+            if pnl_pct >= config.TAKE_PROFIT_PCT:
+                exit_reason = 'Take Profit'
+            elif signal == 'SELL':
+                exit_reason = 'Señal SELL'
+            elif pnl_pct <= config.STOP_LOSS_PCT:
+                exit_reason = 'Stop Loss'
+            elif pnl_pct > config.TRAILING_ACTIVATION_PCT and trailing_drawdown >= config.TRAILING_STOP_PCT:
+                exit_reason = 'Trailing Stop'
+
+            if exit_reason:
+                exit_value = position['size'] * current_price
+                invested = position['invested_capital']
+                total_fees = invested * config.TRADING_FEE + exit_value * config.TRADING_FEE
+                profit = exit_value - invested - total_fees
+
+                trades.append({
+                    'symbol': symbol,
+                    'entry_time': position['entry_time'],
+                    'exit_time': current_time,
+                    'entry_price': position['entry_price'],
+                    'exit_price': current_price,
+                    'size': position['size'],
+                    'gross_pnl': exit_value - invested,
+                    'fees': total_fees,
+                    'profit': profit,
+                    'profit_pct': profit / invested,
+                    'exit_reason': exit_reason,
+                    'entry_confidence': position['confidence']
+                })
+                capital += profit
+                position = None
+
+        equity_value = capital if position is None else position['size'] * current_price
+        equity_curve.append({'timestamp': current_time, 'equity': equity_value})
+
+    return trades, equity_curve
+
+
+def reference_metrics(trades, equity_curve, initial_capital):
+    """Métricas de NeuralBacktest.calculate_metrics (versión original con bucles)"""
+    if len(trades) == 0:
+        return NeuralBacktest.calculate_metrics([], [], initial_capital)
+
+    winning_trades = [t for t in trades if t['profit'] > 0]
+    losing_trades = [t for t in trades if t['profit'] <= 0]
+
+    total_gross_profit = sum(t['gross_pnl'] for t in trades)
+    total_fees = sum(t['fees'] for t in trades)
+    roi_gross = (initial_capital + total_gross_profit - initial_capital) / initial_capital
+
+    final_capital_net = equity_curve[-1]['equity'] if equity_curve else initial_capital
+    roi_net = (final_capital_net - initial_capital) / initial_capital
+
+    max_equity = initial_capital
+    max_drawdown = 0
+    for point in equity_curve:
+        equity = point['equity']
+        max_equity = max(max_equity, equity)
+        drawdown = (max_equity - equity) / max_equity
+        max_drawdown = max(max_drawdown, drawdown)
+
+    equity_values = [p['equity'] for p in equity_curve]
+    returns = np.diff(equity_values) / equity_values[:-1]
+    sharpe_ratio = 0
+    if len(returns) > 0 and np.std(returns) > 0:
+        sharpe_ratio = np.mean(returns) / np.std(returns) * np.sqrt(365 * 24 / 4)
+
+    return {
+        'total_trades': len(trades),
+        'winning_trades': len(winning_trades),
+        'losing_trades': len(losing_trades),
+        'win_rate': len(winning_trades) / len(trades),
+        'roi_gross': roi_gross,
+        'roi_net': roi_net,
+        'total_fees': total_fees,
+        'final_capital': final_capital_net,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe_ratio,
+        'avg_profit': np.mean([t['profit'] for t in winning_trades]) if winning_trades else 0,
+        'avg_loss': np.mean([t['profit'] for t in losing_trades]) if losing_trades else 0
+    }
+
+
+def assert_same_results(name, trades, equity, metrics, ref_trades, ref_equity, ref_metrics):
+    """AssertionError con el primer trade, vela o métrica distinta"""
+    records = trades.to_dict('records')
+    assert len(records) == len(ref_trades), \
+        f"{name}: {len(records)} trades con numpy y {len(ref_trades)} con el bucle"
+    for i, (trade, ref_trade) in enumerate(zip(records, ref_trades)):
+        assert trade == ref_trade, f"{name}: trade {i} distinto\n  numpy: {trade}\n  bucle: {ref_trade}"
+    np.testing.assert_array_equal(equity['equity'].to_numpy(), [e['equity'] for e in ref_equity],
+                                  err_msg=f"{name}: equity distinta")
+    for key, ref_value in ref_metrics.items():
+        assert metrics[key] == ref_value, f"{name}: métrica {key} = {metrics[key]} (bucle: {ref_value})"
+
+
+def synthetic_probs(n, seed, scale=1.5):
+    """Probabilidades aleatorias (n, n_clases) con la forma de la salida del modelo"""
+    rng = np.random.default_rng(seed)
+    logits = rng.normal(size=(n, len(config.CLASS_LABELS))) * scale
+    probs = np.exp(logits)
+    return (probs / probs.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validación y benchmark del simulador del backtest')
+    parser.add_argument('--data-dir', default='data', help='Directorio con los CSV')
+    parser.add_argument('--files', nargs='+', default=None, help='CSV concretos (default: todos)')
+    parser.add_argument('--seed', type=int, default=config.RANDOM_SEED, help='Semilla de las probabilidades')
+    parser.add_argument('--capital', type=float, default=50, help='Capital por par')
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    files = [data_dir / f for f in args.files] if args.files else sorted(data_dir.glob('*.csv'))
+
+    print(f"\n{'Fichero':<22} {'velas':>7} {'trades':>7} {'bucle (ms)':>11} {'numpy (ms)':>11} "
+          f"{'speedup':>8}  resultado")
+    print("-" * 84)
+
+    total_ref = total_new = 0.0
+    for path in files:
+        df = pd.read_csv(path)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df = df.iloc[config.LOOKBACK_WINDOW:].reset_index(drop=True)
+        timestamps = df['timestamp'].values
+        closes = df['close'].values
+        probs = synthetic_probs(len(closes), args.seed)
+
+        start = time.perf_counter()
+        ref_trades, ref_equity = reference_simulation(df, probs, args.capital, path.stem)
+        ref_metrics = reference_metrics(ref_trades, ref_equity, args.capital)
+        ref_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        trades, equity = simulate_trades(timestamps, closes, probs, args.capital, symbol=path.stem)
+        metrics = NeuralBacktest.calculate_metrics(trades, equity, args.capital)
+        new_time = time.perf_counter() - start
+
+        total_ref += ref_time
+        total_new += new_time
+
+        print(f"{path.name:<22} {len(df):>7} {len(trades):>7} {ref_time * 1000:>11.0f} "
+              f"{new_time * 1000:>11.1f} {ref_time / new_time:>7.1f}x  ", end='', flush=True)
+        assert_same_results(path.name, trades, equity, metrics, ref_trades, ref_equity, ref_metrics)
+        print("✅")
+
+    print("-" * 84)
+    if total_new > 0:
+        print(f"Total: bucle {total_ref:.2f}s, numpy {total_new:.2f}s ({total_ref / total_new:.1f}x)")
+    print("✅ Trades, equity y métricas idénticos en todos los ficheros")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark y regresión de OBV y CCI vectorizados
+
+Compara las implementaciones vectorizadas de neural_bot.features (OBV con
+suma acumulada del signo de la variación, CCI con desviación absoluta media
+sobre ventanas deslizantes) con las anteriores (bucle Python con .iloc y
+rolling().apply) en los CSV incluidos en data/, y mide el tiempo de cada una.
+Si en algún fichero no coinciden, termina con AssertionError (código != 0).
+
+Uso:
+    python benchmark_indicators.py                    # todos los CSV de data/
+    python benchmark_indicators.py --files data/BTC_USDT_4h.csv --runs 3
+"""
+
+import argparse
+import glob
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent))
+
+from neural_bot.config import config
+from neural_bot.features import _cci, _obv
+
+
+# ================== IMPLEMENTACIONES ANTERIORES (referencia) ==================
+
+def obv_reference(close, volume):
+    obv = [0]
+    for i in range(1, len(close)):
+        if close.iloc[i] > close.iloc[i-1]:
+            obv.append(obv[-1] + volume.iloc[i])
+        elif close.iloc[i] < close.iloc[i-1]:
+            obv.append(obv[-1] - volume.iloc[i])
+        else:
+            obv.append(obv[-1])
+    return pd.Series(obv, index=close.index, dtype=np.float64)
+
+
+def cci_reference(tp, period):
+    sma_tp = tp.rolling(window=period).mean()
+    mad = tp.rolling(window=period).apply(lambda x: np.abs(x - x.mean()).mean())
+    return (tp - sma_tp) / (0.015 * mad)
+
+
+def best_time(fn, runs):
+    """Mejor tiempo de runs llamadas (segundos) y el último resultado"""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def max_rel_diff(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    both = ~np.isnan(a) & ~np.isnan(b)
+    scale = np.maximum(np.abs(b[both]), 1.0)
+    return float((np.abs(a[both] - b[both]) / scale).max(initial=0.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de OBV y CCI vectorizados')
+    parser.add_argument('--files', nargs='+', default=None, help='CSV OHLCV (default: data/*.csv)')
+    parser.add_argument('--runs', type=int, default=1, help='Repeticiones por medición (se toma la mejor)')
+    parser.add_argument('--rtol', type=float, default=1e-9, help='Diferencia relativa máxima admitida en CCI')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(str(Path(__file__).parent / 'data' / '*.csv')))
+    if not files:
+        print("❌ No hay CSV que comprobar")
+        sys.exit(1)
+
+    period = config.TECHNICAL_INDICATORS['cci']
+    totals = np.zeros(4)
+
+    print(f"\n{'Fichero':<22} {'velas':>7} {'OBV loop':>9} {'OBV vec':>8} {'CCI apply':>10} "
+          f"{'CCI vec':>8} {'speedup':>8}  paridad")
+    print("-" * 92)
+    for path in files:
+        df = pd.read_csv(path)
+        close, volume = df['close'], df['volume']
+        tp = (df['high'] + df['low'] + df['close']) / 3
+
+        t_obv_ref, obv_ref = best_time(lambda: obv_reference(close, volume), args.runs)
+        t_obv, obv = best_time(lambda: _obv(close, volume), args.runs)
+        t_cci_ref, cci_ref = best_time(lambda: cci_reference(tp, period), args.runs)
+        t_cci, cci = best_time(lambda: _cci(tp, period), args.runs)
+        times = np.array([t_obv_ref, t_obv, t_cci_ref, t_cci])
+        totals += times
+
+        # OBV: mismas sumas en el mismo orden -> idéntico; CCI: mismo NaN y diferencia de redondeo
+        obv_ok = np.array_equal(obv.to_numpy(), obv_ref.to_numpy(), equal_nan=True)
+        cci_nan_ok = np.array_equal(np.isnan(cci.to_numpy()), np.isnan(cci_ref.to_numpy()))
+        cci_diff = max_rel_diff(cci, cci_ref)
+        ok = obv_ok and cci_nan_ok and cci_diff <= args.rtol
+
+        speedup = (t_obv_ref + t_cci_ref) / (t_obv + t_cci)
+        print(f"{Path(path).stem:<22} {len(df):>7} {t_obv_ref * 1000:>7.0f}ms {t_obv * 1000:>6.1f}ms "
+              f"{t_cci_ref * 1000:>8.0f}ms {t_cci * 1000:>6.1f}ms {speedup:>7.0f}x  "
+              f"{'✅' if ok else '❌'} OBV {'=' if obv_ok else '≠'} · CCI Δrel {cci_diff:.1e}")
+
+        np.testing.assert_array_equal(obv.to_numpy(), obv_ref.to_numpy(),
+                                      err_msg=f"OBV vectorizado distinto del anterior en {path}")
+        # Misma escala que max_rel_diff: relativa, con mínimo 1 para valores cercanos a 0
+        np.testing.assert_allclose(cci.to_numpy(), cci_ref.to_numpy(), rtol=args.rtol, atol=args.rtol,
+                                   equal_nan=True, err_msg=f"CCI vectorizado distinto del anterior en {path}")
+
+    print("-" * 92)
+    print(f"{'Total':<22} {'':>7} {totals[0]:>8.2f}s {totals[1]:>7.3f}s {totals[2]:>9.2f}s "
+          f"{totals[3]:>7.3f}s {(totals[0] + totals[2]) / (totals[1] + totals[3]):>7.0f}x")
+
+    print("\n✅ OBV idéntico y CCI dentro de la tolerancia en todos los ficheros")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark de inferencia: model.predict vs función compilada
+
+Mide la latencia por llamada con una ventana (batch 1, bot en vivo) y con un
+batch de todos los símbolos por defecto (get_signals), y comprueba que ambas
+rutas dan las mismas probabilidades.
+
+Uso:
+    python benchmark_inference.py --model BTC_4h_v8 --runs 200
+    python benchmark_inference.py --untrained --features 40   # sin modelo guardado
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+from neural_bot.config import config
+from neural_bot.strategy import NeuralStrategy, NeuralTradingModel, compile_inference_fn
+
+
+def time_calls(fn, X, runs):
+    """Latencia media por llamada en milisegundos"""
+    fn(X)  # Calentamiento
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(X)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de inferencia del modelo neural')
+    parser.add_argument('--model', default=None, help='Nombre del modelo (default: predeterminado)')
+    parser.add_argument('--runs', type=int, default=200, help='Llamadas por medición')
+    parser.add_argument('--untrained', action='store_true',
+                        help='Usa la arquitectura sin entrenar (no requiere modelo guardado)')
+    parser.add_argument('--features', type=int, default=40, help='Nº de features con --untrained')
+    args = parser.parse_args()
+
+    if args.untrained:
+        network = NeuralTradingModel((config.LOOKBACK_WINDOW, args.features))
+        network.build_model()
+        model = network.model
+    else:
+        strategy = NeuralStrategy(model_name=args.model)
+        if strategy.model is None:
+            print("❌ No se pudo cargar el modelo")
+            sys.exit(1)
+        model = strategy.model
+
+    input_shape = tuple(model.input_shape[1:])
+
+    start = time.perf_counter()
+    compiled = compile_inference_fn(model)
+    print(f"\n⚙️  Trazado de la función compilada: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = np.random.default_rng(config.RANDOM_SEED)
+    cases = [
+        ('1 ventana', rng.uniform(0, 1, (1,) + input_shape).astype(np.float32)),
+        (f'{len(config.DEFAULT_SYMBOLS)} símbolos',
+         rng.uniform(0, 1, (len(config.DEFAULT_SYMBOLS),) + input_shape).astype(np.float32)),
+    ]
+
+    print(f"\n{'Caso':<14} {'predict (ms)':>13} {'compilada (ms)':>15} {'speedup':>8} {'max |Δ|':>10}")
+    print("-" * 64)
+    for name, X in cases:
+        predict_ms = time_calls(lambda x: model.predict(x, verbose=0), X, args.runs)
+        compiled_ms = time_calls(compiled, X, args.runs)
+        max_diff = np.abs(model.predict(X, verbose=0) - compiled(X)).max()
+        print(f"{name:<14} {predict_ms:>13.2f} {compiled_ms:>15.2f} "
+              f"{predict_ms / compiled_ms:>7.1f}x {max_diff:>10.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,7 @@ from datetime import datetime
 import json
 from telegram_notifier import TelegramNotifier
 from data_cache import DataCache
+from price_service import PriceService
 from neural_bot import NeuralStrategy
 import config
 
@@ -59,6 +60,8 @@ class NeuralBot:
         self.equity = {}
         self.trades_log = []
         self.last_summary_date = None
+        self.last_signals = {}  # Última señal por símbolo (para Telegram/dashboard)
+        self.acted_candles = {}  # Vela cuya señal ya se ejecutó, por símbolo (reintentos)
         
         # Archivos de estado DINÁMICOS
         self.STATE_FILE = f'bot_state_neural_{self.BOT_ID}.json'
@@ -78,6 +81,7 @@ class NeuralBot:
         })
         
         # Componentes
+        self.prices = PriceService(self.exchange, self.SYMBOLS, ttl=config.PRICE_CACHE_TTL)
         self.telegram = TelegramNotifier()
         self.data_cache = DataCache()
         
@@ -131,7 +135,9 @@ class NeuralBot:
             'timestamp': datetime.now().isoformat(),
             'equity': self.equity,
             'positions': self.positions,
-            'last_summary_date': self.last_summary_date
+            'last_summary_date': self.last_summary_date,
+            'signals': self.last_signals,
+            'signal_cache': self.strategy.signal_cache_info()
         }
         try:
             with open(self.STATE_FILE, 'w') as f:
@@ -149,13 +155,8 @@ class NeuralBot:
             print(f"❌ Error guardando trade: {e}")
 
     def get_current_price(self, symbol):
-        """Obtiene precio actual (ticker)."""
-        try:
-            ticker = self.exchange.fetch_ticker(symbol)
-            return ticker['last']
-        except Exception as e:
-            print(f"❌ Error precio {symbol}: {e}")
-            return None
+        """Obtiene precio actual (ticker bulk compartido, con TTL)."""
+        return self.prices.get_price(symbol)
 
     def execute_buy(self, symbol, price, signal_data):
         """Ejecuta orden de compra basada en señal neuronal."""
@@ -295,48 +296,68 @@ class NeuralBot:
         return True
 
     def run_analysis(self):
-        """Ejecuta análisis de mercado."""
+        """
+        Ejecuta análisis de mercado.
+        
+        Las velas se descargan siempre (force_update): justo tras el cierre
+        DataCache.should_update aún puede estar dentro de sus 5 minutos.
+        
+        Returns:
+            bool: True si todas las señales son de la última vela cerrada y
+            sin error (False = hay que repetir el análisis)
+        """
         print(f"\n🔍 [{self.BOT_ID}] Analizando mercado {datetime.now().strftime('%H:%M:%S')}...", flush=True)
+        expected_candle = self.last_closed_candle()
+        
+        # Señales neuronales de todos los símbolos en una sola predicción
+        try:
+            signals = self.strategy.get_signals(self.SYMBOLS, self.TIMEFRAME, force_update=True)
+        except Exception as e:
+            print(f"❌ Error obteniendo señales: {e}")
+            return False
+        
+        stale = [symbol for symbol, data in signals.items()
+                 if 'error' in data or data.get('candle', '') < expected_candle]
+        if stale:
+            print(f"⚠️ Sin señal de la vela {expected_candle} para: {', '.join(stale)}")
+        
+        self.last_signals = {
+            symbol: {key: data[key] for key in ('signal', 'confidence', 'candle', 'timestamp', 'error')
+                     if key in data}
+            for symbol, data in signals.items()
+        }
+        self.save_state()
+        
+        # Precios de todos los símbolos en una sola petición
+        prices = self.prices.get_prices(self.SYMBOLS)
         
         for symbol in self.SYMBOLS:
             try:
-                # Obtener señal neuronal
-                signal_data = self.strategy.get_signal(symbol, self.TIMEFRAME)
+                signal_data = signals[symbol]
                 
                 signal = signal_data.get('signal')
                 confidence = signal_data.get('confidence', 0)
-                current_price = self.get_current_price(symbol)
+                current_price = prices[symbol]
                 
                 if not current_price:
                     continue
                     
                 print(f"  {symbol}: {signal} (Conf: {confidence:.2f}) - Precio: ${current_price:.2f}")
                 
-                pos = self.positions[symbol]
+                # Señal atrasada o ya ejecutada en un intento anterior: solo salidas por precio
+                if symbol in stale or signal_data['candle'] == self.acted_candles.get(symbol):
+                    signal = None
+                else:
+                    self.acted_candles[symbol] = signal_data['candle']
                 
                 # Lógica de Trading
-                if pos:
-                    # Actualizar highest price para trailing
-                    pos['highest_price'] = max(pos.get('highest_price', pos['entry_price']), current_price)
-                    
-                    # Calcular PnL actual
-                    pnl_pct = (current_price - pos['entry_price']) / pos['entry_price']
-                    trailing_dd = (pos['highest_price'] - current_price) / pos['highest_price']
-                    
-                    # 1. Take Profit
-                    if current_price >= pos.get('tp_price', pos['entry_price'] * 1.08):
-                        self.execute_sell(symbol, current_price, "TAKE_PROFIT")
-                    
-                    # 2. Stop Loss
-                    elif current_price <= pos['sl_price']:
-                        self.execute_sell(symbol, current_price, "STOP_LOSS")
-                    
-                    # 3. Trailing Stop (3% desde máximo si en ganancias >1%)
-                    elif pnl_pct > 0.01 and trailing_dd >= config.TRAILING_STOP_PCT:
-                        self.execute_sell(symbol, current_price, "TRAILING_STOP")
+                if self.positions[symbol]:
+                    # 1-3. Take Profit / Stop Loss / Trailing Stop
+                    if self.check_exit(symbol, current_price):
+                        continue
                     
                     # 4. Señal de Venta Neuronal
-                    elif signal == 'SELL':
+                    if signal == 'SELL':
                         self.execute_sell(symbol, current_price, "NEURAL_SELL")
                         
                 else:
@@ -346,6 +367,72 @@ class NeuralBot:
                         
             except Exception as e:
                 print(f"❌ Error analizando {symbol}: {e}")
+        
+        return not stale
+
+    def check_exit(self, symbol, current_price):
+        """
+        Aplica TP / SL / trailing stop a la posición abierta de un símbolo
+        
+        Returns:
+            bool: True si saltó alguna salida (se intentó cerrar la posición)
+        """
+        pos = self.positions[symbol]
+        if not pos:
+            return False
+        
+        # Actualizar highest price para trailing
+        pos['highest_price'] = max(pos.get('highest_price', pos['entry_price']), current_price)
+        
+        # Calcular PnL actual
+        pnl_pct = (current_price - pos['entry_price']) / pos['entry_price']
+        trailing_dd = (pos['highest_price'] - current_price) / pos['highest_price']
+        
+        # 1. Take Profit
+        if current_price >= pos.get('tp_price', pos['entry_price'] * 1.08):
+            self.execute_sell(symbol, current_price, "TAKE_PROFIT")
+            return True
+        
+        # 2. Stop Loss
+        elif current_price <= pos['sl_price']:
+            self.execute_sell(symbol, current_price, "STOP_LOSS")
+            return True
+        
+        # 3. Trailing Stop (3% desde máximo si en ganancias >1%)
+        elif pnl_pct > 0.01 and trailing_dd >= config.TRAILING_STOP_PCT:
+            self.execute_sell(symbol, current_price, "TRAILING_STOP")
+            return True
+        
+        return False
+
+    def check_exits(self):
+        """Chequeo rápido de salidas: solo precio de los símbolos con posición abierta."""
+        open_symbols = [symbol for symbol in self.SYMBOLS if self.positions[symbol]]
+        if not open_symbols:
+            return
+        
+        prices = self.prices.get_prices(open_symbols)
+        for symbol in open_symbols:
+            try:
+                current_price = prices[symbol]
+                if current_price:
+                    self.check_exit(symbol, current_price)
+            except Exception as e:
+                print(f"❌ Error chequeando salida {symbol}: {e}")
+
+    def seconds_until_next_candle(self, now=None):
+        """Segundos hasta el próximo cierre de vela del TIMEFRAME (+ margen de asentamiento)."""
+        now = time.time() if now is None else now
+        candle_seconds = ccxt.Exchange.parse_timeframe(self.TIMEFRAME)
+        delay = config.SIGNAL_SETTLE_DELAY
+        next_run = ((now - delay) // candle_seconds + 1) * candle_seconds + delay
+        return next_run - now
+
+    def last_closed_candle(self, now=None):
+        """Apertura (UTC, ISO) de la última vela cerrada del TIMEFRAME, como signal['candle']"""
+        now = time.time() if now is None else now
+        candle_seconds = ccxt.Exchange.parse_timeframe(self.TIMEFRAME)
+        return datetime.utcfromtimestamp((now // candle_seconds - 1) * candle_seconds).isoformat()
 
     def send_daily_summary(self):
         """Envía resumen diario."""
@@ -354,36 +441,42 @@ class NeuralBot:
         pass
 
     def run_continuous(self):
-        """Bucle principal de ejecución."""
+        """Bucle principal de ejecución.
+        
+        La señal neuronal solo cambia con velas cerradas: el análisis completo
+        se ejecuta al arrancar y en cada cierre de vela del TIMEFRAME (más
+        SIGNAL_SETTLE_DELAY). Entre medias solo se comprueban SL/TP/trailing
+        de las posiciones abiertas cada EXIT_CHECK_INTERVAL segundos.
+        
+        Si algún símbolo no tiene aún la señal de la vela cerrada (o falla
+        la predicción) el análisis se repite tras EXIT_CHECK_INTERVAL.
+        """
         print(f"🚀 [{self.BOT_ID}] Iniciando bucle continuo...", flush=True)
         
+        next_analysis = time.time()
+        
         while True:
             try:
-                now = datetime.utcnow()
-                
-                # Sincronizar con velas de 4h (00, 04, 08, 12, 16, 20 UTC)
-                next_hour = now.hour + (4 - now.hour % 4)
-                if next_hour >= 24:
-                    next_hour = 0
-                    # next_day logic omitted for brevity, just wait
-                
-                # Calcular segundos para esperar
-                # Por simplicidad en este script, ejecutamos cada minuto para pruebas
-                # En producción real, descomentar la espera larga
-                
-                self.run_analysis()
+                if time.time() >= next_analysis:
+                    if self.run_analysis():
+                        next_analysis = time.time() + self.seconds_until_next_candle()
+                    else:
+                        next_analysis = time.time() + min(config.EXIT_CHECK_INTERVAL,
+                                                          self.seconds_until_next_candle())
+                    next_dt = datetime.utcfromtimestamp(next_analysis).strftime('%Y-%m-%d %H:%M:%S')
+                    print(f"⏳ Próximo análisis: {next_dt} UTC (salidas cada {config.EXIT_CHECK_INTERVAL}s)", flush=True)
+                else:
+                    self.check_exits()
                 
-                # Esperar 1 minuto antes de siguiente chequeo (para no saturar)
-                # En producción real, esto debería esperar al cierre de vela
-                print("⏳ Esperando 60s...")
-                time.sleep(60)
+                time.sleep(max(0, min(config.EXIT_CHECK_INTERVAL, next_analysis - time.time())))
                 
             except KeyboardInterrupt:
                 print("\n🛑 Deteniendo bot...")
+                self.telegram.close()  # Enviar notificaciones pendientes
                 break
             except Exception as e:
                 print(f"❌ Error en bucle principal: {e}")
-                time.sleep(60)
+                time.sleep(config.EXIT_CHECK_INTERVAL)
 
 if __name__ == "__main__":
     import argparse
@@ -0,0 +1,125 @@
+"""
+Comprobación de paridad del calentamiento mínimo de features
+
+La predicción en vivo calcula las features solo sobre las últimas
+FeatureExtractor.signal_candles() velas. Este script comprueba, en varios
+puntos del histórico de cada símbolo, que la última secuencia normalizada
+calculada así coincide con la del cálculo sobre el histórico completo
+(dentro de la tolerancia). Las features acumuladas (OBV, VWAP) se siembran
+con su valor en la primera vela de la ventana, como hace la predicción con
+el feature store; aquí la semilla sale del cálculo completo.
+
+Uso:
+    python check_warmup_parity.py                        # símbolos por defecto, 4h
+    python check_warmup_parity.py --symbols BTC/USDT DOGE/USDT --timeframe 1h
+    python check_warmup_parity.py --model BTC_4h_v8      # features y scaler del modelo
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+
+from data_cache import DataCache
+from neural_bot.config import config
+from neural_bot.strategy import FeatureExtractor, NeuralStrategy
+
+
+def check_symbol(fe, history, feature_names, seed_cols, n_candles, windows, fit_scaler):
+    """
+    Máximo |Δ| por feature entre la ventana mínima y el histórico completo
+
+    Returns:
+        (max_diff por feature, segundos por ventana)
+    """
+    lookback = config.LOOKBACK_WINDOW
+    accumulated = fe.registry.compute(history, seed_cols)
+
+    X_full = fe.extract_raw_features(history, feature_names=feature_names)
+    if fit_scaler:
+        fe.scale_features(X_full, fit_scaler=True)
+
+    ends = np.unique(np.linspace(n_candles, len(history), windows).astype(int))
+    max_diff = np.zeros(len(feature_names))
+    elapsed = 0.0
+    for end in ends:
+        rows = slice(end - lookback - 1, end - 1)
+
+        seeds = {name: accumulated[name].iloc[end - n_candles] for name in seed_cols}
+        start = time.perf_counter()
+        X_tail = fe.extract_raw_features(history.iloc[end - n_candles:end], feature_names=feature_names,
+                                         seeds=seeds)
+        X_tail = X_tail[-lookback - 1:-1]
+        elapsed += time.perf_counter() - start
+
+        window = fe.scale_features(X_tail)
+        reference = fe.scale_features(X_full[rows])
+        max_diff = np.maximum(max_diff, np.abs(window - reference).max(axis=0))
+
+    return max_diff, elapsed / len(ends)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Paridad de la ventana de predicción con calentamiento mínimo')
+    parser.add_argument('--symbols', nargs='+', default=None, help='Pares (default: Config.DEFAULT_SYMBOLS)')
+    parser.add_argument('--timeframe', default='4h', help='Timeframe')
+    parser.add_argument('--model', default=None,
+                        help='Modelo cuyas features y scaler se usan (default: features de Config, '
+                             'scaler ajustado por símbolo)')
+    parser.add_argument('--windows', type=int, default=20, help='Ventanas comprobadas por símbolo')
+    parser.add_argument('--atol', type=float, default=10 * config.FEATURE_EMA_TOLERANCE,
+                        help='Máxima diferencia admitida en features normalizadas')
+    args = parser.parse_args()
+
+    if args.model:
+        strategy = NeuralStrategy(model_name=args.model)
+        if strategy.model is None:
+            print("❌ No se pudo cargar el modelo")
+            sys.exit(1)
+        fe = strategy.feature_extractor
+    else:
+        fe = FeatureExtractor()
+
+    feature_names = list(fe.model_features or fe.default_feature_names())
+    seed_cols = fe.seed_columns(feature_names)
+    n_candles = fe.signal_candles(feature_names)
+
+    print(f"\n🔥 Calentamiento por feature (EMA tolerancia {config.FEATURE_EMA_TOLERANCE:g}):")
+    for name in feature_names:
+        warmup = fe.registry.warmup(name)
+        print(f"   {name:<20} {'acumulada (se siembra)' if warmup is None else warmup}")
+    print(f"\n📏 Velas por predicción: {n_candles} "
+          f"(calentamiento {fe.warmup_candles(feature_names)} + lookback {config.LOOKBACK_WINDOW} + 1)")
+    if seed_cols:
+        print(f"   Acumulados sembrados: {', '.join(seed_cols)}")
+
+    cache = DataCache()
+    failed = False
+    print(f"\n{'Símbolo':<12} {'velas':>7} {'ms/ventana':>11} {'max |Δ|':>10} {'feature':<20}")
+    print("-" * 64)
+    for symbol in args.symbols or config.DEFAULT_SYMBOLS:
+        history = cache.load_from_cache(symbol, args.timeframe)
+        if history is None or len(history) < n_candles:
+            print(f"{symbol:<12} sin datos suficientes")
+            continue
+
+        max_diff, seconds = check_symbol(fe, history, feature_names, seed_cols, n_candles,
+                                         args.windows, fit_scaler=args.model is None)
+        worst = int(np.argmax(max_diff))
+        status = '✅' if max_diff[worst] <= args.atol else '❌'
+        failed |= max_diff[worst] > args.atol
+        print(f"{symbol:<12} {n_candles:>7} {seconds * 1000:>11.1f} {max_diff[worst]:>10.2e} "
+              f"{feature_names[worst]:<20} {status}")
+
+    if failed:
+        print(f"\n❌ Diferencias mayores que {args.atol:g}")
+        sys.exit(1)
+    print(f"\n✅ Todas las ventanas coinciden (tolerancia {args.atol:g})")
+
+
+if __name__ == '__main__':
+    main()
@@ -40,6 +40,11 @@ STOP_LOSS_PCT = float(os.getenv('STOP_LOSS_PCT', '0.04'))      # Stop Loss: 4%
 TAKE_PROFIT_PCT = float(os.getenv('TAKE_PROFIT_PCT', '0.08'))  # Take Profit: 8%
 TRAILING_STOP_PCT = float(os.getenv('TRAILING_STOP_PCT', '0.03')) # Trailing: 3%
 
+# Planificación (bot_neural.py)
+SIGNAL_SETTLE_DELAY = int(os.getenv('SIGNAL_SETTLE_DELAY', '30'))   # Segundos tras el cierre de vela antes de predecir
+EXIT_CHECK_INTERVAL = int(os.getenv('EXIT_CHECK_INTERVAL', '15'))   # Segundos entre chequeos de SL/TP/trailing
+PRICE_CACHE_TTL = float(os.getenv('PRICE_CACHE_TTL', '5'))         # Segundos de validez de los precios (ticker bulk)
+
 # Compounding (igual que backtest)
 USE_COMPOUNDING = os.getenv('USE_COMPOUNDING', 'true').lower() == 'true'  # Reinvertir ganancias
 MAX_POSITION_SIZE = float(os.getenv('MAX_POSITION_SIZE', '10000.0'))      # Cap máximo $10K
@@ -1,24 +1,394 @@
 import pandas as pd
+import numpy as np
 import ccxt
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import io
 import json
+import os
+import shutil
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class _FrameCache:
+    """Caché LRU de DataFrames OHLCV compartida por todo el proceso
+    
+    Acotada por bytes: al superar max_bytes se descartan las entradas menos
+    usadas. Cada entrada guarda la firma (mtime/tamaño) de los ficheros de los
+    que se leyó; si no coincide con la actual, la entrada se descarta.
+    """
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (firma, df, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key, signature):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or signature is None or entry[0] != signature:
+                self._pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, signature, df):
+        if signature is None:
+            return
+        nbytes = int(df.memory_usage(index=True).sum())
+        with self._lock:
+            self._pop(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (signature, df, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+    
+    def invalidate(self, key=None):
+        """Descarta una entrada (o todas si key es None)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._pop(key)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+    
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+class TokenBucket:
+    """Limitador de peso tipo token-bucket compartido entre hilos
+    
+    Repone `rate` tokens por segundo hasta `capacity`; cada petición consume
+    su peso. pause() vacía el bucket y bloquea a todos (ej: tras un 429).
+    """
+    
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens=1):
+        """Bloquea hasta disponer de `tokens` y los consume"""
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if now >= self._paused_until and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = max(self._paused_until - now, (tokens - self._tokens) / self.rate)
+            time.sleep(wait)
+    
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class CsvExchange:
+    """Exchange local que sirve velas desde los CSV de data/ (pruebas sin red)
+    
+    Implementa fetch_ohlcv con la misma semántica que ccxt, y fetch_ticker /
+    fetch_tickers con el cierre de la última vela de ticker_timeframe.
+    """
+    
+    def __init__(self, data_dir='data', ticker_timeframe='4h'):
+        self.data_dir = Path(data_dir)
+        self.ticker_timeframe = ticker_timeframe
+        self.requests = 0
+        self._frames = {}
+        self._lock = threading.Lock()
+    
+    def _load(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        with self._lock:
+            if key not in self._frames:
+                path = self.data_dir / f"{symbol.replace('/', '_')}_{timeframe}.csv"
+                df = pd.read_csv(path)
+                ts = pd.to_datetime(df['timestamp']).values.astype('datetime64[ms]').astype(np.int64)
+                values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+                self._frames[key] = (ts, values)
+            self.requests += 1
+            return self._frames[key]
+    
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        ts, values = self._load(symbol, timeframe)
+        start = 0 if since is None else int(np.searchsorted(ts, since, side='left'))
+        end = len(ts) if limit is None else min(len(ts), start + limit)
+        return [[int(ts[i])] + values[i].tolist() for i in range(start, end)]
+    
+    def fetch_ticker(self, symbol, params=None):
+        ts, values = self._load(symbol, self.ticker_timeframe)
+        return {
+            'symbol': symbol,
+            'timestamp': int(ts[-1]),
+            'last': float(values[-1, 3]),
+            'close': float(values[-1, 3]),
+        }
+    
+    def fetch_tickers(self, symbols=None, params=None):
+        return {symbol: self.fetch_ticker(symbol) for symbol in (symbols or [])}
+
 
 class DataCache:
-    """Maneja caché de datos históricos OHLCV con actualización incremental"""
+    """Maneja caché de datos históricos OHLCV con actualización incremental
+    
+    Almacenamiento principal en formato columnar binario: un directorio por
+    símbolo/timeframe (data/ETH_USDT_4h/) con un fichero por columna
+    (timestamp en epoch-ms int64 + OHLCV float), memory-mappable.
+    Los CSV existentes se migran automáticamente la primera vez que se leen
+    y export_csv() genera de nuevo el CSV para consultarlo a mano.
     
-    def __init__(self, data_dir='data'):
+    Las lecturas se guardan en una caché LRU en memoria compartida por todas
+    las instancias del proceso (invalidada por mtime/tamaño y por escrituras).
+    """
+    
+    OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    PRICE_DTYPE = 'float64'   # 'float32' reduce el tamaño a la mitad (con pérdida de precisión)
+    STORE_FORMAT_VERSION = 1
+    MEMORY_CACHE_MAX_BYTES = 256 * 1024 * 1024   # Caché en memoria compartida entre instancias
+    MIN_CACHE_CANDLES = 5000   # Menos velas = caché probablemente incompleto
+    
+    # Descarga masiva: presupuesto de peso de la API (Binance: 6000/min por IP)
+    DOWNLOAD_WEIGHT_PER_MINUTE = 2400
+    OHLCV_REQUEST_WEIGHT = 2          # Peso de /api/v3/klines
+    OHLCV_REQUEST_LIMIT = 1000
+    HISTORY_START = datetime(2015, 1, 1)   # UTC
+    
+    def __init__(self, data_dir='data', exchange=None):
+        """
+        Args:
+            data_dir: Directorio de datos
+            exchange: Objeto con fetch_ohlcv (default: ccxt.binance; ej: CsvExchange)
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
-        self.exchange = ccxt.binance({'enableRateLimit': True})
+        self.exchange = exchange if exchange is not None else ccxt.binance({'enableRateLimit': True})
         self.last_update_file = self.data_dir / '.last_update.json'
     
     def get_cache_path(self, symbol, timeframe='4h'):
-        """Ruta del archivo de caché para un símbolo"""
+        """Ruta del archivo CSV (legacy / exportación) para un símbolo"""
         safe_symbol = symbol.replace('/', '_')
         return self.data_dir / f"{safe_symbol}_{timeframe}.csv"
     
+    def get_store_path(self, symbol, timeframe='4h'):
+        """Ruta del almacén columnar binario para un símbolo"""
+        safe_symbol = symbol.replace('/', '_')
+        return self.data_dir / f"{safe_symbol}_{timeframe}"
+    
+    # ================== CACHÉ EN MEMORIA ==================
+    
+    def _memory_key(self, symbol, timeframe):
+        return str(self.get_store_path(symbol, timeframe).resolve())
+    
+    def _store_signature(self, store_path):
+        """Firma (mtime, tamaño) de los ficheros de columnas, o None si faltan"""
+        try:
+            signature = []
+            for col in self.OHLCV_COLUMNS:
+                st = (store_path / f"{col}.bin").stat()
+                signature.append((st.st_mtime_ns, st.st_size))
+            return tuple(signature)
+        except OSError:
+            return None
+    
+    @staticmethod
+    def memory_cache_info():
+        """Estadísticas de la caché en memoria del proceso"""
+        return _frame_cache.stats()
+    
+    @staticmethod
+    def clear_memory_cache():
+        """Vacía la caché en memoria del proceso"""
+        _frame_cache.invalidate()
+    
+    # ================== ALMACÉN COLUMNAR ==================
+    
+    @staticmethod
+    def _to_epoch_ms(timestamps):
+        """Convierte timestamps (naive UTC o con zona) a epoch en milisegundos"""
+        ts = pd.to_datetime(timestamps)
+        if ts.dt.tz is not None:
+            ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+        return ts.values.astype('datetime64[ms]').astype(np.int64)
+    
+    def _column_dtypes(self):
+        """dtype en disco de cada columna"""
+        dtypes = {col: np.dtype(self.PRICE_DTYPE).str for col in self.OHLCV_COLUMNS}
+        dtypes['timestamp'] = np.dtype(np.int64).str
+        return dtypes
+    
+    def _read_store(self, store_path):
+        """
+        Abre las columnas del almacén como memmap (sin leer el fichero entero)
+        
+        Returns:
+            dict {columna: np.memmap} o None si el almacén no existe o está vacío
+        """
+        meta_file = store_path / 'meta.json'
+        if not meta_file.exists():
+            return None
+        
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+        dtypes = {col: np.dtype(dt) for col, dt in meta['dtypes'].items()}
+        
+        # Nº de filas = mínimo entre columnas (tolera una escritura interrumpida)
+        rows = min(
+            (store_path / f"{col}.bin").stat().st_size // dtypes[col].itemsize
+            for col in self.OHLCV_COLUMNS
+        )
+        if rows == 0:
+            return None
+        
+        return {
+            col: np.memmap(store_path / f"{col}.bin", dtype=dtypes[col], mode='r', shape=(rows,))
+            for col in self.OHLCV_COLUMNS
+        }
+    
+    @staticmethod
+    def _columns_to_df(columns, start=0):
+        """Construye el DataFrame OHLCV a partir de columnas (desde la fila start)"""
+        data = {'timestamp': pd.to_datetime(np.array(columns['timestamp'][start:]), unit='ms')}
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            data[col] = np.array(columns[col][start:], dtype=np.float64)
+        return pd.DataFrame(data)
+    
+    @staticmethod
+    def _read_csv_tail(csv_path, n, block_size=64 * 1024):
+        """Lee las últimas n filas de un CSV leyendo bloques desde el final"""
+        with open(csv_path, 'rb') as f:
+            header = f.readline()
+            data_start = f.tell()
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b''
+            while pos > data_start and data.count(b'\n') <= n:
+                step = min(block_size, pos - data_start)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        
+        lines = data.splitlines()
+        if pos > data_start:
+            lines = lines[1:]  # primera línea posiblemente cortada
+        lines = [line for line in lines if line.strip()][-n:]
+        
+        df = pd.read_csv(io.BytesIO(header + b'\n'.join(lines) + b'\n'))
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+    
+    def _write_store(self, symbol, df, timeframe='4h'):
+        """Escribe el almacén columnar completo (directorio temporal + swap)"""
+        store_path = self.get_store_path(symbol, timeframe)
+        tmp_path = store_path.with_name(store_path.name + '.tmp')
+        old_path = store_path.with_name(store_path.name + '.old')
+        
+        _frame_cache.invalidate(self._memory_key(symbol, timeframe))
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        
+        dtypes = self._column_dtypes()
+        arrays = {'timestamp': self._to_epoch_ms(df['timestamp'])}
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            arrays[col] = df[col].to_numpy(dtype=np.float64)
+        
+        for col in self.OHLCV_COLUMNS:
+            arrays[col].astype(dtypes[col]).tofile(tmp_path / f"{col}.bin")
+        
+        with open(tmp_path / 'meta.json', 'w') as f:
+            json.dump({
+                'format_version': self.STORE_FORMAT_VERSION,
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'dtypes': dtypes,
+            }, f, indent=2)
+        
+        shutil.rmtree(old_path, ignore_errors=True)
+        if store_path.exists():
+            os.replace(store_path, old_path)
+        os.replace(tmp_path, store_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return store_path
+    
+    def migrate_csv(self, symbol, timeframe='4h'):
+        """Migración única de data/<SYMBOL>_<TF>.csv al almacén columnar
+        
+        El CSV original no se modifica.
+        
+        Returns:
+            bool: True si había CSV y se migró
+        """
+        csv_path = self.get_cache_path(symbol, timeframe)
+        if not csv_path.exists():
+            return False
+        
+        try:
+            df = pd.read_csv(csv_path)
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            store_path = self._write_store(symbol, df, timeframe)
+            print(f"🔁 Migrado {csv_path} → {store_path} ({len(df)} velas)")
+            return True
+        except Exception as e:
+            print(f"❌ Error migrando {csv_path}: {e}")
+            return False
+    
+    def export_csv(self, symbol, timeframe='4h', path=None):
+        """Exporta el almacén columnar a CSV (para inspección manual)
+        
+        Args:
+            symbol: Par de trading
+            timeframe: Timeframe
+            path: Ruta destino (default: data/<SYMBOL>_<TF>.csv)
+        
+        Returns:
+            Path del CSV generado o None
+        """
+        df = self.load_from_cache(symbol, timeframe)
+        if df is None:
+            return None
+        
+        path = Path(path) if path else self.get_cache_path(symbol, timeframe)
+        df.to_csv(path, index=False)
+        print(f"📄 Exportado {symbol} a {path} ({len(df)} velas)")
+        return path
+    
+    def delete_cache(self, symbol, timeframe='4h'):
+        """Elimina el almacén columnar y el CSV de un símbolo"""
+        _frame_cache.invalidate(self._memory_key(symbol, timeframe))
+        shutil.rmtree(self.get_store_path(symbol, timeframe), ignore_errors=True)
+        cache_path = self.get_cache_path(symbol, timeframe)
+        if cache_path.exists():
+            cache_path.unlink()
+    
     def download_full_history(self, symbol, timeframe='4h', max_candles=None):
         """Descarga TODO el histórico disponible desde Binance
         
@@ -123,37 +493,288 @@ class DataCache:
         
         return df
     
+    def download_many(self, symbols, timeframes=('4h',), max_workers=4, limiter=None):
+        """Descarga concurrente del histórico de varios símbolos/timeframes
+        
+        Todas las descargas comparten un limitador token-bucket (peso de la API)
+        en lugar de pausas fijas. Cada bloque se añade al almacén columnar según
+        llega, así que una descarga interrumpida se reanuda desde la última vela
+        guardada (o desde el CSV existente) al volver a llamarla.
+        
+        Args:
+            symbols: Lista de pares
+            timeframes: Lista de timeframes
+            max_workers: Descargas simultáneas
+            limiter: TokenBucket compartido (default: DOWNLOAD_WEIGHT_PER_MINUTE)
+        
+        Returns:
+            dict {(symbol, timeframe): {'candles', 'new_candles', 'requests', 'seconds', 'error'}}
+        """
+        if limiter is None:
+            rate = self.DOWNLOAD_WEIGHT_PER_MINUTE / 60
+            limiter = TokenBucket(rate, capacity=self.OHLCV_REQUEST_WEIGHT * max_workers)
+        
+        tasks = list(dict.fromkeys((symbol, tf) for symbol in symbols for tf in timeframes))
+        print(f"📥 Descarga masiva: {len(tasks)} series con {max_workers} hilos")
+        
+        stop = threading.Event()
+        results = {}
+        start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._download_resumable, symbol, tf, limiter, stop): (symbol, tf)
+                for symbol, tf in tasks
+            }
+            try:
+                for future in as_completed(futures):
+                    symbol, tf = futures[future]
+                    stats = future.result()
+                    results[(symbol, tf)] = stats
+                    speed = stats['new_candles'] / stats['seconds'] if stats['seconds'] > 0 else 0
+                    status = f"❌ {stats['error']}" if stats['error'] else '✓'
+                    print(f"  {status} {symbol} {tf}: {stats['candles']} velas "
+                          f"(+{stats['new_candles']}, {stats['requests']} requests, "
+                          f"{stats['seconds']:.1f}s, {speed:.0f} velas/s)")
+            except KeyboardInterrupt:
+                stop.set()
+                print("\n⏹️ Descarga interrumpida (se reanudará desde lo guardado)")
+                raise
+        
+        elapsed = time.perf_counter() - start
+        total_new = sum(r['new_candles'] for r in results.values())
+        total_requests = sum(r['requests'] for r in results.values())
+        print(f"✅ {total_new} velas nuevas en {elapsed:.1f}s "
+              f"({total_new / elapsed if elapsed > 0 else 0:.0f} velas/s, {total_requests} requests)")
+        
+        return results
+    
+    def _download_resumable(self, symbol, timeframe, limiter, stop=None):
+        """Descarga una serie hasta el presente continuando desde lo ya guardado"""
+        stats = {'candles': 0, 'new_candles': 0, 'requests': 0, 'seconds': 0.0, 'error': None}
+        start = time.perf_counter()
+        store_path = self.get_store_path(symbol, timeframe)
+        
+        if not (store_path / 'meta.json').exists():
+            self.migrate_csv(symbol, timeframe)
+        
+        columns = self._read_store(store_path)
+        if columns is not None:
+            since = int(columns['timestamp'][-1])
+        else:
+            since = int(self.HISTORY_START.replace(tzinfo=timezone.utc).timestamp() * 1000)
+        del columns
+        
+        while stop is None or not stop.is_set():
+            limiter.acquire(self.OHLCV_REQUEST_WEIGHT)
+            try:
+                ohlcv = self.exchange.fetch_ohlcv(
+                    symbol, timeframe, since=since, limit=self.OHLCV_REQUEST_LIMIT
+                )
+            except Exception as e:
+                if (isinstance(e, (ccxt.RateLimitExceeded, ccxt.DDoSProtection))
+                        or "429" in str(e) or "rate limit" in str(e).lower()):
+                    # Rate limit: frenar a todos los hilos
+                    limiter.pause(15)
+                    continue
+                stats['error'] = str(e)
+                break
+            
+            stats['requests'] += 1
+            if not ohlcv:
+                break
+            
+            batch = pd.DataFrame(ohlcv, columns=self.OHLCV_COLUMNS)
+            batch['timestamp'] = pd.to_datetime(batch['timestamp'], unit='ms')
+            try:
+                result = self.append_to_cache(symbol, batch, timeframe, allow_gaps=True)
+            except Exception as e:
+                stats['error'] = str(e)
+                break
+            stats['new_candles'] += result['appended']
+            
+            # Menos velas que el límite (o ninguna nueva): alcanzado el presente
+            if len(ohlcv) < self.OHLCV_REQUEST_LIMIT or ohlcv[-1][0] <= since:
+                break
+            # Siguiente bloque desde la última vela (incluida, por si seguía abierta)
+            since = ohlcv[-1][0]
+        
+        columns = self._read_store(store_path)
+        stats['candles'] = len(columns['timestamp']) if columns is not None else 0
+        del columns
+        if stats['error'] is None and (stop is None or not stop.is_set()):
+            self.update_last_update(symbol)
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+    
     def save_to_cache(self, symbol, df, timeframe='4h'):
-        """Guarda DataFrame en caché CSV"""
+        """Guarda DataFrame en el almacén columnar"""
         if df is None or len(df) == 0:
             print(f"⚠️ No hay datos para guardar en caché de {symbol}")
             return
         
-        cache_path = self.get_cache_path(symbol, timeframe)
-        df.to_csv(cache_path, index=False)
-        print(f"💾 Guardado en {cache_path} ({len(df)} velas)")
+        store_path = self._write_store(symbol, df, timeframe)
+        print(f"💾 Guardado en {store_path} ({len(df)} velas)")
     
-    def load_from_cache(self, symbol, timeframe='4h'):
-        """Carga datos desde caché CSV"""
-        cache_path = self.get_cache_path(symbol, timeframe)
+    def append_to_cache(self, symbol, new_df, timeframe='4h', allow_gaps=False):
+        """Añade velas nuevas al almacén columnar sin reescribirlo
         
-        if not cache_path.exists():
+        - Una vela con el mismo timestamp que la última guardada (vela aún
+          abierta) se reemplaza en su sitio
+        - Las velas estrictamente posteriores se añaden al final de cada columna
+        - Si hay solapamiento con velas anteriores o un hueco respecto a la
+          última guardada, se reescribe el almacén completo
+        
+        Args:
+            symbol: Par de trading
+            new_df: DataFrame OHLCV con las velas nuevas
+            timeframe: Timeframe
+            allow_gaps: Acepta un hueco tras la última vela guardada (velas que
+                vienen directamente del exchange desde esa vela)
+        
+        Returns:
+            dict con 'mode' ('append' o 'rewrite'), 'replaced' y 'appended',
+            o None si no había velas
+        """
+        if new_df is None or len(new_df) == 0:
             return None
         
+        new_df = new_df.drop_duplicates(subset=['timestamp'], keep='last')
+        new_df = new_df.sort_values('timestamp').reset_index(drop=True)
+        
+        store_path = self.get_store_path(symbol, timeframe)
+        columns = self._read_store(store_path)
+        if columns is None:
+            self._write_store(symbol, new_df, timeframe)
+            return {'mode': 'rewrite', 'replaced': 0, 'appended': len(new_df)}
+        
+        rows = len(columns['timestamp'])
+        last_ts = int(columns['timestamp'][-1])
+        dtypes = {col: columns[col].dtype for col in self.OHLCV_COLUMNS}
+        del columns  # cerrar los memmap antes de escribir
+        _frame_cache.invalidate(self._memory_key(symbol, timeframe))
+        
+        new_ts = self._to_epoch_ms(new_df['timestamp'])
+        replace_last = bool(new_ts[0] == last_ts)
+        appended_ts = new_ts[1:] if replace_last else new_ts
+        interval_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        
+        overlap = new_ts[0] < last_ts
+        gap = (not allow_gaps and len(appended_ts) > 0
+               and appended_ts[0] - last_ts > interval_ms)
+        if overlap or gap:
+            reason = 'Solapamiento' if overlap else 'Hueco'
+            print(f"  ⚠️ {reason} en velas nuevas de {symbol}, reescribiendo almacén")
+            df = self._columns_to_df(self._read_store(store_path))
+            df = pd.concat([df, new_df], ignore_index=True)
+            df = df.drop_duplicates(subset=['timestamp'], keep='last')
+            df = df.sort_values('timestamp').reset_index(drop=True)
+            self._write_store(symbol, df, timeframe)
+            return {'mode': 'rewrite', 'replaced': 0, 'appended': len(df) - rows}
+        
+        arrays = {'timestamp': new_ts}
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            arrays[col] = new_df[col].to_numpy(dtype=np.float64)
+        
+        for col in self.OHLCV_COLUMNS:
+            data = arrays[col].astype(dtypes[col])
+            itemsize = dtypes[col].itemsize
+            with open(store_path / f"{col}.bin", 'r+b') as f:
+                # Descartar restos de una escritura interrumpida (columnas desalineadas)
+                f.truncate(rows * itemsize)
+                if replace_last:
+                    f.seek((rows - 1) * itemsize)
+                else:
+                    f.seek(rows * itemsize)
+                f.write(data.tobytes())
+        
+        return {'mode': 'append', 'replaced': int(replace_last), 'appended': len(appended_ts)}
+    
+    def load_from_cache(self, symbol, timeframe='4h'):
+        """Carga datos desde el almacén columnar (migrando el CSV si hace falta)
+        
+        Usa la caché en memoria del proceso si los ficheros no han cambiado.
+        Devuelve siempre una copia: el llamador puede modificarla.
+        """
+        store_path = self.get_store_path(symbol, timeframe)
+        
+        if not (store_path / 'meta.json').exists():
+            if not self.migrate_csv(symbol, timeframe):
+                return None
+        
         try:
-            df = pd.read_csv(cache_path)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            key = self._memory_key(symbol, timeframe)
+            signature = self._store_signature(store_path)
+            df = _frame_cache.get(key, signature)
+            if df is not None:
+                print(f"🧠 Caché en memoria de {symbol}: {len(df)} velas")
+                return df.copy()
+            
+            columns = self._read_store(store_path)
+            if columns is None:
+                return None
+            df = self._columns_to_df(columns)
+            _frame_cache.put(key, signature, df)
             print(f"📂 Cargado caché de {symbol}: {len(df)} velas")
-            return df
+            return df.copy()
         except Exception as e:
             print(f"❌ Error cargando caché de {symbol}: {e}")
             return None
     
+    def _fetch_new_candles(self, symbol, timeframe, last_timestamp):
+        """Descarga las velas desde last_timestamp (incluida, por si seguía abierta)
+        
+        Returns:
+            DataFrame OHLCV o None si no hay velas o hubo error
+        """
+        since = int(last_timestamp.timestamp() * 1000)
+        print(f"🔄 Actualizando {symbol} desde {last_timestamp}")
+        
+        try:
+            new_ohlcv = self.exchange.fetch_ohlcv(
+                symbol,
+                timeframe,
+                since=since,
+                limit=1000
+            )
+        except Exception as e:
+            print(f"  ⚠️ Error actualizando {symbol}: {e}")
+            # Continuar con datos existentes
+            return None
+        
+        if not new_ohlcv:
+            print(f"  ℹ No hay velas nuevas para {symbol}")
+            return None
+        
+        new_df = pd.DataFrame(
+            new_ohlcv,
+            columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        )
+        new_df['timestamp'] = pd.to_datetime(new_df['timestamp'], unit='ms')
+        return new_df
+    
+    def _append_and_report(self, symbol, new_df, timeframe):
+        """append_to_cache + resumen por consola"""
+        try:
+            result = self.append_to_cache(symbol, new_df, timeframe)
+        except Exception as e:
+            print(f"  ⚠️ Error guardando velas nuevas de {symbol}: {e}")
+            return None
+        
+        if result['appended'] > 0:
+            print(f"  ✓ Añadidas {result['appended']} velas nuevas")
+        else:
+            print(f"  ℹ No hay velas nuevas para {symbol}")
+        if result['replaced']:
+            print(f"  ✓ Actualizada la última vela")
+        return result
+    
     def update_cache(self, symbol, timeframe='4h'):
         """Actualización incremental del caché
         
         - Si no existe caché: descarga histórico completo
-        - Si existe: solo descarga velas nuevas desde la última
+        - Si existe: descarga desde la última vela guardada (incluida, por si
+          seguía abierta) y solo añade al almacén las velas nuevas
         """
         df = self.load_from_cache(symbol, timeframe)
         
@@ -161,45 +782,22 @@ class DataCache:
             # Primera vez: descargar todo el histórico
             print(f"🆕 Primera descarga para {symbol}")
             df = self.download_full_history(symbol, timeframe)
+            if df is not None:
+                self.save_to_cache(symbol, df, timeframe)
         else:
             # Actualización incremental
             last_timestamp = df['timestamp'].max()
-            since = int(last_timestamp.timestamp() * 1000) + 1
-            
-            print(f"🔄 Actualizando {symbol} desde {last_timestamp}")
+            new_df = self._fetch_new_candles(symbol, timeframe, last_timestamp)
             
-            try:
-                # Fetch solo velas nuevas
-                new_ohlcv = self.exchange.fetch_ohlcv(
-                    symbol,
-                    timeframe,
-                    since=since,
-                    limit=1000
-                )
+            if new_df is not None:
+                self._append_and_report(symbol, new_df, timeframe)
                 
-                if new_ohlcv and len(new_ohlcv) > 0:
-                    new_df = pd.DataFrame(
-                        new_ohlcv,
-                        columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-                    )
-                    new_df['timestamp'] = pd.to_datetime(new_df['timestamp'], unit='ms')
-                    
-                    # Append nuevas velas
-                    df = pd.concat([df, new_df], ignore_index=True)
-                    df = df.drop_duplicates(subset=['timestamp'])
-                    df = df.sort_values('timestamp').reset_index(drop=True)
-                    
-                    print(f"  ✓ Añadidas {len(new_df)} velas nuevas")
-                else:
-                    print(f"  ℹ No hay velas nuevas para {symbol}")
-            
-            except Exception as e:
-                print(f"  ⚠️ Error actualizando {symbol}: {e}")
-                # Continuar con datos existentes
+                # Misma fusión en memoria (la vela más reciente gana)
+                df = pd.concat([df, new_df], ignore_index=True)
+                df = df.drop_duplicates(subset=['timestamp'], keep='last')
+                df = df.sort_values('timestamp').reset_index(drop=True)
         
-        # Guardar caché actualizado
         if df is not None:
-            self.save_to_cache(symbol, df, timeframe)
             self.update_last_update(symbol)
         
         return df
@@ -220,15 +818,13 @@ class DataCache:
         
         # Si el caché tiene menos de 5000 velas, es probable que sea incompleto
         # ELIMINAR el archivo y re-descargar desde cero
-        MIN_CANDLES = 5000
+        MIN_CANDLES = self.MIN_CACHE_CANDLES
         if df is not None and len(df) < MIN_CANDLES:
             print(f"⚠️ Caché de {symbol} tiene solo {len(df)} velas (mínimo {MIN_CANDLES})")
             print(f"   Eliminando caché inválido y re-descargando...")
             
-            # Eliminar archivo de caché inválido
-            cache_path = self.get_cache_path(symbol, timeframe)
-            if cache_path.exists():
-                cache_path.unlink()
+            # Eliminar caché inválido (almacén columnar y CSV)
+            self.delete_cache(symbol, timeframe)
             
             df = None  # Forzar re-descarga
         
@@ -237,6 +833,55 @@ class DataCache:
         else:
             return df
     
+    def get_tail(self, symbol, timeframe='4h', n=110, force_update=False):
+        """Obtiene solo las últimas n velas sin leer el histórico completo
+        
+        Con almacén columnar lee un slice del memmap; con un CSV aún sin migrar
+        lee desde el final del fichero. La actualización incremental solo mira
+        la última vela guardada, así que el coste no depende de los años de
+        histórico almacenados.
+        
+        Args:
+            symbol: Par de trading
+            timeframe: Timeframe
+            n: Nº de velas
+            force_update: Fuerza actualización aunque no hayan pasado 5 minutos
+        
+        Returns:
+            DataFrame con las últimas n velas OHLCV
+        """
+        store_path = self.get_store_path(symbol, timeframe)
+        columns = self._read_store(store_path)
+        needs_update = force_update or self.should_update(symbol, timeframe)
+        
+        if columns is None:
+            csv_path = self.get_cache_path(symbol, timeframe)
+            if csv_path.exists() and not needs_update:
+                try:
+                    return self._read_csv_tail(csv_path, n)
+                except Exception as e:
+                    print(f"❌ Error leyendo final de {csv_path}: {e}")
+            # Sin almacén: camino completo (migración / descarga)
+            df = self.get_data(symbol, timeframe, force_update=force_update)
+            return df.tail(n).reset_index(drop=True) if df is not None else None
+        
+        if len(columns['timestamp']) < self.MIN_CACHE_CANDLES:
+            del columns
+            df = self.get_data(symbol, timeframe, force_update=force_update)
+            return df.tail(n).reset_index(drop=True) if df is not None else None
+        
+        if needs_update:
+            last_timestamp = pd.to_datetime(int(columns['timestamp'][-1]), unit='ms')
+            del columns  # cerrar los memmap antes de escribir
+            new_df = self._fetch_new_candles(symbol, timeframe, last_timestamp)
+            if new_df is not None:
+                self._append_and_report(symbol, new_df, timeframe)
+            self.update_last_update(symbol)
+            columns = self._read_store(store_path)
+        
+        rows = len(columns['timestamp'])
+        return self._columns_to_df(columns, start=max(0, rows - n))
+    
     def should_update(self, symbol, timeframe='4h'):
         """Verifica si necesita actualizar el caché
         
@@ -270,6 +915,10 @@ class DataCache:
     
     def update_last_update(self, symbol):
         """Registra timestamp de última actualización"""
+        with _last_update_lock:
+            self._write_last_update(symbol)
+    
+    def _write_last_update(self, symbol):
         updates = {}
         
         if self.last_update_file.exists():
@@ -288,8 +937,24 @@ class DataCache:
         """Retorna información sobre el caché"""
         info = {}
         
+        for store_path in sorted(self.data_dir.glob('*/meta.json')):
+            store_path = store_path.parent
+            symbol = store_path.name.replace('_', '/')
+            columns = self._read_store(store_path)
+            timestamps = columns['timestamp'] if columns is not None else []
+            
+            info[symbol] = {
+                'candles': len(timestamps),
+                'size_kb': sum(f.stat().st_size for f in store_path.iterdir()) / 1024,
+                'first_date': pd.to_datetime(timestamps[0], unit='ms') if len(timestamps) > 0 else None,
+                'last_date': pd.to_datetime(timestamps[-1], unit='ms') if len(timestamps) > 0 else None
+            }
+        
+        # CSV aún no migrados
         for csv_file in self.data_dir.glob('*.csv'):
             symbol = csv_file.stem.replace('_', '/')
+            if symbol in info:
+                continue
             df = pd.read_csv(csv_file)
             
             info[symbol] = {
@@ -302,6 +967,11 @@ class DataCache:
         return info
 
 
+# Caché en memoria única por proceso (compartida por todas las instancias)
+_frame_cache = _FrameCache(DataCache.MEMORY_CACHE_MAX_BYTES)
+_last_update_lock = threading.Lock()
+
+
 if __name__ == '__main__':
     # Test del caché
     print("=== Test Data Cache ===\n")
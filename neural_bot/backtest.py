@@ -13,27 +13,76 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
+import io
 import json
 import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 
 import sys
 from pathlib import Path
 # Add parent directory to path for DataCache
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from data_cache import DataCache
-from .strategy import NeuralStrategy
+from .strategy import FeatureExtractor, NeuralStrategy, tf
+from .simulator import simulate_trades
+from .prediction_cache import PredictionCache
+from .feature_store import FeatureStore
 from .config import config
 
 
+# Estado de cada proceso del pool de backtest_multiple (modelo cargado una vez)
+_worker_strategy = None
+_worker_backtest = None
+
+
+def _init_backtest_worker(model_name, initial_capital, capital_per_pair, workers, full_history_features):
+    """Inicializa un proceso del pool: reparte los hilos de TF y carga el modelo"""
+    global _worker_strategy, _worker_backtest
+    
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    
+    _worker_strategy = NeuralStrategy(model_name=model_name)
+    _worker_backtest = NeuralBacktest(initial_capital=initial_capital, capital_per_pair=capital_per_pair,
+                                      full_history_features=full_history_features)
+
+
+def _run_backtest_task(task):
+    """Backtest de un (símbolo, período) en un proceso del pool; devuelve (resultado, salida)"""
+    symbol, start_date, end_date, timeframe, verbose = task
+    
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = _worker_backtest.backtest_symbol(
+            symbol, _worker_strategy, start_date, end_date, timeframe, verbose
+        )
+    return result, output.getvalue()
+
+
 class NeuralBacktest:
     """Backtesting para estrategia neuronal"""
     
-    def __init__(self, initial_capital=200, capital_per_pair=50):
+    def __init__(self, initial_capital=200, capital_per_pair=50, full_history_features=None):
+        """
+        Args:
+            full_history_features: Con --start-date, tomar las features del
+                histórico completo desde el feature store (default:
+                Config.FEATURE_STORE_DATE_RANGES)
+        """
         self.initial_capital = initial_capital
         self.capital_per_pair = capital_per_pair
+        self.full_history_features = (config.FEATURE_STORE_DATE_RANGES if full_history_features is None
+                                      else full_history_features)
         self.cache = DataCache()
+        self.prediction_cache = PredictionCache()
+        self.feature_store = FeatureStore()
     
-    def backtest_symbol(self, symbol, strategy, start_date=None, end_date=None, timeframe=None):
+    def backtest_symbol(self, symbol, strategy, start_date=None, end_date=None, timeframe=None,
+                        verbose=False):
         """
         Ejecuta backtest en un símbolo
         
@@ -43,6 +92,7 @@ class NeuralBacktest:
             start_date: Fecha inicial (str formato YYYY-MM-DD)
             end_date: Fecha final (str formato YYYY-MM-DD)
             timeframe: Timeframe opcional (default: Config)
+            verbose: Imprimir cada trade
         
         Returns:
             dict con métricas de rendimiento
@@ -54,6 +104,61 @@ class NeuralBacktest:
         print(f"Backtesting {symbol} ({tf})")
         print(f"{'='*60}")
         
+        df = self.load_data(symbol, tf, start_date, end_date)
+        if df is None:
+            return None
+        
+        predictions = self.get_predictions(symbol, strategy, df, tf)
+        if predictions is None:
+            return None
+        
+        # Simular trading sobre arrays (X_seq tiene lookback menos elementos que df)
+        start_idx = config.LOOKBACK_WINDOW
+        trades_df, equity_df = simulate_trades(
+            df['timestamp'].values[start_idx:],
+            df['close'].values[start_idx:],
+            predictions,
+            self.capital_per_pair,
+            symbol=symbol
+        )
+        trades = trades_df.to_dict('records')
+
+        if verbose:
+            for t in trades:
+                print(f"  🟢 BUY @ {t['entry_price']:.2f} ({t['entry_time'].strftime('%Y-%m-%d')}) - Conf: {t['entry_confidence']:.2%}")
+                print(f"  🔴 SELL @ {t['exit_price']:.2f} ({t['exit_time'].strftime('%Y-%m-%d')})")
+                print(f"     Profit: ${t['profit']:.2f} ({t['profit_pct']:.2%}) - {t['exit_reason']}")
+
+        # Calcular métricas
+        metrics = self.calculate_metrics(trades, equity_df, self.capital_per_pair)
+        
+        print(f"\n{'='*60}")
+        print(f"RESULTADOS - {symbol}")
+        print(f"{'='*60}")
+        print(f"Total Trades: {metrics['total_trades']}")
+        print(f"Win Rate: {metrics['win_rate']:.2%}")
+        print(f"ROI Bruto: {metrics['roi_gross']:.2%}")
+        print(f"Fees Pagadas: ${metrics['total_fees']:.2f}")
+        print(f"ROI Neto: {metrics['roi_net']:.2%}")
+        print(f"Final Capital: ${metrics['final_capital']:.2f}")
+        print(f"Max Drawdown: {metrics['max_drawdown']:.2%}")
+        print(f"Sharpe Ratio: {metrics['sharpe_ratio']:.2f}")
+        print(f"{'='*60}\n")
+        
+        return {
+            'symbol': symbol,
+            'metrics': metrics,
+            'trades': trades,
+            'equity_curve': equity_df.to_dict('records')
+        }
+    
+    def load_data(self, symbol, tf, start_date=None, end_date=None):
+        """
+        Carga las velas del backtest filtradas por fechas (actualizando la caché si faltan)
+        
+        Returns:
+            DataFrame OHLCV o None si no hay datos suficientes
+        """
         # Cargar datos (con actualización si es necesario)
         print(f"📥 Verificando datos en cache...")
         df = self.cache.get_data(symbol, tf)
@@ -169,177 +274,75 @@ class NeuralBacktest:
         print(f"📊 Período: {df['timestamp'].min()} a {df['timestamp'].max()}")
         print(f"   Velas: {len(df)}")
         
-        # CRÍTICO: Extraer features UNA SOLA VEZ para todos los datos
-        print(f"🔧 Extrayendo features...")
-        X = strategy.feature_extractor.extract_features(df, fit_scaler=False)
-        X_seq = strategy.feature_extractor.create_sequences(X)
-        
-        if len(X_seq) == 0:
-            print(f"❌ No se pudieron crear secuencias")
-            return None
-        
-        print(f"✅ {len(X_seq)} predicciones generadas")
-        
-        # Generar TODAS las predicciones de una vez (eficiente)
-        print(f"🧠 Generando predicciones...")
-        predictions = strategy.model.predict(X_seq)
-        
-        # Simular trading
-        capital = self.capital_per_pair
-        position = None
-        trades = []
-        equity_curve = []
-        
-        # Ajustar índices: X_seq tiene lookback menos elementos que df
-        start_idx = config.LOOKBACK_WINDOW
+        return df
+    
+    def get_predictions(self, symbol, strategy, df, tf):
+        """
+        Probabilidades del modelo por vela (desde la caché de predicciones si es posible)
         
-        for i in range(len(predictions)):
-            df_idx = start_idx + i
-            
-            if df_idx >= len(df):
-                break
-            
-            current_time = df.iloc[df_idx]['timestamp']
-            current_price = df.iloc[df_idx]['close']
-            
-            # Obtener predicción pre-calculada
-            probs = predictions[i]
-            predicted_class = np.argmax(probs)
-            confidence = probs[predicted_class]
-            
-            # Aplicar umbrales
-            signal = config.CLASS_LABELS[predicted_class]
-            if signal == 'BUY' and confidence < config.MIN_CONFIDENCE_BUY:
-                signal = 'HOLD'
-            elif signal == 'SELL' and confidence < config.MIN_CONFIDENCE_SELL:
-                signal = 'HOLD'
+        Returns:
+            np.ndarray (len(df) - lookback, n_clases) o None si no hay secuencias
+        """
+        # Predicciones de un backtest anterior con el mismo modelo y velas
+        history = self.cache.load_from_cache(symbol, tf) if config.USE_FEATURE_STORE else None
+        if history is not None and not self.full_history_features and self.feature_store.is_date_range(history, df):
+            history = None  # Rango de fechas: features calculadas sobre df
+
+        predictions = None
+        if config.USE_PREDICTION_CACHE:
+            cache_key, cache_meta = self.prediction_cache.make_key(strategy, df, symbol, tf, history=history)
+            predictions = self.prediction_cache.load(cache_key)
+            if predictions is not None:
+                print(f"⚡ {len(predictions)} predicciones desde caché ({cache_key[:12]})")
+        
+        if predictions is None:
+            # CRÍTICO: Extraer features UNA SOLA VEZ para todos los datos
+            X = self.load_features(symbol, strategy, df, tf, history=history)
+            X_seq = strategy.feature_extractor.create_sequences(X, dtype=np.float32)
             
-            # Lógica de trading
-            if position is None:
-                # Sin posición - buscar entrada
-                if signal == 'BUY':
-                    # Usar capital según configuración (compounding o fijo)
-                    if config.USE_COMPOUNDING:
-                        position_size = min(capital, config.MAX_POSITION_SIZE)  # Cap máximo
-                    else:
-                        position_size = self.capital_per_pair  # Tamaño fijo por trade
-                    
-                    position = {
-                        'entry_price': current_price,
-                        'size': position_size / current_price,
-                        'invested_capital': position_size,
-                        'entry_time': current_time,
-                        'confidence': confidence,
-                        'highest_price': current_price  # Para Trailing Stop
-                    }
-                    print(f"  🟢 BUY @ {current_price:.2f} ({current_time.strftime('%Y-%m-%d')}) - Conf: {confidence:.2%}")
+            if len(X_seq) == 0:
+                print(f"❌ No se pudieron crear secuencias")
+                return None
             
-            else:
-                # Con posición - gestionar salida
-                # Actualizar highest price para Trailing Stop
-                position['highest_price'] = max(position['highest_price'], current_price)
-                
-                # Calcular PnL
-                pnl_pct = (current_price - position['entry_price']) / position['entry_price']
-                
-                # Calcular Trailing Drawdown desde el máximo
-                trailing_drawdown = (position['highest_price'] - current_price) / position['highest_price']
-                
-                # Condiciones de salida
-                should_close = False
-                exit_reason = ''
-                
-                # Take Profit (configurable)
-                if pnl_pct >= config.TAKE_PROFIT_PCT:
-                    should_close = True
-                    exit_reason = 'Take Profit'
-                
-                elif signal == 'SELL':
-                    should_close = True
-                    exit_reason = 'Señal SELL'
-                
-                # Stop Loss (configurable)
-                elif pnl_pct <= config.STOP_LOSS_PCT:
-                    should_close = True
-                    exit_reason = 'Stop Loss'
-                
-                # Trailing Stop (configurable)
-                elif pnl_pct > config.TRAILING_ACTIVATION_PCT and trailing_drawdown >= config.TRAILING_STOP_PCT:
-                    should_close = True
-                    exit_reason = 'Trailing Stop'
-                
-                if should_close:
-                    # Cerrar posición
-                    exit_value = position['size'] * current_price
-                    invested = position['invested_capital']
-                    
-                    # Calcular comisiones (Entrada + Salida)
-                    entry_fee = invested * config.TRADING_FEE
-                    exit_fee = exit_value * config.TRADING_FEE
-                    total_fees = entry_fee + exit_fee
-                    
-                    # Profit neto (Valor Salida - Valor Entrada - Comisiones)
-                    profit = exit_value - invested - total_fees
-                    profit_pct = (profit / invested)
-                    
-                    trade = {
-                        'symbol': symbol,
-                        'entry_time': position['entry_time'],
-                        'exit_time': current_time,
-                        'entry_price': position['entry_price'],
-                        'exit_price': current_price,
-                        'size': position['size'],
-                        'gross_pnl': exit_value - invested, # Bruto
-                        'fees': total_fees,                 # Comisiones
-                        'profit': profit,                   # Neto
-                        'profit_pct': profit_pct,
-                        'exit_reason': exit_reason,
-                        'entry_confidence': position['confidence']
-                    }
-                    
-                    trades.append(trade)
-                    capital += profit
-                    
-                    print(f"  🔴 SELL @ {current_price:.2f} ({current_time.strftime('%Y-%m-%d')})")
-                    print(f"     Profit: ${profit:.2f} ({profit_pct:.2%}) - {exit_reason}")
-                    
-                    position = None
+            print(f"✅ {len(X_seq)} predicciones generadas")
             
-            # Guardar equity
-            equity_value = capital
-            if position is not None:
-                equity_value = position['size'] * current_price
+            # Generar TODAS las predicciones de una vez (eficiente)
+            print(f"🧠 Generando predicciones...")
+            predictions = strategy.model.predict(X_seq)
             
-            equity_curve.append({
-                'timestamp': current_time,
-                'equity': equity_value
-            })
-        
-        # Calcular métricas
-        metrics = self.calculate_metrics(trades, equity_curve, self.capital_per_pair)
-        
-        print(f"\n{'='*60}")
-        print(f"RESULTADOS - {symbol}")
-        print(f"{'='*60}")
-        print(f"Total Trades: {metrics['total_trades']}")
-        print(f"Win Rate: {metrics['win_rate']:.2%}")
-        print(f"ROI Bruto: {metrics['roi_gross']:.2%}")
-        print(f"Fees Pagadas: ${metrics['total_fees']:.2f}")
-        print(f"ROI Neto: {metrics['roi_net']:.2%}")
-        print(f"Final Capital: ${metrics['final_capital']:.2f}")
-        print(f"Max Drawdown: {metrics['max_drawdown']:.2%}")
-        print(f"Sharpe Ratio: {metrics['sharpe_ratio']:.2f}")
-        print(f"{'='*60}\n")
+            if config.USE_PREDICTION_CACHE:
+                self.prediction_cache.save(cache_key, predictions, cache_meta)
         
-        return {
-            'symbol': symbol,
-            'metrics': metrics,
-            'trades': trades,
-            'equity_curve': equity_curve
-        }
+        return predictions
     
-    def calculate_metrics(self, trades, equity_curve, initial_capital):
-        """Calcula métricas de rendimiento"""
+    def load_features(self, symbol, strategy, df, tf, history=None):
+        """
+        Features normalizadas de las velas del backtest
+
+        Con history (histórico completo) se leen las filas del rango desde el
+        feature store; si no, se calculan sobre df. Un rango con --start-date
+        solo usa el feature store con full_history_features (los indicadores
+        no se reinician al inicio del rango).
+
+        Returns:
+            np.ndarray (len(df), n_features)
+        """
+        if history is not None:
+            X_raw = self.feature_store.get_features(symbol, tf, history, strategy.feature_extractor, df=df,
+                                                    date_ranges=self.full_history_features)
+            if X_raw is not None:
+                print(f"⚡ Features desde el feature store ({len(X_raw)} velas)")
+                return strategy.feature_extractor.scale_features(X_raw, fit_scaler=False)
+
+        print(f"🔧 Extrayendo features...")
+        return strategy.feature_extractor.extract_features(df, fit_scaler=False)
+
+    @staticmethod
+    def calculate_metrics(trades, equity_curve, initial_capital):
+        """Calcula métricas de rendimiento (trades y equity_curve: lista de dicts o DataFrame)"""
+        
+        if isinstance(trades, pd.DataFrame):
+            trades = trades[['profit', 'gross_pnl', 'fees']].to_dict('records')
         
         if len(trades) == 0:
             return {
@@ -393,21 +396,21 @@ class NeuralBacktest:
         roi_gross = (final_capital_gross - initial_capital) / initial_capital
         
         # ROI Neto (Real)
-        final_capital_net = equity_curve[-1]['equity'] if equity_curve else initial_capital
+        if isinstance(equity_curve, pd.DataFrame):
+            equity_values = equity_curve['equity'].to_numpy(dtype=np.float64)
+        else:
+            equity_values = np.array([p['equity'] for p in equity_curve], dtype=np.float64)
+        
+        final_capital_net = equity_values[-1] if len(equity_values) else initial_capital
         roi_net = (final_capital_net - initial_capital) / initial_capital
         
-        # Max Drawdown
-        max_equity = initial_capital
+        # Max Drawdown (máximo acumulado desde el capital inicial)
         max_drawdown = 0
-        
-        for point in equity_curve:
-            equity = point['equity']
-            max_equity = max(max_equity, equity)
-            drawdown = (max_equity - equity) / max_equity
-            max_drawdown = max(max_drawdown, drawdown)
+        if len(equity_values):
+            max_equity = np.maximum.accumulate(np.maximum(equity_values, initial_capital))
+            max_drawdown = max(max_drawdown, ((max_equity - equity_values) / max_equity).max())
         
         # Returns para Sharpe
-        equity_values = [p['equity'] for p in equity_curve]
         returns = np.diff(equity_values) / equity_values[:-1]
         
         sharpe_ratio = 0
@@ -433,17 +436,49 @@ class NeuralBacktest:
             'avg_loss': avg_loss
         }
     
-    def backtest_multiple(self, symbols, start_date=None, end_date=None, timeframe=None):
-        """Backtest en múltiples símbolos"""
+    def backtest_multiple(self, symbols, start_date=None, end_date=None, timeframe=None, verbose=False,
+                          workers=None, model_name=None, periods=None):
+        """
+        Backtest en múltiples símbolos
+        
+        Args:
+            symbols: Lista de pares
+            start_date, end_date: Período común (si no se indica periods)
+            timeframe: Timeframe opcional (default: Config)
+            verbose: Imprimir cada trade
+            workers: Procesos en paralelo (default: Config.BACKTEST_WORKERS; 1 = en serie)
+            model_name: Modelo a usar (default: el predeterminado)
+            periods: Lista opcional de (start_date, end_date); se evalúa cada
+                símbolo en cada período y el resultado incluye 'period'
         
-        # Cargar estrategia
-        strategy = NeuralStrategy()
+        Returns:
+            Lista de resultados en el orden de symbols (y periods)
+        """
+        workers = config.BACKTEST_WORKERS if workers is None else workers
+        
+        # Tareas en orden determinista: símbolo a símbolo, período a período
+        tasks = [
+            (symbol, start, end, timeframe, verbose)
+            for symbol in symbols
+            for start, end in (periods or [(start_date, end_date)])
+        ]
+        
+        if workers > 1 and len(tasks) > 1:
+            task_results = self._run_parallel(tasks, min(workers, len(tasks)), model_name)
+        else:
+            # Cargar estrategia
+            strategy = NeuralStrategy(model_name=model_name)
+            task_results = (
+                self.backtest_symbol(symbol, strategy, start, end, tf, verb)
+                for symbol, start, end, tf, verb in tasks
+            )
         
         results = []
         
-        for symbol in symbols:
-            result = self.backtest_symbol(symbol, strategy, start_date, end_date, timeframe)
+        for (symbol, start, end, _, _), result in zip(tasks, task_results):
             if result is not None:
+                if periods:
+                    result['period'] = {'start_date': start, 'end_date': end}
                 results.append(result)
         
         # Resumen general
@@ -470,6 +505,39 @@ class NeuralBacktest:
         
         return results
     
+    def _run_parallel(self, tasks, workers, model_name):
+        """
+        Ejecuta las tareas de backtest en un pool de procesos
+        
+        Cada proceso carga el modelo una sola vez. La salida de cada tarea se
+        captura en el proceso y se imprime aquí en el orden de las tareas, así
+        que los resultados y el log coinciden con la ejecución en serie.
+        
+        Yields:
+            Resultado de cada tarea (o None) en el orden de tasks
+        """
+        # Actualizar la caché de cada símbolo antes de repartir, para que
+        # varios procesos no escriban a la vez los mismos ficheros
+        for symbol, timeframe in dict.fromkeys((t[0], t[3] or config.DEFAULT_TIMEFRAME) for t in tasks):
+            history = self.cache.get_data(symbol, timeframe)
+            if config.USE_FEATURE_STORE and history is not None:
+                self.feature_store.update(symbol, timeframe, history, FeatureExtractor())
+        
+        print(f"\n⚙️  Backtest en paralelo: {len(tasks)} tareas en {workers} procesos")
+        
+        # 'spawn': TensorFlow no es seguro tras un fork
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_backtest_worker,
+            initargs=(model_name, self.initial_capital, self.capital_per_pair, workers,
+                      self.full_history_features)
+        ) as executor:
+            for result, output in executor.map(_run_backtest_task, tasks):
+                print(output, end='')
+                yield result
+    
     def save_results(self, results):
         """Guarda resultados del backtest"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -536,6 +604,10 @@ if __name__ == '__main__':
                        help='Fecha fin (YYYY-MM-DD)')
     parser.add_argument('--capital', type=float, default=50,
                        help='Capital por par')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Procesos en paralelo (default: Config)')
+    parser.add_argument('--full-history-features', action='store_true',
+                       help='Con --start-date, features del histórico completo (feature store)')
     
     args = parser.parse_args()
     
@@ -556,6 +628,7 @@ if __name__ == '__main__':
     print("="*60 + "\n")
     
     # Ejecutar backtest
-    backtester = NeuralBacktest(capital_per_pair=args.capital)
-    results = backtester.backtest_multiple(symbols, args.start_date, args.end_date)
+    backtester = NeuralBacktest(capital_per_pair=args.capital,
+                                full_history_features=args.full_history_features or None)
+    results = backtester.backtest_multiple(symbols, args.start_date, args.end_date, workers=args.workers)
 
@@ -8,6 +8,8 @@ Comandos disponibles:
     delete          - Elimina un modelo
     train           - Entrena nuevo modelo
     backtest        - Ejecuta backtest con un modelo
+    download        - Descarga concurrente del histórico OHLCV
+    sweep           - Barrido de parámetros de riesgo (SL/TP/trailing/umbrales)
 """
 
 import argparse
@@ -129,6 +131,9 @@ def cmd_train(args):
         print(f"   Desde: {args.start_date or 'inicio disponible'}")
         print(f"   Hasta: {args.end_date or 'presente'}\n")
     
+    if args.full_history_features:
+        config.FEATURE_STORE_DATE_RANGES = True
+    
     # Entrenar
     learner = ContinuousLearner()
     model = learner.train_initial_model(
@@ -149,6 +154,7 @@ def cmd_train(args):
         'timeframe': args.timeframe,
         'description': args.description or f"Model trained on {', '.join(symbols)}",
         'accuracy': learner.metrics_history[-1].get('accuracy') if learner.metrics_history else None,
+        'features': list(learner.feature_extractor.feature_names),
     }
     
     if manager.save_model(model.model, learner.feature_extractor.scaler, args.name, metadata):
@@ -172,7 +178,8 @@ def cmd_backtest(args):
         return
     
     # Ejecutar backtest
-    backtester = NeuralBacktest(capital_per_pair=args.capital)
+    backtester = NeuralBacktest(capital_per_pair=args.capital,
+                                full_history_features=args.full_history_features or None)
     
     if args.symbol:
         # Backtest en un solo símbolo
@@ -181,21 +188,130 @@ def cmd_backtest(args):
             strategy,
             start_date=args.start_date,
             end_date=args.end_date,
-            timeframe=args.timeframe
+            timeframe=args.timeframe,
+            verbose=args.verbose
         )
         print(f"\n✅ Backtest completado para {args.symbol}")
     else:
         # Backtest en múltiples símbolos
         symbols = args.symbols.split(',') if args.symbols else config.DEFAULT_SYMBOLS
+        periods = None
+        if args.periods:
+            # "2020-01-01:2022-01-01,2022-01-01:" -> [('2020-01-01', '2022-01-01'), ('2022-01-01', None)]
+            periods = [tuple(p.split(':')) for p in args.periods.split(',')]
+            periods = [(start or None, end or None) for start, end in periods]
         results = backtester.backtest_multiple(
             symbols,
             start_date=args.start_date,
             end_date=args.end_date,
-            timeframe=args.timeframe
+            timeframe=args.timeframe,
+            verbose=args.verbose,
+            workers=args.workers,
+            model_name=args.model,
+            periods=periods
         )
         print(f"\n✅ Backtest completado para {len(symbols)} símbolos")
 
 
+def cmd_sweep(args):
+    """Evalúa una rejilla de parámetros de riesgo sobre las mismas predicciones"""
+    import os
+    from neural_bot.sweep import build_grid, parse_grid, run_sweep
+    
+    strategy = NeuralStrategy(model_name=args.model)
+    if strategy.model is None:
+        print("❌ No se pudo cargar el modelo")
+        return
+    
+    grids = {
+        'stop_loss_pct': args.stop_loss,
+        'take_profit_pct': args.take_profit,
+        'trailing_stop_pct': args.trailing_stop,
+        'trailing_activation_pct': args.trailing_activation,
+        'min_confidence_buy': args.min_conf_buy,
+        'min_confidence_sell': args.min_conf_sell,
+    }
+    try:
+        grid = build_grid({name: parse_grid(text) for name, text in grids.items() if text})
+    except ValueError as e:
+        print(f"❌ Rejilla inválida: {e}")
+        return
+    
+    # Predicciones una sola vez por símbolo (o desde la caché de predicciones)
+    tf = args.timeframe or config.DEFAULT_TIMEFRAME
+    symbols = args.symbols.split(',') if args.symbols else config.DEFAULT_SYMBOLS
+    backtester = NeuralBacktest(capital_per_pair=args.capital,
+                                full_history_features=args.full_history_features or None)
+    series = []
+    for symbol in symbols:
+        print(f"\n📥 {symbol} ({tf})")
+        df = backtester.load_data(symbol, tf, args.start_date, args.end_date)
+        if df is None:
+            continue
+        predictions = backtester.get_predictions(symbol, strategy, df, tf)
+        if predictions is None:
+            continue
+        start = config.LOOKBACK_WINDOW
+        series.append((symbol, df['timestamp'].values[start:], df['close'].values[start:], predictions))
+    
+    if not series:
+        print("❌ Ningún símbolo con datos suficientes")
+        return
+    
+    workers = args.workers or os.cpu_count() or 1
+    print(f"\n🔬 Barrido: {len(grid)} combinaciones x {len(series)} símbolos en {workers} procesos")
+    started = datetime.now()
+    table = run_sweep(series, grid, args.capital, workers=workers, sort_by=args.sort)
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"✅ Barrido completado en {elapsed:.1f}s")
+    
+    # Guardar ranking completo
+    output = Path(args.output) if args.output else \
+        Path(config.LOGS_DIR) / f"risk_sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(output, index=False)
+    
+    # Mostrar las mejores combinaciones
+    top = table.head(args.top)
+    headers = ['#', 'SL', 'TP', 'Trail', 'Act.', 'Conf B', 'Conf S',
+               'ROI Neto', 'Max DD', 'Peor DD', 'Sharpe', 'Win Rate', 'Trades']
+    table_data = [
+        [
+            int(row['rank']), row['stop_loss_pct'], row['take_profit_pct'], row['trailing_stop_pct'],
+            row['trailing_activation_pct'], row['min_confidence_buy'], row['min_confidence_sell'],
+            f"{row['roi_net']:.2%}", f"{row['max_drawdown']:.2%}", f"{row['worst_drawdown']:.2%}",
+            f"{row['sharpe_ratio']:.2f}", f"{row['win_rate']:.2%}", int(row['total_trades'])
+        ]
+        for _, row in top.iterrows()
+    ]
+    
+    print(f"\n🏆 Top {len(top)} por {args.sort} (medias por símbolo):\n")
+    if HAS_TABULATE:
+        print(tabulate(table_data, headers=headers, tablefmt='grid'))
+    else:
+        print(" | ".join(headers))
+        print("-" * 110)
+        for row in table_data:
+            print(" | ".join(str(cell) for cell in row))
+    
+    print(f"\n💾 Ranking completo: {output}")
+
+
+def cmd_download(args):
+    """Descarga (o reanuda) el histórico de varios símbolos en paralelo"""
+    from data_cache import DataCache
+    
+    symbols = args.symbols.split(',') if args.symbols else config.DEFAULT_SYMBOLS
+    timeframes = args.timeframes.split(',') if args.timeframes else [config.DEFAULT_TIMEFRAME]
+    
+    cache = DataCache()
+    results = cache.download_many(symbols, timeframes, max_workers=args.workers)
+    
+    failed = [f"{symbol} {tf}" for (symbol, tf), stats in results.items() if stats['error']]
+    if failed:
+        print(f"⚠️ Fallaron {len(failed)} series (vuelve a ejecutar para reanudar): {', '.join(failed)}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Neural Bot CLI - Gestión del sistema de trading neural',
@@ -233,6 +349,8 @@ def main():
     parser_train.add_argument('--end-date', help='Fecha fin datos (YYYY-MM-DD)')
     parser_train.add_argument('--description', help='Descripción del modelo')
     parser_train.add_argument('--set-default', action='store_true', help='Marcar como modelo por defecto')
+    parser_train.add_argument('--full-history-features', action='store_true',
+                              help='Con --start-date, features del histórico completo (feature store)')
     parser_train.set_defaults(func=cmd_train)
     
     # Comando: backtest
@@ -244,8 +362,46 @@ def main():
     parser_backtest.add_argument('--end-date', help='Fecha final (YYYY-MM-DD)')
     parser_backtest.add_argument('--capital', type=float, default=50, help='Capital por par (default: 50)')
     parser_backtest.add_argument('--timeframe', help='Timeframe a usar (ej: 1h, 4h). Default: Config')
+    parser_backtest.add_argument('--verbose', action='store_true', help='Muestra cada trade')
+    parser_backtest.add_argument('--workers', type=int, default=None,
+                                 help='Procesos en paralelo para varios símbolos (default: Config)')
+    parser_backtest.add_argument('--periods',
+                                 help='Períodos inicio:fin separados por comas (ej: 2020-01-01:2022-01-01,2022-01-01:)')
+    parser_backtest.add_argument('--full-history-features', action='store_true',
+                                 help='Con --start-date, features del histórico completo (feature store)')
     parser_backtest.set_defaults(func=cmd_backtest)
     
+    # Comando: download
+    parser_download = subparsers.add_parser('download', help='Descarga histórico OHLCV en paralelo')
+    parser_download.add_argument('--symbols', help='Símbolos separados por comas (default: Config)')
+    parser_download.add_argument('--timeframes', help='Timeframes separados por comas (ej: 1h,4h)')
+    parser_download.add_argument('--workers', type=int, default=4, help='Descargas simultáneas (default: 4)')
+    parser_download.set_defaults(func=cmd_download)
+    
+    # Comando: sweep
+    parser_sweep = subparsers.add_parser('sweep', help='Barrido de parámetros de riesgo')
+    parser_sweep.add_argument('--model', help='Nombre del modelo (default: usa el predeterminado)')
+    parser_sweep.add_argument('--symbols', help='Símbolos separados por comas (default: Config)')
+    parser_sweep.add_argument('--start-date', help='Fecha inicial (YYYY-MM-DD)')
+    parser_sweep.add_argument('--end-date', help='Fecha final (YYYY-MM-DD)')
+    parser_sweep.add_argument('--timeframe', help='Timeframe a usar (ej: 1h, 4h). Default: Config')
+    parser_sweep.add_argument('--capital', type=float, default=50, help='Capital por par (default: 50)')
+    parser_sweep.add_argument('--stop-loss', help='Valores de STOP_LOSS_PCT (ej: --stop-loss=-0.02,-0.04 o --stop-loss=-0.02:-0.08:-0.01)')
+    parser_sweep.add_argument('--take-profit', help='Valores de TAKE_PROFIT_PCT (ej: 0.04:0.16:0.02)')
+    parser_sweep.add_argument('--trailing-stop', help='Valores de TRAILING_STOP_PCT')
+    parser_sweep.add_argument('--trailing-activation', help='Valores de TRAILING_ACTIVATION_PCT')
+    parser_sweep.add_argument('--min-conf-buy', help='Valores de MIN_CONFIDENCE_BUY')
+    parser_sweep.add_argument('--min-conf-sell', help='Valores de MIN_CONFIDENCE_SELL')
+    parser_sweep.add_argument('--workers', type=int, default=None, help='Procesos en paralelo (default: nº de CPUs)')
+    parser_sweep.add_argument('--full-history-features', action='store_true',
+                              help='Con --start-date, features del histórico completo (feature store)')
+    parser_sweep.add_argument('--sort', default='roi_net',
+                              choices=['roi_net', 'sharpe_ratio', 'max_drawdown', 'win_rate', 'total_trades'],
+                              help='Métrica del ranking (default: roi_net)')
+    parser_sweep.add_argument('--top', type=int, default=20, help='Combinaciones a mostrar (default: 20)')
+    parser_sweep.add_argument('--output', help='CSV del ranking (default: models/logs/risk_sweep_<fecha>.csv)')
+    parser_sweep.set_defaults(func=cmd_sweep)
+    
     # Parse argumentos
     args = parser.parse_args()
     
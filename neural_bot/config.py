@@ -89,6 +89,10 @@ class NeuralConfig:
     MARKET_REGIME_FEATURES = [
         'trend_direction', 'volatility_regime', 'trend_strength',
     ]
+
+    # Peso residual admitido del valor inicial de una EMA al calcular su
+    # calentamiento (FeatureRegistry.warmup)
+    FEATURE_EMA_TOLERANCE = 1e-6
     
     # ================== ENTRENAMIENTO ==================
     
@@ -103,6 +107,10 @@ class NeuralConfig:
     
     INCREMENTAL_EPOCHS = 15
     VALIDATION_SPLIT = 0.3
+
+    # Entrenar con tf.data generando las ventanas por índice sobre las
+    # matrices 2-D de features (memoria filas x features, sin X_seq)
+    USE_STREAMING_DATASET = True
     EARLY_STOPPING_PATIENCE = 15
     RETRAIN_INTERVAL_HOURS = 24
     
@@ -127,6 +135,16 @@ class NeuralConfig:
     
     MIN_CONFIDENCE_BUY = 0.55    # Umbral mínimo de confianza para BUY
     MIN_CONFIDENCE_SELL = 0.55   # Umbral mínimo de confianza para SELL
+
+    # Features incrementales en vivo: calcula sobre el histórico completo
+    # (igual que en entrenamiento) actualizando solo las velas nuevas
+    USE_STREAMING_FEATURES = False
+
+    # Inferencia en vivo con tf.function compilada (forma fija) en lugar de model.predict
+    USE_COMPILED_INFERENCE = True
+
+    # Señales memorizadas por vela cerrada (máx. entradas en memoria)
+    SIGNAL_CACHE_SIZE = 256
     
     # ================== GESTIÓN DE RIESGO ==================
     
@@ -141,6 +159,12 @@ class NeuralConfig:
     INITIAL_CAPITAL = 50.0        # Capital inicial por símbolo
     MAX_POSITION_SIZE = 10000.0   # Límite máximo de posición para evitar crecimiento irreal
     TRADING_FEE = 0.001           # Comisión por trade (0.1% estándar, 0.075% con BNB)
+    BACKTEST_WORKERS = 1          # Procesos para backtest_multiple (1 = en serie)
+    
+    # Probabilidades del modelo por vela guardadas en disco: repetir un backtest
+    # cambiando solo parámetros de riesgo no vuelve a ejecutar el modelo
+    USE_PREDICTION_CACHE = True
+    PREDICTION_CACHE_DIR = 'data/predictions'
     
     CLASS_LABELS = {
         0: 'NO_BUY',
@@ -171,6 +195,15 @@ class NeuralConfig:
     
     DEFAULT_SYMBOLS = ['ETH/USDT', 'BTC/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT', 'DOGE/USDT', 'LINK/USDT', 'BNB/USDT']
     DEFAULT_TIMEFRAME = '4h'
+
+    # Features sin escalar del histórico completo guardadas en disco por
+    # símbolo/timeframe (entrenamiento, --mode test y backtest las reutilizan)
+    USE_FEATURE_STORE = True
+    FEATURE_STORE_DIR = 'data/features'
+    # Rangos con --start-date: True = filas del histórico completo (indicadores
+    # sin reiniciar al inicio del rango); False = calcular sobre el rango, como
+    # antes del feature store (resultados comparables con backtests anteriores)
+    FEATURE_STORE_DATE_RANGES = False
     
     # ================== OPTIMIZACIÓN ==================
     
@@ -0,0 +1,353 @@
+"""
+Feature Store - Matriz de features sin escalar persistida por símbolo/timeframe
+
+Guarda en data/features/<SYMBOL>_<TF>_<hash>/ las features sin normalizar
+(salida de FeatureExtractor.extract_raw_features) de todo el histórico de
+velas, junto con sus timestamps, en ficheros binarios fila a fila
+(timestamps.bin int64, features.bin float64; se reabren con memmap y el
+nº de filas está en meta.json). El hash identifica la configuración de
+features (indicadores y periodos).
+
+Cuando llegan velas nuevas la matriz se extiende sin recalcular el
+histórico: se guarda el estado del StreamingIndicatorEngine en la última
+vela y solo se procesan las velas nuevas (más la última guardada, por si
+seguía abierta). En disco solo se escriben esas filas, como en el almacén
+columnar de DataCache. El motor reproduce bit a bit el cálculo batch,
+incluidos los acumulados (OBV, VWAP) que un recálculo parcial no podría
+reproducir. La meta guarda un hash del OHLCV de las velas cerradas: si el
+histórico se reescribió, se recalcula todo.
+
+Además de las features de Config se guardan los acumulados de los que
+dependen (OBV y las sumas del VWAP, ver FeatureRegistry.accumulators):
+get_seeds los devuelve en una vela para que la predicción en vivo calcule
+solo las últimas velas sembrándolos.
+
+Las filas se calculan siempre sobre el histórico completo. Un rango que
+empieza en la primera vela da las mismas filas que calcularlo aparte; uno
+que empieza después (--start-date) solo se toma de esta matriz con
+Config.FEATURE_STORE_DATE_RANGES (los indicadores no se reinician al
+principio del rango).
+
+Uso:
+    store = FeatureStore()
+    X_raw = store.get_features('ETH/USDT', '4h', history, feature_extractor, df=df_rango)
+    X = feature_extractor.scale_features(X_raw)
+    seeds = store.get_seeds('ETH/USDT', '4h', df_ultimas, feature_extractor.seed_columns())
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .config import config
+
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class FeatureStore:
+    """Features sin escalar en disco, extendidas incrementalmente"""
+
+    # Subir si cambia el cálculo de features o el formato de los ficheros
+    VERSION = 3
+
+    def __init__(self, store_dir=None):
+        """
+        Args:
+            store_dir: Directorio del almacén (default: Config.FEATURE_STORE_DIR)
+        """
+        self.store_dir = Path(store_dir or config.FEATURE_STORE_DIR)
+        self.hits = 0
+        self.extensions = 0
+        self.builds = 0
+
+    @staticmethod
+    def feature_config():
+        """Parámetros de configuración que determinan las features"""
+        return {
+            'version': FeatureStore.VERSION,
+            'technical_indicators': config.TECHNICAL_INDICATORS,
+            'price_features': config.PRICE_FEATURES,
+            'volume_features': config.VOLUME_FEATURES,
+            'cross_features': config.CROSS_FEATURES,
+            'market_regime_features': config.MARKET_REGIME_FEATURES,
+        }
+
+    @classmethod
+    def config_hash(cls):
+        return hashlib.sha256(json.dumps(cls.feature_config(), sort_keys=True).encode()).hexdigest()[:12]
+
+    def get_path(self, symbol, timeframe):
+        """Directorio de las features de un símbolo con la configuración actual"""
+        safe_symbol = symbol.replace('/', '_')
+        return self.store_dir / f"{safe_symbol}_{timeframe}_{self.config_hash()}"
+
+    @staticmethod
+    def _to_epoch_ms(timestamps):
+        return np.asarray(timestamps).astype('datetime64[ms]').astype(np.int64)
+
+    @staticmethod
+    def _candle_values(history, i):
+        return [float(history[col].iloc[i]) for col in OHLCV_COLUMNS[1:]]
+
+    @staticmethod
+    def _ohlcv_hash(history, rows):
+        """Hash del OHLCV de las primeras rows velas (detecta velas reescritas)"""
+        h = hashlib.sha256()
+        for col in OHLCV_COLUMNS[1:]:
+            h.update(np.ascontiguousarray(history[col].values[:rows], dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    def _load(self, path):
+        """(timestamps, features, meta) en memmap, o None si no hay almacén válido"""
+        meta_file = path / 'meta.json'
+        if not meta_file.exists():
+            return None
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            if meta.get('version') != self.VERSION or meta['rows'] == 0:
+                return None
+            shape = (meta['rows'], len(meta['columns']))
+            timestamps = np.memmap(path / 'timestamps.bin', dtype=np.int64, mode='r', shape=shape[:1])
+            features = np.memmap(path / 'features.bin', dtype=np.float64, mode='r', shape=shape)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Feature store inválido ({path.name}): {e}")
+            return None
+        return timestamps, features, meta
+
+    def _load_engine(self, path):
+        try:
+            with open(path / 'engine.pkl', 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+    def _save(self, path, symbol, timeframe, start, timestamps, features, columns, history, engine=None):
+        """
+        Escribe las filas desde start, el estado del motor y la meta
+
+        Solo se escriben las filas nuevas (start = 0 en un cálculo completo).
+        La meta se borra antes y se escribe al final: valida el resto.
+
+        Args:
+            start: Primera fila a escribir (las anteriores ya están en disco)
+            timestamps, features: Filas desde start
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        (path / 'meta.json').unlink(missing_ok=True)
+
+        for name, array, dtype in [('timestamps', timestamps, np.int64), ('features', features, np.float64)]:
+            data = np.ascontiguousarray(array, dtype=dtype)
+            row_bytes = data.itemsize * (data.shape[1] if data.ndim == 2 else 1)
+            with open(path / f'{name}.bin', 'r+b' if start > 0 else 'wb') as f:
+                f.seek(start * row_bytes)
+                f.write(data.tobytes())
+                # Descartar restos de una escritura interrumpida
+                f.truncate((start + len(data)) * row_bytes)
+
+        engine_path = path / 'engine.pkl'
+        if engine is not None:
+            tmp_path = path / 'engine.pkl.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(engine, f, protocol=4)
+            os.replace(tmp_path, engine_path)
+        else:
+            engine_path.unlink(missing_ok=True)
+
+        meta = {
+            'version': self.VERSION,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'columns': list(columns),
+            'features': self.feature_config(),
+            'rows': start + len(timestamps),
+            'first_candle': str(history['timestamp'].iloc[0]),
+            'last_candle': str(history['timestamp'].iloc[-1]),
+            # La última vela puede seguir abierta: se compara aparte
+            'ohlcv_hash': self._ohlcv_hash(history, len(history) - 1),
+            'last_candle_ohlcv': self._candle_values(history, len(history) - 1),
+            'updated': datetime.now().isoformat(),
+        }
+        tmp_path = path / 'meta.json.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, path / 'meta.json')
+
+    def update(self, symbol, timeframe, history, feature_extractor):
+        """
+        Sincroniza el almacén con el histórico de velas
+
+        - Sin almacén (o si alguna vela guardada cambió): cálculo completo
+        - Con velas nuevas: extiende con el motor incremental
+        - Sin cambios: lee directamente de disco
+
+        Args:
+            symbol: Par de trading
+            timeframe: Timeframe
+            history: DataFrame OHLCV completo y ordenado (DataCache)
+            feature_extractor: FeatureExtractor (calcula las features)
+
+        Returns:
+            (timestamps, features, columns): epoch ms (n,), features sin
+            escalar (n, n_features) y nombres de columnas
+        """
+        path = self.get_path(symbol, timeframe)
+        timestamps = self._to_epoch_ms(history['timestamp'])
+        stored = self._load(path)
+
+        if stored is not None:
+            stored_ts, stored_X, meta = stored
+            n = len(stored_ts)
+            # Velas cerradas guardadas: mismas marcas de tiempo y mismo OHLCV
+            same_history = (0 < n <= len(timestamps) and np.array_equal(timestamps[:n], stored_ts)
+                            and self._ohlcv_hash(history, n - 1) == meta.get('ohlcv_hash'))
+
+            if not same_history:
+                print(f"⚠️ Velas de {symbol} cambiadas desde el último cálculo de features")
+            elif n == len(timestamps) and self._candle_values(history, n - 1) == meta['last_candle_ohlcv']:
+                self.hits += 1
+                return stored_ts, stored_X, meta['columns']
+            else:
+                extended = self._extend(path, history, meta, feature_extractor)
+                if extended is not None:
+                    self.extensions += 1
+                    del stored, stored_ts, stored_X  # cerrar los memmap antes de escribir
+                    self._save(path, symbol, timeframe, n - 1, timestamps[n - 1:], extended[0],
+                               meta['columns'], history, engine=extended[1])
+                    print(f"💾 Features de {symbol} extendidas: +{len(timestamps) - n} velas")
+                    return self._load(path)[:2] + (meta['columns'],)
+
+        print(f"🔧 Calculando features de {symbol} ({len(history)} velas) para el feature store...")
+        columns = self.stored_columns(feature_extractor)
+        X = feature_extractor.extract_raw_features(history, feature_names=columns)
+
+        shutil.rmtree(path, ignore_errors=True)
+        self._save(path, symbol, timeframe, 0, timestamps, X, columns, history)
+        self.builds += 1
+        return self._load(path)[:2] + (columns,)
+
+    def _extend(self, path, history, meta, feature_extractor):
+        """
+        Filas nuevas con el motor incremental (la última guardada se recalcula)
+
+        Returns:
+            (filas desde la última guardada, engine) o None si el motor no
+            produce las mismas columnas
+        """
+        n = meta['rows']
+        engine = self._load_engine(path)
+        if engine is None or engine.feature_names != meta['columns']:
+            # Primera extensión: el estado se construye una vez sobre el histórico guardado
+            engine = feature_extractor.create_stream(feature_names=meta['columns'])
+            if not set(engine.feature_names) <= set(engine.columns):
+                return None
+            engine.warm_up(history.iloc[:n - 1])
+
+        vectors = []
+        for candle in history.iloc[n - 1:][OHLCV_COLUMNS].itertuples(index=False, name=None):
+            engine.update(candle)
+            vectors.append(engine.window(1)[0])
+
+        return np.vstack(vectors), engine
+
+    @staticmethod
+    def stored_columns(feature_extractor):
+        """Features de Config seguidas de los acumulados que no son features"""
+        columns = feature_extractor.default_feature_names()
+        return columns + [name for name in feature_extractor.seed_columns(columns) if name not in columns]
+
+    @staticmethod
+    def is_date_range(history, df):
+        """True si df empieza después de la primera vela de history"""
+        return df is not None and len(df) > 0 and df['timestamp'].iloc[0] > history['timestamp'].iloc[0]
+
+    def get_features(self, symbol, timeframe, history, feature_extractor, df=None, date_ranges=None):
+        """
+        Features sin escalar de las velas de df (o de todo el histórico)
+
+        El almacén guarda las features de Config; si el modelo cargado usa
+        otra lista (feature_extractor.model_features) se devuelven solo esas
+        columnas. Deja en feature_extractor.feature_names las columnas devueltas.
+
+        Args:
+            df: Subconjunto contiguo de history (ej: filtrado por fechas)
+            date_ranges: Servir también rangos que empiezan después de la
+                primera vela (default: Config.FEATURE_STORE_DATE_RANGES)
+
+        Returns:
+            np.ndarray (len(df), n_features) o None si df no es un tramo
+            contiguo de history, es un rango de fechas sin date_ranges o el
+            almacén no tiene las features del modelo
+        """
+        date_ranges = config.FEATURE_STORE_DATE_RANGES if date_ranges is None else date_ranges
+        if not date_ranges and self.is_date_range(history, df):
+            return None
+
+        timestamps, features, columns = self.update(symbol, timeframe, history, feature_extractor)
+
+        wanted = feature_extractor.model_features or feature_extractor.default_feature_names()
+        if not set(wanted) <= set(columns):
+            return None
+        feature_extractor.feature_names = list(wanted)
+        wanted_idx = [columns.index(name) for name in wanted]
+
+        if df is None:
+            return features[:, wanted_idx]
+        if len(df) == 0:
+            return None
+
+        rows = self._to_epoch_ms(df['timestamp'])
+        start = int(np.searchsorted(timestamps, rows[0]))
+        end = start + len(rows)
+        if end > len(timestamps) or not np.array_equal(timestamps[start:end], rows):
+            return None
+        return features[start:end, wanted_idx]
+
+    def get_seeds(self, symbol, timeframe, df, names):
+        """
+        Valores guardados de los acumulados names en la primera vela de df
+
+        No actualiza el almacén (no lee el histórico completo): basta con que
+        la primera vela de df esté guardada y cerrada y que las velas
+        guardadas desde ahí coincidan con las de df.
+
+        Args:
+            df: Últimas velas sobre las que se van a calcular las features
+            names: Acumulados (FeatureExtractor.seed_columns)
+
+        Returns:
+            dict {nombre: valor} o None si el almacén no cubre esa vela
+        """
+        stored = self._load(self.get_path(symbol, timeframe))
+        if stored is None or len(df) == 0:
+            return None
+        timestamps, features, meta = stored
+        if not set(names) <= set(meta['columns']):
+            return None
+
+        rows = self._to_epoch_ms(df['timestamp'])
+        start = int(np.searchsorted(timestamps, rows[0]))
+        # La última fila guardada puede ser de una vela que seguía abierta
+        end = min(start + len(rows), len(timestamps) - 1)
+        if end <= start or not np.array_equal(timestamps[start:end], rows[:end - start]):
+            return None
+        return {name: float(features[start, meta['columns'].index(name)]) for name in names}
+
+    def clear(self):
+        """Elimina todas las features guardadas"""
+        if not self.store_dir.exists():
+            return 0
+
+        removed = 0
+        for path in self.store_dir.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path)
+                removed += 1
+        return removed
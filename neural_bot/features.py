@@ -0,0 +1,424 @@
+"""
+Feature Registry - Grafo de dependencias de las features del modelo
+
+Cada feature (o resultado intermedio) se registra con:
+    - inputs: columnas OHLCV u otras features de las que depende
+    - compute: función que recibe las Series de inputs y devuelve la Series
+    - warmup: velas anteriores que lee además de las de sus inputs
+      (None = acumulado desde la primera vela: OBV, sumas del VWAP)
+
+A partir de una lista de features (la guardada en la metadata del modelo,
+o la de Config) se resuelve el subgrafo mínimo y solo se calculan esos
+nodos, en orden de dependencias. Los nodos internos empiezan por '_' y no
+son features del modelo.
+
+Los cálculos reproducen exactamente los de FeatureExtractor (los métodos
+calculate_* usan este registro).
+
+Los acumulados se pueden sembrar con su valor en la primera vela
+(compute(seeds=...)): así las features que dependen de ellos también se
+calculan sobre las últimas velas igual que sobre el histórico completo.
+
+Uso:
+    registry = FeatureRegistry()
+    columns = registry.compute(df, ['rsi', 'atr', 'volatility_regime'])
+    registry.warmup('ema_trend')   # velas de calentamiento
+    registry.window_warmup(['rsi', 'ema_slow'])
+    registry.accumulators(['obv', 'vwap'])   # estado a sembrar en las últimas velas
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from .config import config
+
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+EMA_FEATURES = ['ema_fast', 'ema_slow', 'ema_trend']
+
+
+def ema_warmup(span, tolerance=None):
+    """
+    Velas para que una EMA (adjust=False) olvide su valor inicial
+
+    El peso del valor inicial tras n velas es (1 - alpha)^n; se devuelve el
+    menor n con peso <= tolerance.
+    """
+    tolerance = config.FEATURE_EMA_TOLERANCE if tolerance is None else tolerance
+    alpha = 2 / (span + 1)
+    return int(math.ceil(math.log(tolerance) / math.log(1 - alpha)))
+
+
+class FeatureSpec:
+    """Definición de un nodo del grafo de features"""
+
+    __slots__ = ('name', 'inputs', 'compute', 'warmup', 'group')
+
+    def __init__(self, name, inputs, compute, warmup=0, group='technical'):
+        self.name = name
+        self.inputs = list(inputs)
+        self.compute = compute
+        self.warmup = warmup
+        self.group = group
+
+    @property
+    def internal(self):
+        return self.name.startswith('_')
+
+
+class FeatureRegistry:
+    """Features configuradas en NeuralConfig con sus dependencias"""
+
+    def __init__(self):
+        self.features = {}
+        self._warmups = {}
+        self._register_technical()
+        self._register_price()
+        self._register_regime()
+
+    def register(self, name, inputs, compute, warmup=0, group='technical'):
+        """Registra un nodo (el orden de registro es el orden de columnas del cálculo batch)"""
+        self.features[name] = FeatureSpec(name, inputs, compute, warmup, group)
+        self._warmups.clear()
+
+    # ================== DEFINICIONES ==================
+
+    def _register_technical(self):
+        ind = config.TECHNICAL_INDICATORS
+
+        # EMAs + slope (delta de 3 periodos normalizado por la EMA)
+        for name, period in ind.items():
+            if name in EMA_FEATURES:
+                self.register(name, ['close'],
+                              lambda close, p=period: close.ewm(span=p, adjust=False).mean(),
+                              warmup=ema_warmup(period))
+                self.register(f'{name}_slope', [name], lambda ema: (ema.diff(3) / ema) * 100, warmup=3)
+
+        if 'rsi' in ind:
+            self.register('rsi', ['close'], lambda close, p=ind['rsi']: _rsi(close, p), warmup=ind['rsi'])
+
+        if 'atr' in ind or 'adx' in ind:
+            self.register('_true_range', ['high', 'low', 'close'], _true_range, warmup=1)
+            period = ind.get('atr', ind.get('adx'))
+            self.register('atr', ['_true_range'],
+                          lambda tr, p=period: tr.rolling(window=p).mean(), warmup=period - 1)
+
+        if 'adx' in ind:
+            period = ind['adx']
+            self.register('_dx', ['high', 'low', 'atr'],
+                          lambda high, low, atr, p=period: _dx(high, low, atr, p), warmup=period)
+            self.register('adx', ['_dx'], lambda dx, p=period: dx.rolling(window=p).mean(), warmup=period - 1)
+
+        if all(k in ind for k in ['macd_fast', 'macd_slow', 'macd_signal']):
+            fast, slow, signal = ind['macd_fast'], ind['macd_slow'], ind['macd_signal']
+            self.register('_macd_ema_fast', ['close'],
+                          lambda close: close.ewm(span=fast, adjust=False).mean(), warmup=ema_warmup(fast))
+            self.register('_macd_ema_slow', ['close'],
+                          lambda close: close.ewm(span=slow, adjust=False).mean(), warmup=ema_warmup(slow))
+            self.register('macd_line', ['_macd_ema_fast', '_macd_ema_slow'], lambda f, s: f - s)
+            self.register('macd_signal', ['macd_line'],
+                          lambda line: line.ewm(span=signal, adjust=False).mean(), warmup=ema_warmup(signal))
+            self.register('macd_histogram', ['macd_line', 'macd_signal'], lambda line, sig: line - sig)
+
+        if 'bb_period' in ind and 'bb_std' in ind:
+            period, std_dev = ind['bb_period'], ind['bb_std']
+            self.register('bb_middle', ['close'],
+                          lambda close: close.rolling(window=period).mean(), warmup=period - 1)
+            self.register('_bb_std', ['close'],
+                          lambda close: close.rolling(window=period).std(), warmup=period - 1)
+            self.register('bb_upper', ['bb_middle', '_bb_std'], lambda mid, std: mid + (std * std_dev))
+            self.register('bb_lower', ['bb_middle', '_bb_std'], lambda mid, std: mid - (std * std_dev))
+            # %B: Posición relativa dentro de las bandas; Bandwidth: ancho (volatilidad)
+            self.register('bb_percent', ['close', 'bb_upper', 'bb_lower'],
+                          lambda close, upper, lower: (close - lower) / (upper - lower))
+            self.register('bb_bandwidth', ['bb_upper', 'bb_lower', 'bb_middle'],
+                          lambda upper, lower, mid: (upper - lower) / mid)
+
+        if 'stoch_k' in ind and 'stoch_d' in ind:
+            k_period, d_period = ind['stoch_k'], ind['stoch_d']
+            self.register('_stoch_low', ['low'],
+                          lambda low: low.rolling(window=k_period).min(), warmup=k_period - 1)
+            self.register('_stoch_high', ['high'],
+                          lambda high: high.rolling(window=k_period).max(), warmup=k_period - 1)
+            self.register('stoch_k', ['close', '_stoch_low', '_stoch_high'],
+                          lambda close, low_min, high_max: 100 * (close - low_min) / (high_max - low_min))
+            self.register('stoch_d', ['stoch_k'],
+                          lambda k: k.rolling(window=d_period).mean(), warmup=d_period - 1)
+
+        if 'cci' in ind or 'vwap' in config.VOLUME_FEATURES:
+            self.register('_typical_price', ['high', 'low', 'close'],
+                          lambda high, low, close: (high + low + close) / 3)
+
+        if 'cci' in ind:
+            self.register('cci', ['_typical_price'], lambda tp, p=ind['cci']: _cci(tp, p), warmup=ind['cci'] - 1)
+
+        if 'vwap' in config.VOLUME_FEATURES:
+            # Sumas acumuladas por separado: son el estado que se siembra (ver compute)
+            self.register('_vwap_pv', ['_typical_price', 'volume'],
+                          lambda tp, volume: (tp * volume).cumsum(), warmup=None)
+            self.register('_vwap_volume', ['volume'], lambda volume: volume.cumsum(), warmup=None)
+            self.register('vwap', ['_vwap_pv', '_vwap_volume'], lambda pv, volume: pv / volume)
+
+        if 'obv' in config.VOLUME_FEATURES:
+            self.register('obv', ['close', 'volume'], _obv, warmup=None)
+
+        if 'volume_ratio' in config.VOLUME_FEATURES:
+            self.register('volume_ratio', ['volume'],
+                          lambda volume: volume / volume.rolling(window=20).mean(), warmup=19)
+
+    def _register_price(self):
+        price = config.PRICE_FEATURES
+        if 'returns' in price:
+            self.register('returns', ['close'], lambda close: close.pct_change(), warmup=1, group='price')
+        if 'log_returns' in price:
+            self.register('log_returns', ['close'], lambda close: np.log(close / close.shift(1)),
+                          warmup=1, group='price')
+        if 'volatility' in price:
+            self.register('volatility', ['close'], lambda close: close.pct_change().rolling(window=20).std(),
+                          warmup=20, group='price')
+        if 'hl_ratio' in price:
+            self.register('hl_ratio', ['high', 'low', 'close'],
+                          lambda high, low, close: (high - low) / close, group='price')
+        if 'oc_ratio' in price:
+            self.register('oc_ratio', ['open', 'close'],
+                          lambda open_, close: (close - open_) / open_, group='price')
+        if 'volume_change' in price:
+            self.register('volume_change', ['volume'], lambda volume: volume.pct_change(), warmup=1, group='price')
+
+        # Cross features
+        if not hasattr(config, 'CROSS_FEATURES'):
+            return
+        cross = config.CROSS_FEATURES
+        if 'ema_cross' in cross and 'ema_fast' in self.features and 'ema_slow' in self.features:
+            self.register('ema_cross', ['ema_fast', 'ema_slow', 'close'],
+                          lambda fast, slow, close: (fast - slow) / close, group='price')
+        if 'price_to_ema_fast' in cross and 'ema_fast' in self.features:
+            self.register('price_to_ema_fast', ['close', 'ema_fast'],
+                          lambda close, ema: (close - ema) / close, group='price')
+        if 'price_to_ema_slow' in cross and 'ema_slow' in self.features:
+            self.register('price_to_ema_slow', ['close', 'ema_slow'],
+                          lambda close, ema: (close - ema) / close, group='price')
+        if 'ema_trend' in self.features:
+            self.register('dist_to_trend', ['close', 'ema_trend'],
+                          lambda close, ema: (close - ema) / ema, group='price')
+
+    def _register_regime(self):
+        # Bull (1) vs Bear (0)
+        if 'ema_trend' in self.features:
+            self.register('trend_direction', ['close', 'ema_trend'],
+                          lambda close, ema: (close > ema).astype(float), group='regime')
+        # Volatilidad relativa normalizada con min/max de 50 periodos
+        if 'atr' in self.features:
+            self.register('volatility_regime', ['atr', 'close'], _volatility_regime, warmup=49, group='regime')
+        # Trending (1) vs Lateral (0)
+        if 'adx' in self.features:
+            self.register('trend_strength', ['adx'], lambda adx: (adx > 25).astype(float), group='regime')
+
+    # ================== GRAFO ==================
+
+    def outputs(self):
+        """Features (no internas) que se pueden calcular con la configuración actual"""
+        return [name for name, spec in self.features.items() if not spec.internal]
+
+    def resolve(self, names):
+        """
+        Nodos necesarios para calcular names, en orden de dependencias
+
+        Raises:
+            ValueError: si alguna feature no está registrada
+        """
+        order = []
+        seen = set()
+
+        def visit(name):
+            if name in seen or name in OHLCV_COLUMNS:
+                return
+            spec = self.features.get(name)
+            if spec is None:
+                raise ValueError(f"Feature desconocida para la configuración actual: {name}")
+            seen.add(name)
+            for inp in spec.inputs:
+                visit(inp)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def compute(self, df, names, reuse=(), seeds=None):
+        """
+        Calcula solo los nodos necesarios para names
+
+        Args:
+            df: DataFrame OHLCV
+            names: Features pedidas
+            reuse: Columnas de df que ya contienen nodos calculados
+            seeds: dict {acumulado: valor en la primera vela de df sobre el
+                histórico completo}. Los acumulados sembrados continúan ese
+                valor en vez de empezar en df (ver accumulators)
+
+        Returns:
+            dict {nombre: Series} con names y sus dependencias
+        """
+        seeds = seeds or {}
+        columns = {col: df[col] for col in OHLCV_COLUMNS if col in df.columns}
+        for col in reuse:
+            columns[col] = df[col]
+
+        for name in self.resolve(names):
+            if name not in columns:
+                spec = self.features[name]
+                columns[name] = spec.compute(*[columns[inp] for inp in spec.inputs])
+                if name in seeds:
+                    columns[name] = columns[name] + (seeds[name] - columns[name].iloc[0])
+        return columns
+
+    def assign(self, df, group):
+        """
+        Añade a una copia de df las features de un grupo
+
+        Los inputs de otros grupos solo se usan si ya están en df (mismo
+        comportamiento que los métodos calculate_* encadenados).
+        """
+        result = df.copy()
+        available = set(df.columns) | set(OHLCV_COLUMNS)
+
+        def ready(name):
+            if name in available:
+                return True
+            spec = self.features[name]
+            return spec.group == group and all(ready(inp) for inp in spec.inputs)
+
+        names = [name for name, spec in self.features.items()
+                 if spec.group == group and not spec.internal and ready(name)]
+        reuse = [col for col in df.columns if col in self.features]
+        columns = self.compute(df, names, reuse=reuse)
+        for name in names:
+            result[name] = columns[name]
+        return result
+
+    def window_warmup(self, names, seeded=False):
+        """
+        Velas de calentamiento para calcular names igual que sobre el histórico completo
+
+        Args:
+            seeded: Los acumulados se siembran (compute(seeds=...)) y no
+                necesitan calentamiento
+
+        Returns:
+            int (el mayor warmup de names), o None si alguna es acumulada sin sembrar
+        """
+        warmups = [self.warmup(name, seeded=seeded) for name in names]
+        if None in warmups:
+            return None
+        return max(warmups, default=0)
+
+    def cumulative(self, names):
+        """Features de names que dependen de todo el histórico (sin warmup finito)"""
+        return [name for name in names if self.warmup(name) is None]
+
+    def accumulators(self, names):
+        """
+        Nodos acumulados de los que dependen names (OBV, sumas del VWAP)
+
+        Son los valores que hay que sembrar para calcular names sobre las
+        últimas velas igual que sobre el histórico completo.
+        """
+        return [name for name in self.resolve(names) if self.features[name].warmup is None]
+
+    def warmup(self, name, seeded=False):
+        """
+        Velas anteriores que necesita una feature (sumando su cadena de dependencias)
+
+        Args:
+            seeded: Contar los acumulados como sembrados (warmup 0)
+
+        Returns:
+            int, o None si depende de todo el histórico (acumulados sin sembrar)
+        """
+        if name in OHLCV_COLUMNS:
+            return 0
+        key = (name, seeded)
+        if key not in self._warmups:
+            spec = self.features.get(name)
+            if spec is None:
+                raise ValueError(f"Feature desconocida para la configuración actual: {name}")
+            inputs = [self.warmup(inp, seeded=seeded) for inp in spec.inputs]
+            if None in inputs:
+                self._warmups[key] = None
+            elif spec.warmup is None:
+                self._warmups[key] = 0 if seeded else None
+            else:
+                self._warmups[key] = spec.warmup + max(inputs, default=0)
+        return self._warmups[key]
+
+
+# ================== CÁLCULOS ==================
+
+def _rsi(close, period):
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def _true_range(high, low, close):
+    high_low = high - low
+    high_close = np.abs(high - close.shift())
+    low_close = np.abs(low - close.shift())
+    ranges = pd.concat([high_low, high_close, low_close], axis=1)
+    return ranges.max(axis=1)
+
+
+def _dx(high, low, atr, period):
+    high_diff = high.diff()
+    low_diff = -low.diff()
+
+    plus_dm = high_diff.where((high_diff > low_diff) & (high_diff > 0), 0)
+    minus_dm = low_diff.where((low_diff > high_diff) & (low_diff > 0), 0)
+
+    plus_di = 100 * (plus_dm.rolling(window=period).mean() / atr)
+    minus_di = 100 * (minus_dm.rolling(window=period).mean() / atr)
+
+    return 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+
+
+def _rolling_mad(values, period):
+    """Desviación absoluta media respecto a la media de cada ventana (NaN hasta completarla)"""
+    values = np.asarray(values, dtype=np.float64)
+    mad = np.full(len(values), np.nan)
+    if len(values) >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(values, period)
+        mad[period - 1:] = np.abs(windows - windows.mean(axis=1, keepdims=True)).mean(axis=1)
+    return mad
+
+
+def _cci(tp, period):
+    sma_tp = tp.rolling(window=period).mean()
+    mad = pd.Series(_rolling_mad(tp, period), index=tp.index)
+    return (tp - sma_tp) / (0.015 * mad)
+
+
+def _obv(close, volume):
+    # +volumen si sube el cierre, -volumen si baja, sin cambio si es igual
+    direction = np.sign(close.diff().to_numpy())
+    flow = np.where(direction > 0, volume.to_numpy(), 0.0)
+    flow = np.where(direction < 0, -volume.to_numpy(), flow)
+    return pd.Series(np.cumsum(flow), index=close.index, dtype=np.float64)
+
+
+def _volatility_regime(atr, close):
+    vol_raw = atr / close
+
+    vol_min = vol_raw.rolling(window=50, min_periods=1).min()
+    vol_max = vol_raw.rolling(window=50, min_periods=1).max()
+
+    # Evitar división por cero
+    vol_range = vol_max - vol_min
+    vol_range = vol_range.replace(0, 1)
+
+    return ((vol_raw - vol_min) / vol_range).fillna(0.5)  # Neutral si no hay datos
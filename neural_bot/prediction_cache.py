@@ -0,0 +1,186 @@
+"""
+Prediction Cache - Probabilidades del modelo persistidas en disco para backtests
+
+Guarda la matriz de probabilidades por vela (n_velas, n_clases) que produce
+el modelo en un backtest, en formato .npy (se reabre con memmap), bajo una
+clave derivada de:
+    - los pesos del modelo
+    - el scaler
+    - la configuración de features (indicadores, lookback)
+    - el símbolo, timeframe y el contenido exacto de las velas del rango
+    - las velas anteriores al rango, si sus features salen del feature store
+
+Si se repite un backtest cambiando solo parámetros de riesgo (SL/TP,
+umbrales de confianza, trailing...) la clave no cambia y no se vuelve a
+extraer features ni a ejecutar el modelo.
+
+Uso:
+    cache = PredictionCache()
+    key, meta = cache.make_key(strategy, df, 'ETH/USDT', '4h')
+    predictions = cache.load(key)
+    if predictions is None:
+        predictions = strategy.model.predict(X_seq)
+        cache.save(key, predictions, meta)
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .config import config
+
+
+class PredictionCache:
+    """Caché en disco de predicciones de backtest (una matriz .npy por clave)"""
+
+    # Subir si cambia el cálculo de features o la forma de las predicciones
+    VERSION = 1
+
+    def __init__(self, cache_dir=None):
+        """
+        Args:
+            cache_dir: Directorio de la caché (default: Config.PREDICTION_CACHE_DIR)
+        """
+        self.cache_dir = Path(cache_dir or config.PREDICTION_CACHE_DIR)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def model_fingerprint(model):
+        """Hash de la arquitectura de entrada/salida y de todos los pesos del modelo"""
+        h = hashlib.sha256()
+        h.update(repr((model.input_shape, model.output_shape)).encode())
+        for weights in model.get_weights():
+            weights = np.ascontiguousarray(weights)
+            h.update(repr((weights.shape, weights.dtype.str)).encode())
+            h.update(weights.tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def scaler_fingerprint(scaler):
+        """Hash del scaler ajustado"""
+        return hashlib.sha256(pickle.dumps(scaler, protocol=4)).hexdigest()
+
+    @staticmethod
+    def data_fingerprint(df):
+        """Hash de las velas (timestamp + OHLCV) del rango usado"""
+        h = hashlib.sha256()
+        timestamps = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+        h.update(np.ascontiguousarray(timestamps).tobytes())
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            h.update(np.ascontiguousarray(df[col].values, dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def feature_config():
+        """Parámetros de configuración que determinan las features"""
+        return {
+            'lookback': config.LOOKBACK_WINDOW,
+            'technical_indicators': config.TECHNICAL_INDICATORS,
+            'price_features': config.PRICE_FEATURES,
+            'volume_features': config.VOLUME_FEATURES,
+            'cross_features': config.CROSS_FEATURES,
+            'market_regime_features': config.MARKET_REGIME_FEATURES,
+        }
+
+    def make_key(self, strategy, df, symbol, timeframe, history=None):
+        """
+        Calcula la clave de las predicciones de un backtest
+
+        Args:
+            strategy: NeuralStrategy con modelo y scaler cargados
+            df: DataFrame OHLCV del rango (ya filtrado por fechas)
+            symbol: Par de trading
+            timeframe: Timeframe
+            history: Histórico completo si las features salen del feature
+                store (los indicadores del rango dependen de las velas
+                anteriores, que entran en la clave)
+
+        Returns:
+            (key, meta): clave hexadecimal y dict con los componentes de la clave
+        """
+        meta = {
+            'version': self.VERSION,
+            'model': self.model_fingerprint(strategy.model),
+            'scaler': self.scaler_fingerprint(strategy.feature_extractor.scaler),
+            'features': self.feature_config(),
+            'model_features': strategy.feature_extractor.model_features,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'first_candle': str(df['timestamp'].iloc[0]),
+            'last_candle': str(df['timestamp'].iloc[-1]),
+            'candles': len(df),
+            'data': self.data_fingerprint(df),
+            'feature_store': history is not None,
+        }
+        if history is not None:
+            previous = history[history['timestamp'] < df['timestamp'].iloc[0]]
+            if len(previous) > 0:
+                meta['history'] = self.data_fingerprint(previous)
+        key = hashlib.sha256(json.dumps(meta, sort_keys=True).encode()).hexdigest()[:32]
+        return key, meta
+
+    def _paths(self, key):
+        return self.cache_dir / f'{key}.npy', self.cache_dir / f'{key}.json'
+
+    def load(self, key):
+        """
+        Predicciones guardadas para la clave (memmap de solo lectura)
+
+        Returns:
+            np.ndarray (n_velas, n_clases) o None si no están en caché
+        """
+        array_path, _ = self._paths(key)
+        if not array_path.exists():
+            self.misses += 1
+            return None
+
+        try:
+            predictions = np.load(array_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Predicciones en caché inválidas ({array_path.name}): {e}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return predictions
+
+    def save(self, key, predictions, meta=None):
+        """
+        Guarda las predicciones (escritura atómica)
+
+        Args:
+            key: Clave de make_key
+            predictions: Array (n_velas, n_clases)
+            meta: Componentes de la clave (se guardan junto al .npy como referencia)
+        """
+        array_path, meta_path = self._paths(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = array_path.with_name(array_path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(predictions))
+        os.replace(tmp_path, array_path)
+
+        info = dict(meta or {})
+        info['shape'] = list(np.shape(predictions))
+        info['created'] = datetime.now().isoformat()
+        with open(meta_path, 'w') as f:
+            json.dump(info, f, indent=2)
+
+    def clear(self):
+        """Elimina todas las predicciones en caché"""
+        if not self.cache_dir.exists():
+            return 0
+
+        removed = 0
+        for path in self.cache_dir.glob('*.npy'):
+            path.unlink()
+            path.with_suffix('.json').unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -0,0 +1,277 @@
+"""
+Trade Simulator - Núcleo de simulación del backtest sobre arrays NumPy
+
+Reproduce la lógica de trading de NeuralBacktest (entrada por BUY, salida
+por Take Profit / Señal SELL / Stop Loss / Trailing Stop, comisiones y
+compounding) sin recorrer el DataFrame vela a vela: las señales se calculan
+de golpe, la vela de salida de cada BUY candidato se busca con operaciones
+vectorizadas sobre una ventana, y el encadenado de trades (que depende del
+capital) solo hace aritmética escalar.
+
+Uso:
+    trades, equity = simulate_trades(timestamps, closes, probs, capital_per_pair=50)
+"""
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from .config import config
+
+
+TRADE_COLUMNS = [
+    'symbol', 'entry_time', 'exit_time', 'entry_price', 'exit_price', 'size',
+    'gross_pnl', 'fees', 'profit', 'profit_pct', 'exit_reason', 'entry_confidence'
+]
+
+EXIT_REASONS = ['Take Profit', 'Señal SELL', 'Stop Loss', 'Trailing Stop']
+
+# Velas tras cada BUY candidato en las que se busca la salida de forma
+# vectorizada; las salidas más lejanas se buscan después por bloques
+EXIT_WINDOW = 64
+
+# BUY candidatos procesados a la vez (acota la memoria: bloque x ventana)
+EXIT_BLOCK_ENTRIES = 2048
+
+
+def signals_from_probs(probs, min_confidence_buy=None, min_confidence_sell=None):
+    """
+    Señales BUY/SELL de un array de probabilidades (mismos umbrales que el backtest)
+
+    Args:
+        probs: Array (n, n_clases) con las probabilidades del modelo
+        min_confidence_buy: Umbral BUY (default: Config)
+        min_confidence_sell: Umbral SELL (default: Config)
+
+    Returns:
+        (is_buy, is_sell, confidence): máscaras booleanas y confianza por vela
+    """
+    min_buy = config.MIN_CONFIDENCE_BUY if min_confidence_buy is None else min_confidence_buy
+    min_sell = config.MIN_CONFIDENCE_SELL if min_confidence_sell is None else min_confidence_sell
+
+    probs = np.asarray(probs)
+    predicted_class = np.argmax(probs, axis=1)
+    confidence = probs[np.arange(len(probs)), predicted_class]
+
+    labels = np.array([config.CLASS_LABELS[c] for c in range(probs.shape[1])])[predicted_class]
+    is_buy = (labels == 'BUY') & ~(confidence < min_buy)
+    is_sell = (labels == 'SELL') & ~(confidence < min_sell)
+
+    return is_buy, is_sell, confidence
+
+
+def _exit_conditions(prices, entry_prices, highest_prices, sell, levels):
+    """
+    Condiciones de salida por vela (misma prioridad que el backtest)
+
+    Returns:
+        (hit, reason): máscara de salida y código de motivo (índice de EXIT_REASONS)
+    """
+    take_profit, stop_loss, trailing_stop, trailing_activation = levels
+
+    pnl_pct = (prices - entry_prices) / entry_prices
+    trailing_drawdown = (highest_prices - prices) / highest_prices
+
+    hit_tp = pnl_pct >= take_profit
+    hit_sl = pnl_pct <= stop_loss
+    hit_trailing = (pnl_pct > trailing_activation) & (trailing_drawdown >= trailing_stop)
+
+    hit = hit_tp | sell | hit_sl | hit_trailing
+    reason = np.select([hit_tp, sell, hit_sl], [0, 1, 2], 3)
+    return hit, reason
+
+
+def _candidate_exits(closes, is_sell, entries, levels):
+    """
+    Salida de cada BUY candidato dentro de la ventana EXIT_WINDOW
+
+    Returns:
+        (exit_idx, reason, highest): vela de salida (-1 si no sale en la
+        ventana, -2 si la ventana llega al final sin salida), motivo y máximo
+        del precio al final de la ventana
+    """
+    n = len(closes)
+    exit_idx = np.full(len(entries), -1, dtype=np.int64)
+    reasons = np.zeros(len(entries), dtype=np.int64)
+    highest = np.empty(len(entries), dtype=np.float64)
+    offsets = np.arange(1, EXIT_WINDOW + 1)
+
+    for start in range(0, len(entries), EXIT_BLOCK_ENTRIES):
+        block = entries[start:start + EXIT_BLOCK_ENTRIES]
+        idx = block[:, None] + offsets
+        valid = idx < n
+        idx = np.minimum(idx, n - 1)
+
+        prices = closes[idx]
+        entry_prices = closes[block][:, None]
+        highest_prices = np.maximum(np.maximum.accumulate(prices, axis=1), entry_prices)
+
+        hit, reason = _exit_conditions(prices, entry_prices, highest_prices, is_sell[idx], levels)
+        hit &= valid
+
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        rows = np.arange(len(block))
+
+        block_exit = np.where(found, block + 1 + first, -1)
+        block_exit[~found & (block + EXIT_WINDOW >= n - 1)] = -2
+
+        exit_idx[start:start + len(block)] = block_exit
+        reasons[start:start + len(block)] = reason[rows, first]
+        highest[start:start + len(block)] = highest_prices[:, -1]
+
+    return exit_idx, reasons, highest
+
+
+def _scan_exit(closes, is_sell, entry_price, start, highest, levels):
+    """
+    Busca la salida desde la vela start en bloques crecientes
+
+    Returns:
+        (exit_idx, reason) o (None, None) si la posición sigue abierta al final
+    """
+    n = len(closes)
+    chunk = EXIT_WINDOW
+    while start < n:
+        stop = min(start + chunk, n)
+        prices = closes[start:stop]
+        highest_prices = np.maximum(np.maximum.accumulate(prices), highest)
+
+        hit, reason = _exit_conditions(prices, entry_price, highest_prices, is_sell[start:stop], levels)
+        if hit.any():
+            j = int(np.argmax(hit))
+            return start + j, int(reason[j])
+
+        highest = highest_prices[-1]
+        start = stop
+        chunk *= 2
+
+    return None, None
+
+
+def simulate_trades(timestamps, closes, probs, capital_per_pair, symbol=None,
+                    take_profit_pct=None, stop_loss_pct=None,
+                    trailing_stop_pct=None, trailing_activation_pct=None,
+                    min_confidence_buy=None, min_confidence_sell=None,
+                    trading_fee=None, use_compounding=None, max_position_size=None):
+    """
+    Simula el trading de una serie de velas con sus predicciones
+
+    Los parámetros de riesgo que no se indiquen se toman de Config.
+
+    Args:
+        timestamps: Array de timestamps (uno por vela simulada)
+        closes: Array de precios de cierre alineado con timestamps
+        probs: Array (n, n_clases) de probabilidades alineado con timestamps
+        capital_per_pair: Capital inicial (y tamaño fijo sin compounding)
+        symbol: Símbolo que se anota en cada trade
+
+    Returns:
+        (trades, equity): DataFrame de trades (columnas TRADE_COLUMNS) y
+        DataFrame de equity por vela (timestamp, equity)
+    """
+    take_profit = config.TAKE_PROFIT_PCT if take_profit_pct is None else take_profit_pct
+    stop_loss = config.STOP_LOSS_PCT if stop_loss_pct is None else stop_loss_pct
+    trailing_stop = config.TRAILING_STOP_PCT if trailing_stop_pct is None else trailing_stop_pct
+    trailing_activation = (config.TRAILING_ACTIVATION_PCT if trailing_activation_pct is None
+                           else trailing_activation_pct)
+    fee = config.TRADING_FEE if trading_fee is None else trading_fee
+    compounding = config.USE_COMPOUNDING if use_compounding is None else use_compounding
+    max_position = config.MAX_POSITION_SIZE if max_position_size is None else max_position_size
+
+    n = min(len(timestamps), len(closes), len(probs))
+    timestamps = np.asarray(timestamps)[:n]
+    closes = np.asarray(closes, dtype=np.float64)[:n]
+
+    is_buy, is_sell, confidence = signals_from_probs(probs[:n], min_confidence_buy, min_confidence_sell)
+    levels = (take_profit, stop_loss, trailing_stop, trailing_activation)
+
+    # Salida de cada BUY candidato (no depende del capital): el encadenado
+    # de trades de abajo solo hace aritmética escalar
+    buy_idx = np.flatnonzero(is_buy)
+    exit_idx, reasons, highest = _candidate_exits(closes, is_sell, buy_idx, levels)
+
+    buy_list = buy_idx.tolist()
+    exit_list = exit_idx.tolist()
+    close_list = closes.tolist()
+
+    capital = capital_per_pair
+    capitals = [capital]  # Capital tras 0, 1, 2... trades cerrados
+    entries, exits, sizes, exit_reasons = [], [], [], []
+    invested_list, exit_values, total_fees_list, profits = [], [], [], []
+    k = 0  # Siguiente BUY candidato
+
+    while k < len(buy_list):
+        entry = buy_list[k]
+        entry_price = close_list[entry]
+        if compounding:
+            invested = min(capital, max_position)
+        else:
+            invested = capital_per_pair
+        size = invested / entry_price
+
+        entries.append(entry)
+        sizes.append(size)
+
+        exit_at = exit_list[k]
+        reason = int(reasons[k])
+        if exit_at == -1:
+            # No sale en la ventana: seguir buscando más adelante
+            exit_at, reason = _scan_exit(closes, is_sell, entry_price, entry + 1 + EXIT_WINDOW,
+                                         highest[k], levels)
+        elif exit_at == -2:
+            exit_at = None
+
+        if exit_at is None:
+            break  # Posición abierta hasta el final
+
+        exit_value = size * close_list[exit_at]
+        total_fees = invested * fee + exit_value * fee
+        profit = exit_value - invested - total_fees
+
+        exits.append(exit_at)
+        exit_reasons.append(reason)
+        invested_list.append(invested)
+        exit_values.append(exit_value)
+        total_fees_list.append(total_fees)
+        profits.append(profit)
+
+        capital += profit
+        capitals.append(capital)
+
+        # En la vela del cierre no se puede volver a entrar
+        k = bisect.bisect_right(buy_list, exit_at, k + 1)
+
+    # Equity por vela: valor de la posición si está abierta, si no el capital
+    candles = np.arange(n)
+    opened = np.searchsorted(entries, candles, side='right')
+    closed = np.searchsorted(exits, candles, side='right')
+    in_position = opened > closed
+    position_size = np.asarray(sizes + [0.0])[opened - 1]
+    equity = np.where(in_position, position_size * closes, np.asarray(capitals)[closed])
+
+    closed_entries = np.asarray(entries[:len(exits)], dtype=np.int64)
+    exits = np.asarray(exits, dtype=np.int64)
+    invested = np.asarray(invested_list, dtype=np.float64)
+    exit_values = np.asarray(exit_values, dtype=np.float64)
+    profits = np.asarray(profits, dtype=np.float64)
+
+    trades = pd.DataFrame({
+        'symbol': symbol,
+        'entry_time': pd.to_datetime(timestamps[closed_entries]),
+        'exit_time': pd.to_datetime(timestamps[exits]),
+        'entry_price': closes[closed_entries],
+        'exit_price': closes[exits],
+        'size': np.asarray(sizes[:len(exits)], dtype=np.float64),
+        'gross_pnl': exit_values - invested,
+        'fees': np.asarray(total_fees_list, dtype=np.float64),
+        'profit': profits,
+        'profit_pct': profits / invested,
+        'exit_reason': np.asarray(EXIT_REASONS, dtype=object)[np.asarray(exit_reasons, dtype=np.int64)],
+        'entry_confidence': confidence[closed_entries],
+    }, columns=TRADE_COLUMNS)
+
+    equity_curve = pd.DataFrame({'timestamp': pd.to_datetime(timestamps), 'equity': equity})
+
+    return trades, equity_curve
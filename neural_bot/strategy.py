@@ -21,6 +21,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import json
 import joblib
+from collections import OrderedDict
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -45,6 +46,9 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from data_cache import DataCache
 from .config import config
+from .training_windows import TrainingWindows
+from .feature_store import FeatureStore
+from .features import FeatureRegistry
 
 @tf.keras.utils.register_keras_serializable(package='neural_bot')
 class AttentionLayer(layers.Layer):
@@ -95,6 +99,7 @@ class AttentionLayer(layers.Layer):
 import numpy as np
 
 class BuyMetricsCallback(Callback):
+    # X_val puede ser un array o un tf.data.Dataset sin barajar (y_val en el mismo orden)
     def __init__(self, X_val, y_val):
         super().__init__()
         self.X_val = X_val
@@ -160,189 +165,50 @@ class FocalLoss(tf.keras.losses.Loss):
         return config
 
 
+def compile_inference_fn(model):
+    """
+    Compila la pasada hacia delante del modelo como tf.function de forma fija
+
+    Se trazan una vez dos funciones concretas: batch 1 (una ventana, bot en
+    vivo) y batch variable (get_signals). Evita el coste por llamada de
+    model.predict (dataset + contexto de distribución) en inferencias pequeñas.
+
+    Args:
+        model: Modelo Keras con input_shape (None, lookback, n_features)
+
+    Returns:
+        callable(X) -> np.array de probabilidades (n_samples, n_classes)
+    """
+    input_shape = tuple(model.input_shape[1:])
+    forward = tf.function(lambda x: model(x, training=False))
+    single = forward.get_concrete_function(tf.TensorSpec((1,) + input_shape, tf.float32))
+    batch = forward.get_concrete_function(tf.TensorSpec((None,) + input_shape, tf.float32))
+
+    def infer(X):
+        x = tf.convert_to_tensor(np.asarray(X, dtype=np.float32))
+        fn = single if x.shape[0] == 1 else batch
+        return fn(x).numpy()
+
+    return infer
+
+
 class FeatureExtractor:
     """Extrae y normaliza features de datos OHLCV"""
     
     def __init__(self):
         self.scaler = MinMaxScaler()
         self.feature_names = []
+        self.registry = FeatureRegistry()
+        self.model_features = None  # Features del modelo cargado (None = las de Config)
         
     def calculate_technical_indicators(self, df):
         """Calcula indicadores técnicos configurados (OPTIMIZADO)"""
-        result = df.copy()
-        
-        # EMAs
-        for name, period in config.TECHNICAL_INDICATORS.items():
-            if 'ema' in name and name in ['ema_fast', 'ema_slow', 'ema_trend']:
-                ema = result['close'].ewm(span=period, adjust=False).mean()
-                result[name] = ema
-                
-                # NUEVO: Slope (Pendiente) de la EMA
-                # Calcula el ángulo de la tendencia (en radianes o simplemente delta)
-                # Usamos delta de 3 periodos normalizado por el precio
-                result[f'{name}_slope'] = (ema.diff(3) / ema) * 100
-        
-        # RSI
-        if 'rsi' in config.TECHNICAL_INDICATORS:
-            period = config.TECHNICAL_INDICATORS['rsi']
-            delta = result['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            result['rsi'] = 100 - (100 / (1 + rs))
-        
-        # ATR
-        if 'atr' in config.TECHNICAL_INDICATORS:
-            period = config.TECHNICAL_INDICATORS['atr']
-            high_low = result['high'] - result['low']
-            high_close = np.abs(result['high'] - result['close'].shift())
-            low_close = np.abs(result['low'] - result['close'].shift())
-            ranges = pd.concat([high_low, high_close, low_close], axis=1)
-            true_range = ranges.max(axis=1)
-            result['atr'] = true_range.rolling(window=period).mean()
-        
-        # ADX
-        if 'adx' in config.TECHNICAL_INDICATORS:
-            period = config.TECHNICAL_INDICATORS['adx']
-            
-            high_diff = result['high'].diff()
-            low_diff = -result['low'].diff()
-            
-            plus_dm = high_diff.where((high_diff > low_diff) & (high_diff > 0), 0)
-            minus_dm = low_diff.where((low_diff > high_diff) & (low_diff > 0), 0)
-            
-            if 'atr' not in result.columns:
-                result['atr'] = true_range.rolling(window=period).mean()
-            
-            plus_di = 100 * (plus_dm.rolling(window=period).mean() / result['atr'])
-            minus_di = 100 * (minus_dm.rolling(window=period).mean() / result['atr'])
-            
-            dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
-            result['adx'] = dx.rolling(window=period).mean()
-        
-        # MACD (NUEVO)
-        if all(k in config.TECHNICAL_INDICATORS for k in ['macd_fast', 'macd_slow', 'macd_signal']):
-            fast = config.TECHNICAL_INDICATORS['macd_fast']
-            slow = config.TECHNICAL_INDICATORS['macd_slow']
-            signal = config.TECHNICAL_INDICATORS['macd_signal']
-            
-            ema_fast = result['close'].ewm(span=fast, adjust=False).mean()
-            ema_slow = result['close'].ewm(span=slow, adjust=False).mean()
-            
-            result['macd_line'] = ema_fast - ema_slow
-            result['macd_signal'] = result['macd_line'].ewm(span=signal, adjust=False).mean()
-            result['macd_histogram'] = result['macd_line'] - result['macd_signal']
-        
-        # Bollinger Bands (NUEVO)
-        if 'bb_period' in config.TECHNICAL_INDICATORS and 'bb_std' in config.TECHNICAL_INDICATORS:
-            period = config.TECHNICAL_INDICATORS['bb_period']
-            std_dev = config.TECHNICAL_INDICATORS['bb_std']
-            
-            result['bb_middle'] = result['close'].rolling(window=period).mean()
-            bb_std = result['close'].rolling(window=period).std()
-            
-            result['bb_upper'] = result['bb_middle'] + (bb_std * std_dev)
-            result['bb_lower'] = result['bb_middle'] - (bb_std * std_dev)
-            
-            # %B: Posición relativa dentro de las bandas
-            result['bb_percent'] = (result['close'] - result['bb_lower']) / (result['bb_upper'] - result['bb_lower'])
-            
-            # Bandwidth: Ancho de las bandas (volatilidad)
-            result['bb_bandwidth'] = (result['bb_upper'] - result['bb_lower']) / result['bb_middle']
-        
-        # Stochastic Oscillator (NUEVO)
-        if 'stoch_k' in config.TECHNICAL_INDICATORS and 'stoch_d' in config.TECHNICAL_INDICATORS:
-            k_period = config.TECHNICAL_INDICATORS['stoch_k']
-            d_period = config.TECHNICAL_INDICATORS['stoch_d']
-            
-            low_min = result['low'].rolling(window=k_period).min()
-            high_max = result['high'].rolling(window=k_period).max()
-            
-            result['stoch_k'] = 100 * (result['close'] - low_min) / (high_max - low_min)
-            result['stoch_d'] = result['stoch_k'].rolling(window=d_period).mean()
-        
-        # CCI - Commodity Channel Index (NUEVO)
-        if 'cci' in config.TECHNICAL_INDICATORS:
-            period = config.TECHNICAL_INDICATORS['cci']
-            
-            tp = (result['high'] + result['low'] + result['close']) / 3
-            sma_tp = tp.rolling(window=period).mean()
-            mad = tp.rolling(window=period).apply(lambda x: np.abs(x - x.mean()).mean())
-            
-            result['cci'] = (tp - sma_tp) / (0.015 * mad)
-        
-        # VWAP - Volume Weighted Average Price (NUEVO)
-        if hasattr(config, 'VOLUME_FEATURES') and 'vwap' in config.VOLUME_FEATURES:
-            typical_price = (result['high'] + result['low'] + result['close']) / 3
-            result['vwap'] = (typical_price * result['volume']).cumsum() / result['volume'].cumsum()
-        
-        # OBV - On Balance Volume (NUEVO)
-        if hasattr(config, 'VOLUME_FEATURES') and 'obv' in config.VOLUME_FEATURES:
-            obv = [0]
-            for i in range(1, len(result)):
-                if result['close'].iloc[i] > result['close'].iloc[i-1]:
-                    obv.append(obv[-1] + result['volume'].iloc[i])
-                elif result['close'].iloc[i] < result['close'].iloc[i-1]:
-                    obv.append(obv[-1] - result['volume'].iloc[i])
-                else:
-                    obv.append(obv[-1])
-            result['obv'] = obv
-        
-        # Volume Ratio (NUEVO)
-        if hasattr(config, 'VOLUME_FEATURES') and 'volume_ratio' in config.VOLUME_FEATURES:
-            result['volume_ratio'] = result['volume'] / result['volume'].rolling(window=20).mean()
-        
-        return result
+        return self.registry.assign(df, 'technical')
 
-    
     def calculate_price_features(self, df):
         """Calcula features basadas en precio (OPTIMIZADO)"""
-        result = df.copy()
-        
-        # Returns
-        if 'returns' in config.PRICE_FEATURES:
-            result['returns'] = result['close'].pct_change()
-        
-        # Log returns
-        if 'log_returns' in config.PRICE_FEATURES:
-            result['log_returns'] = np.log(result['close'] / result['close'].shift(1))
-        
-        # Volatilidad
-        if 'volatility' in config.PRICE_FEATURES:
-            result['volatility'] = result['close'].pct_change().rolling(window=20).std()
-        
-        # High-Low ratio
-        if 'hl_ratio' in config.PRICE_FEATURES:
-            result['hl_ratio'] = (result['high'] - result['low']) / result['close']
-        
-        # Open-Close ratio
-        if 'oc_ratio' in config.PRICE_FEATURES:
-            result['oc_ratio'] = (result['close'] - result['open']) / result['open']
-        
-        # Volume change
-        if 'volume_change' in config.PRICE_FEATURES:
-            result['volume_change'] = result['volume'].pct_change()
-        
-        # CROSS FEATURES (NUEVO)
-        if hasattr(config, 'CROSS_FEATURES'):
-            # EMA Crossover Signal
-            if 'ema_cross' in config.CROSS_FEATURES and 'ema_fast' in result.columns and 'ema_slow' in result.columns:
-                result['ema_cross'] = (result['ema_fast'] - result['ema_slow']) / result['close']
-            
-            # Distance from price to EMA fast
-            if 'price_to_ema_fast' in config.CROSS_FEATURES and 'ema_fast' in result.columns:
-                result['price_to_ema_fast'] = (result['close'] - result['ema_fast']) / result['close']
-            
-            # Distance from price to EMA slow
-            if 'price_to_ema_slow' in config.CROSS_FEATURES and 'ema_slow' in result.columns:
-                result['price_to_ema_slow'] = (result['close'] - result['ema_slow']) / result['close']
-                
-            # NUEVO: Distancia a EMA 200 (Trend)
-            if 'ema_trend' in result.columns:
-                result['dist_to_trend'] = (result['close'] - result['ema_trend']) / result['ema_trend']
-        
-        return result
-    
+        return self.registry.assign(df, 'price')
+
     def calculate_market_regime(self, df):
         """
         Calcula features de régimen de mercado para mejor adaptación a condiciones
@@ -350,52 +216,19 @@ class FeatureExtractor:
         Returns:
             DataFrame con features de régimen añadidas
         """
-        result = df.copy()
-        
-        # 1. TREND DIRECTION: Bull (1) vs Bear (0)
-        if 'ema_trend' in result.columns:
-            result['trend_direction'] = (result['close'] > result['ema_trend']).astype(float)
-        
-        # 2. VOLATILITY REGIME: Normalizado 0-1
-        if 'atr' in result.columns:
-            # Volatilidad relativa
-            vol_raw = result['atr'] / result['close']
-            
-            # Normalizar usando rolling min/max (50 períodos)
-            vol_min = vol_raw.rolling(window=50, min_periods=1).min()
-            vol_max = vol_raw.rolling(window=50, min_periods=1).max()
-            
-            # Evitar división por cero
-            vol_range = vol_max - vol_min
-            vol_range = vol_range.replace(0, 1)
-            
-            result['volatility_regime'] = (vol_raw - vol_min) / vol_range
-            result['volatility_regime'] = result['volatility_regime'].fillna(0.5)  # Neutral si no hay datos
-        
-        # 3. TREND STRENGTH: Trending (1) vs Lateral (0)
-        if 'adx' in result.columns:
-            result['trend_strength'] = (result['adx'] > 25).astype(float)
-        
-        return result
+        return self.registry.assign(df, 'regime')
 
-    
-    def extract_features(self, df, fit_scaler=False):
+    @staticmethod
+    def select_feature_columns(columns):
         """
-        Extrae todas las features de un DataFrame OHLCV
-        
+        Selecciona (y ordena) las columnas de features del modelo
+
         Args:
-            df: DataFrame con columnas [timestamp, open, high, low, close, volume]
-            fit_scaler: Si True, ajusta el scaler (solo para entrenamiento)
-        
+            columns: Columnas disponibles (calculadas por los indicadores)
+
         Returns:
-            np.array con features normalizadas, shape (n_samples, n_features)
+            list con los nombres de las features en el orden del modelo
         """
-        # Calcular indicadores
-        df_features = self.calculate_technical_indicators(df)
-        df_features = self.calculate_price_features(df_features)
-        df_features = self.calculate_market_regime(df_features)  # NUEVO: Régimen de mercado
-        
-        # Seleccionar columnas de features
         feature_cols = []
 
         # OHLCV básicos
@@ -404,63 +237,177 @@ class FeatureExtractor:
 
         # Indicadores técnicos base
         for name in ['ema_fast', 'ema_slow', 'ema_trend', 'rsi', 'atr', 'adx']:
-            if name in df_features.columns:
+            if name in columns:
                 feature_cols.append(name)
             # Agregar slopes si existen
-            if f'{name}_slope' in df_features.columns:
+            if f'{name}_slope' in columns:
                 feature_cols.append(f'{name}_slope')
 
         # MACD features
         for macd_feat in ['macd_line', 'macd_signal', 'macd_histogram']:
-            if macd_feat in df_features.columns:
+            if macd_feat in columns:
                 feature_cols.append(macd_feat)
 
         # Bollinger Bands features  
         for bb_feat in ['bb_percent', 'bb_bandwidth']:
-            if bb_feat in df_features.columns:
+            if bb_feat in columns:
                 feature_cols.append(bb_feat)
 
         # Stochastic features
         for stoch_feat in ['stoch_k', 'stoch_d']:
-            if stoch_feat in df_features.columns:
+            if stoch_feat in columns:
                 feature_cols.append(stoch_feat)
 
         # CCI
-        if 'cci' in df_features.columns:
+        if 'cci' in columns:
             feature_cols.append('cci')
 
         # Features de precio
         for name in config.PRICE_FEATURES:
-            if name in df_features.columns:
+            if name in columns:
                 feature_cols.append(name)
 
         # Volume features (NUEVO)
         if hasattr(config, 'VOLUME_FEATURES'):
             for name in config.VOLUME_FEATURES:
-                if name in df_features.columns:
+                if name in columns:
                     feature_cols.append(name)
 
         # Cross features (NUEVO)
         if hasattr(config, 'CROSS_FEATURES'):
             for name in config.CROSS_FEATURES:
-                if name in df_features.columns:
+                if name in columns:
                     feature_cols.append(name)
-            
+        
             # Agregar dist_to_trend si existe
-            if 'dist_to_trend' in df_features.columns:
+            if 'dist_to_trend' in columns:
                 feature_cols.append('dist_to_trend')
 
         # Market regime features (NUEVO - MEJORA #1)
         if hasattr(config, 'MARKET_REGIME_FEATURES'):
             for name in config.MARKET_REGIME_FEATURES:
-                if name in df_features.columns:
+                if name in columns:
                     feature_cols.append(name)
 
+        return feature_cols
+
+    def default_feature_names(self):
+        """Features de la configuración actual, en el orden del modelo"""
+        return self.select_feature_columns(self.registry.outputs())
+
+    def set_model_features(self, feature_names):
+        """
+        Fija las features que espera el modelo cargado
+
+        Con la lista de la metadata del modelo solo se calculan esas features
+        (y sus dependencias); un modelo antiguo con menos features calcula
+        menos columnas.
+
+        Args:
+            feature_names: Lista guardada al entrenar, o None si el modelo
+                no la tiene (se usan las de Config)
+
+        Returns:
+            bool: False si la lista no es compatible con la configuración o el scaler
+        """
+        expected = getattr(self.scaler, 'n_features_in_', None)
+
+        if feature_names:
+            unknown = [name for name in feature_names if name not in self.registry.outputs()]
+            if unknown:
+                print(f"⚠️ Features del modelo no disponibles con la configuración actual: {unknown}")
+                self.model_features = None
+                return False
+            self.model_features = list(feature_names)
+        else:
+            self.model_features = None
+
+        self.feature_names = list(self.model_features or self.default_feature_names())
+        if expected is not None and expected != len(self.feature_names):
+            origin = 'la metadata' if self.model_features else 'la configuración actual'
+            print(f"⚠️ El scaler espera {expected} features y {origin} tiene {len(self.feature_names)}")
+            return False
+        return True
+
+    def warmup_candles(self, feature_names=None):
+        """
+        Velas previas que necesitan las features para coincidir con el histórico completo
+
+        Las EMAs se consideran convergidas cuando el peso de su valor inicial
+        baja de Config.FEATURE_EMA_TOLERANCE. Los acumulados (OBV, VWAP) no
+        cuentan: se siembran con su valor en la primera vela (ver seed_columns).
+
+        Args:
+            feature_names: Features (default: las del modelo cargado o las de Config)
+
+        Returns:
+            int
+        """
+        feature_cols = feature_names or self.model_features or self.default_feature_names()
+        return self.registry.window_warmup(feature_cols, seeded=True)
+
+    def seed_columns(self, feature_names=None):
+        """
+        Acumulados que hay que sembrar para calcular las features sobre las últimas velas
+
+        Returns:
+            list de nodos del registro (vacía si ninguna feature es acumulada)
+        """
+        feature_cols = feature_names or self.model_features or self.default_feature_names()
+        return self.registry.accumulators(feature_cols)
+
+    def signal_candles(self, feature_names=None):
+        """
+        Velas mínimas para la última secuencia de predicción
+
+        Calentamiento + LOOKBACK_WINDOW + la última vela (puede seguir abierta
+        y no entra en la secuencia). Con features acumuladas hace falta además
+        sembrarlas en la primera de esas velas.
+
+        Returns:
+            int
+        """
+        return self.warmup_candles(feature_names) + config.LOOKBACK_WINDOW + 1
+
+    def extract_features(self, df, fit_scaler=False):
+        """
+        Extrae todas las features de un DataFrame OHLCV
+        
+        Args:
+            df: DataFrame con columnas [timestamp, open, high, low, close, volume]
+            fit_scaler: Si True, ajusta el scaler (solo para entrenamiento)
+        
+        Returns:
+            np.array con features normalizadas, shape (n_samples, n_features)
+        """
+        X = self.extract_raw_features(df)
+        return self.scale_features(X, fit_scaler=fit_scaler)
+
+    def extract_raw_features(self, df, feature_names=None, seeds=None):
+        """
+        Features sin normalizar (ya limpias de NaN/infinitos)
+
+        Solo se calculan las features pedidas y sus dependencias. Es la
+        matriz que guarda FeatureStore; scale_features la normaliza.
+
+        Args:
+            df: DataFrame con columnas [timestamp, open, high, low, close, volume]
+            feature_names: Features a calcular (default: las del modelo
+                cargado o, si no hay, las de Config)
+            seeds: Valores de los acumulados (seed_columns) en la primera
+                vela de df, calculados sobre el histórico completo
+
+        Returns:
+            np.array float64 (n_samples, n_features)
+        """
+        feature_cols = list(feature_names or self.model_features or self.default_feature_names())
+        columns = self.registry.compute(df, feature_cols, seeds=seeds)
+
         # Guardar nombres de features
         self.feature_names = feature_cols
         
         # Extraer features
-        df_temp = df_features[feature_cols].copy()
+        df_temp = pd.DataFrame({name: columns[name] for name in feature_cols}, index=df.index)
         
         # CRÍTICO: Manejar valores infinitos y NaN ANTES de normalizar
         # 1. Reemplazar infinitos con NaN
@@ -478,7 +425,16 @@ class FeatureExtractor:
             # Último recurso: reemplazar con 0
             X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
         
-        # Normalizar
+        return X
+
+    def scale_features(self, X, fit_scaler=False):
+        """
+        Normaliza features sin escalar (de extract_raw_features o FeatureStore)
+
+        Args:
+            X: Features sin normalizar (n_samples, n_features)
+            fit_scaler: Si True, ajusta el scaler (solo para entrenamiento)
+        """
         if fit_scaler:
             X = self.scaler.fit_transform(X)
         else:
@@ -488,36 +444,60 @@ class FeatureExtractor:
         
         return X
     
-    def create_sequences(self, X, y=None):
+    def create_sequences(self, X, y=None, view=False, dtype=None):
         """
         Crea secuencias de ventanas temporales para LSTM
-        
+
+        La secuencia i contiene las filas [i, i + lookback) y su label es
+        y[i + lookback]. Las ventanas se construyen como vista strided sobre X
+        (sin copiar cada fila lookback veces).
+
         Args:
             X: Features normalizadas (n_samples, n_features)
             y: Labels opcionales (n_samples,)
-        
+            view: Si True, devuelve una vista de solo lectura (sin copia)
+            dtype: Tipo al materializar (ej: np.float32). Ignorado si view=True
+
         Returns:
             X_seq: (n_sequences, lookback, n_features)
             y_seq: (n_sequences,) si y fue proporcionado
         """
         lookback = config.LOOKBACK_WINDOW
-        
-        X_seq = []
-        y_seq = [] if y is not None else None
-        
-        for i in range(lookback, len(X)):
-            X_seq.append(X[i-lookback:i])
-            if y is not None:
-                y_seq.append(y[i])
-        
-        X_seq = np.array(X_seq)
-        
+        X = np.asarray(X)
+
+        if len(X) > lookback:
+            # sliding_window_view da (n, n_features, lookback) → transponer a (n, lookback, n_features)
+            X_seq = np.lib.stride_tricks.sliding_window_view(X[:-1], lookback, axis=0).transpose(0, 2, 1)
+        else:
+            X_seq = np.empty((0, lookback) + X.shape[1:], dtype=X.dtype)
+
+        if not view:
+            X_seq = np.ascontiguousarray(X_seq, dtype=dtype)
+
         if y is not None:
-            y_seq = np.array(y_seq)
+            # Labels alineados por índice con el final de cada ventana
+            y_seq = np.asarray(y)[lookback:]
             return X_seq, y_seq
-        
+
         return X_seq
-    
+
+    def create_stream(self, window_size=None, feature_names=None):
+        """
+        Crea un motor incremental de features (uno por símbolo/timeframe)
+
+        Produce las mismas features que extract_features sobre el histórico
+        completo, pero actualizando en O(1) por cada vela nueva.
+
+        Args:
+            feature_names: Columnas del vector (default: las del modelo
+                cargado o, si no hay, las de Config)
+        """
+        from .streaming import StreamingIndicatorEngine
+        if feature_names is None:
+            feature_names = self.model_features or self.select_feature_columns(
+                StreamingIndicatorEngine.output_columns())
+        return StreamingIndicatorEngine(feature_names, window_size=window_size)
+
     def save_scaler(self, version):
         """Guarda el scaler entrenado"""
         path = Path(config.MODELS_DIR) / config.CONFIG_NAME_FORMAT.format(version=version)
@@ -539,7 +519,7 @@ class DataLabeler:
     """Etiqueta datos históricos para entrenamiento supervisado"""
     
     @staticmethod
-    def label_data(df):
+    def label_data(df, verbose=True):
         """
         Etiqueta datos usando UMBRALES FIJOS o DINÁMICOS ATR
         
@@ -553,6 +533,13 @@ class DataLabeler:
         - Fácil de entender y ajustar
         - No depende de la distribución de datos
         
+        Implementación vectorizada: todas las velas se etiquetan con
+        operaciones de arrays (sin bucle por fila).
+        
+        Args:
+            df: DataFrame OHLCV
+            verbose: Si False, no imprime configuración ni estadísticas
+        
         Returns:
             np.array de labels: 
             - Binario: 0=NO_BUY, 1=BUY
@@ -561,13 +548,25 @@ class DataLabeler:
         lookahead = config.LABEL_LOOKAHEAD
         binary_mode = config.USE_BINARY_CLASSIFICATION
         
+        close = df['close'].to_numpy(dtype=np.float64)
+        n = len(close)
+        
+        # Precio de cierre `lookahead` velas en el futuro (NaN al final)
+        future_price = np.full(n, np.nan)
+        if n > lookahead:
+            future_price[:n - lookahead] = close[lookahead:]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return_pct = (future_price - close) / close
+        
         # Usar umbrales fijos, dinámicos ATR, o percentiles según configuración
         if hasattr(config, 'USE_DYNAMIC_ATR_THRESHOLDS') and config.USE_DYNAMIC_ATR_THRESHOLDS:
             # MEJORA #2: Umbrales dinámicos basados en ATR
-            print(f"📊 Etiquetado con UMBRALES DINÁMICOS ATR:")
-            print(f"   ATR Multiplier BUY:  {config.ATR_MULTIPLIER_BUY}x")
-            print(f"   ATR Multiplier SELL: {config.ATR_MULTIPLIER_SELL}x")
-            print(f"   ATR Period: {config.ATR_PERIOD}")
+            if verbose:
+                print(f"📊 Etiquetado con UMBRALES DINÁMICOS ATR:")
+                print(f"   ATR Multiplier BUY:  {config.ATR_MULTIPLIER_BUY}x")
+                print(f"   ATR Multiplier SELL: {config.ATR_MULTIPLIER_SELL}x")
+                print(f"   ATR Period: {config.ATR_PERIOD}")
             
             # Calcular ATR si no existe
             if 'atr' not in df.columns:
@@ -579,132 +578,95 @@ class DataLabeler:
                 true_range = ranges.max(axis=1)
                 df['atr'] = true_range.rolling(window=period).mean()
             
-            # Los umbrales serán calculados por vela (dinámicos)
-            buy_threshold = None  # Se calcula en el loop
-            sell_threshold = None  # Se calcula en el loop
-            use_dynamic_atr = True
+            use_percentiles = False
+            
+            # Umbral dinámico por vela: k * ATR / precio
+            # Si no hay ATR (NaN o 0), usar umbrales fijos como fallback
+            atr = df['atr'].to_numpy(dtype=np.float64)
+            no_atr = np.isnan(atr) | (atr == 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                buy_threshold = np.where(
+                    no_atr, config.LABEL_BUY_THRESHOLD,
+                    (config.ATR_MULTIPLIER_BUY * atr) / close
+                )
+                sell_threshold = np.where(
+                    no_atr, config.LABEL_SELL_THRESHOLD,
+                    -(config.ATR_MULTIPLIER_SELL * atr) / close
+                )
             
         elif config.USE_FIXED_THRESHOLDS:
             # ESTRATEGIA NUEVA: Umbrales fijos
             buy_threshold = config.LABEL_BUY_THRESHOLD    # +1.0%
             sell_threshold = config.LABEL_SELL_THRESHOLD  # -1.0%
-            use_dynamic_atr = False
+            use_percentiles = False
             
-            if binary_mode:
-                print(f"📊 Etiquetado BINARIO con umbrales fijos:")
-                print(f"   BUY:    retorno >= {buy_threshold*100:+.1f}%")
-                print(f"   NO_BUY: retorno < {buy_threshold*100:+.1f}%")
-            else:
-                print(f"📊 Etiquetado TERNARIO con umbrales fijos:")
-                print(f"   BUY:  retorno >= {buy_threshold*100:+.1f}%")
-                print(f"   SELL: retorno <= {sell_threshold*100:+.1f}%")
-                print(f"   HOLD: entre {sell_threshold*100:+.1f}% y {buy_threshold*100:+.1f}%")
+            if verbose:
+                if binary_mode:
+                    print(f"📊 Etiquetado BINARIO con umbrales fijos:")
+                    print(f"   BUY:    retorno >= {buy_threshold*100:+.1f}%")
+                    print(f"   NO_BUY: retorno < {buy_threshold*100:+.1f}%")
+                else:
+                    print(f"📊 Etiquetado TERNARIO con umbrales fijos:")
+                    print(f"   BUY:  retorno >= {buy_threshold*100:+.1f}%")
+                    print(f"   SELL: retorno <= {sell_threshold*100:+.1f}%")
+                    print(f"   HOLD: entre {sell_threshold*100:+.1f}% y {buy_threshold*100:+.1f}%")
             
         else:
             # ESTRATEGIA ANTIGUA: Percentiles dinámicos (DEPRECADA)
-            print("⚠️ Usando estrategia de percentiles (DEPRECADA)")
+            if verbose:
+                print("⚠️ Usando estrategia de percentiles (DEPRECADA)")
             min_movement = 0.010
+            use_percentiles = True
+        
+        if not use_percentiles:
+            # Comparar retorno futuro directo con umbrales (dinámicos o fijos)
+            is_buy = return_pct >= buy_threshold
+            is_sell = return_pct <= sell_threshold
             
-        labels = []
+            if binary_mode:
+                # MODO BINARIO: BUY vs NO_BUY
+                labels_array = np.where(is_buy, 1, 0)
+            else:
+                # MODO TERNARIO: SELL/HOLD/BUY
+                labels_array = np.where(is_buy, 2, np.where(is_sell, 0, 1))
         
-        # Calcular etiquetas
-        for i in range(len(df)):
-            # Últimas velas no tienen futuro suficiente
-            if i >= len(df) - lookahead:
-                labels.append(1 if binary_mode else 1)  # NO_BUY o HOLD
-                continue
+        else:
+            # ANTIGUA ESTRATEGIA: Percentiles (mantener por compatibilidad)
+            # Máximo/mínimo de las `lookahead` velas siguientes (rolling hacia delante)
+            closes = pd.Series(close)
+            future_max = closes.rolling(lookahead, min_periods=1).max().shift(-lookahead).to_numpy()
+            future_min = closes.rolling(lookahead, min_periods=1).min().shift(-lookahead).to_numpy()
             
-            current_price = df.iloc[i]['close']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                max_gain = (future_max - close) / close
+                max_loss = (future_min - close) / close
+            future_return = np.where(np.abs(max_gain) > np.abs(max_loss), max_gain, max_loss)
             
-            if hasattr(config, 'USE_DYNAMIC_ATR_THRESHOLDS') and config.USE_DYNAMIC_ATR_THRESHOLDS:
-                # MEJORA #2: Umbrales dinámicos basados en ATR
-                future_price = df.iloc[i + lookahead]['close']
-                return_pct = (future_price - current_price) / current_price
-                
-                # Calcular umbrales dinámicos para esta vela
-                atr_value = df.iloc[i]['atr']
-                if pd.isna(atr_value) or atr_value == 0:
-                    # Si no hay ATR, usar umbrales fijos como fallback
-                    buy_threshold = config.LABEL_BUY_THRESHOLD
-                    sell_threshold = config.LABEL_SELL_THRESHOLD
-                else:
-                    # Umbral dinámico: k * ATR / precio
-                    buy_threshold = (config.ATR_MULTIPLIER_BUY * atr_value) / current_price
-                    sell_threshold = -(config.ATR_MULTIPLIER_SELL * atr_value) / current_price
-                
-                # Aplicar etiquetado con umbrales (dinámicos o fijos)
-                if binary_mode:
-                    # MODO BINARIO: BUY vs NO_BUY
-                    if return_pct >= buy_threshold:
-                        labels.append(1)  # BUY
-                    else:
-                        labels.append(0)  # NO_BUY
-                else:
-                    # MODO TERNARIO: SELL/HOLD/BUY
-                    if return_pct >= buy_threshold:
-                        labels.append(2)  # BUY
-                    elif return_pct <= sell_threshold:
-                        labels.append(0)  # SELL
-                    else:
-                        labels.append(1)  # HOLD
-                        
-            elif config.USE_FIXED_THRESHOLDS:
-                # NUEVA ESTRATEGIA: Comparar precio futuro directo con umbrales fijos
-                future_price = df.iloc[i + lookahead]['close']
-                return_pct = (future_price - current_price) / current_price
-                
-                if binary_mode:
-                    # MODO BINARIO: BUY vs NO_BUY
-                    if return_pct >= buy_threshold:
-                        labels.append(1)  # BUY
-                    else:
-                        labels.append(0)  # NO_BUY
-                else:
-                    # MODO TERNARIO: SELL/HOLD/BUY
-                    if return_pct >= buy_threshold:
-                        labels.append(2)  # BUY
-                    elif return_pct <= sell_threshold:
-                        labels.append(0)  # SELL
-                    else:
-                        labels.append(1)  # HOLD
-                    
-            else:
-                # ANTIGUA ESTRATEGIA: Percentiles (mantener por compatibilidad)
-                future_prices = df.iloc[i+1:i+lookahead+1]['close']
-                max_gain = (future_prices.max() - current_price) / current_price
-                max_loss = (future_prices.min() - current_price) / current_price
-                
-                if abs(max_gain) > abs(max_loss):
-                    future_return = max_gain
-                else:
-                    future_return = max_loss
-                
-                # Usar percentiles si hay suficientes datos
-                if abs(future_return) < min_movement:
-                    labels.append(0 if binary_mode else 1)  # NO_BUY o HOLD
-                elif future_return >= min_movement:
-                    labels.append(1 if binary_mode else 2)  # BUY
-                elif future_return <= -min_movement:
-                    labels.append(0)  # NO_BUY o SELL
-                else:
-                    labels.append(0 if binary_mode else 1)  # NO_BUY o HOLD
+            no_move = 0 if binary_mode else 1  # NO_BUY o HOLD
+            labels_array = np.where(
+                np.abs(future_return) < min_movement, no_move,
+                np.where(future_return >= min_movement, 1 if binary_mode else 2,
+                         np.where(future_return <= -min_movement, 0, no_move))
+            )
         
-        labels_array = np.array(labels)
+        # Últimas velas no tienen futuro suficiente
+        labels_array[max(n - lookahead, 0):] = 1 if binary_mode else 1  # NO_BUY o HOLD
+        labels_array = labels_array.astype(np.int64)
         
         # Mostrar estadísticas de etiquetado
-        from collections import Counter
-        label_counts = Counter(labels_array)
-        total = len(labels_array)
-        
-        print(f"\n📊 Distribución de etiquetas generadas:")
-        if binary_mode:
-            print(f"   NO_BUY (0): {label_counts[0]:5d} ({label_counts[0]/total*100:5.1f}%)")
-            print(f"   BUY    (1): {label_counts[1]:5d} ({label_counts[1]/total*100:5.1f}%)")
-        else:
-            print(f"   SELL (0): {label_counts[0]:5d} ({label_counts[0]/total*100:5.1f}%)")
-            print(f"   HOLD (1): {label_counts[1]:5d} ({label_counts[1]/total*100:5.1f}%)")
-            print(f"   BUY  (2): {label_counts[2]:5d} ({label_counts[2]/total*100:5.1f}%)")
-        print(f"   Total:    {total:5d}")
+        if verbose:
+            label_counts = np.bincount(labels_array, minlength=3)
+            total = len(labels_array)
+            
+            print(f"\n📊 Distribución de etiquetas generadas:")
+            if binary_mode:
+                print(f"   NO_BUY (0): {label_counts[0]:5d} ({label_counts[0]/total*100:5.1f}%)")
+                print(f"   BUY    (1): {label_counts[1]:5d} ({label_counts[1]/total*100:5.1f}%)")
+            else:
+                print(f"   SELL (0): {label_counts[0]:5d} ({label_counts[0]/total*100:5.1f}%)")
+                print(f"   HOLD (1): {label_counts[1]:5d} ({label_counts[1]/total*100:5.1f}%)")
+                print(f"   BUY  (2): {label_counts[2]:5d} ({label_counts[2]/total*100:5.1f}%)")
+            print(f"   Total:    {total:5d}")
         
         return labels_array
 
@@ -721,6 +683,8 @@ class NeuralTradingModel:
         """
         self.input_shape = input_shape
         self.model = None
+        self._infer_fn = None
+        self._infer_model = None  # Modelo para el que se compiló _infer_fn
         self.build_model()
     
     def build_model(self):
@@ -815,8 +779,9 @@ class NeuralTradingModel:
         
         Args:
             X_train: Features de entrenamiento (n_samples, lookback, n_features)
+                o tf.data.Dataset de batches (ventanas, labels)
             y_train: Labels de entrenamiento (n_samples,)
-            X_val: Features de validación (opcional)
+            X_val: Features de validación (opcional, array o tf.data.Dataset)
             y_val: Labels de validación (opcional)
             epochs: Número de épocas (usa config si no se especifica)
             class_weights: Diccionario de pesos de clases (opcional, usa config si None)
@@ -867,14 +832,17 @@ class NeuralTradingModel:
             print(f"   Patience: {config.LR_PATIENCE}")
             print(f"   Min LR: {config.LR_MIN}")
         
-        # Validación
+        # Validación (un Dataset ya incluye los labels)
+        is_dataset = isinstance(X_train, tf.data.Dataset)
         validation_data = None
-        if X_val is not None and y_val is not None:
+        if isinstance(X_val, tf.data.Dataset):
+            validation_data = X_val
+        elif X_val is not None and y_val is not None:
             validation_data = (X_val, y_val)
         
         # Entrenar
         print(f"\n🎓 Entrenando modelo...")
-        print(f"   Samples: {len(X_train)}")
+        print(f"   Samples: {len(y_train)}")
         print(f"   Epochs: {epochs}")
         print(f"   Batch size: {config.BATCH_SIZE}")
 
@@ -882,10 +850,10 @@ class NeuralTradingModel:
         callbacks.append(BuyMetricsCallback(X_val, y_val))
 
         history = self.model.fit(
-            X_train, y_train,
+            X_train, None if is_dataset else y_train,
             validation_data=validation_data,
             epochs=epochs,
-            batch_size=config.BATCH_SIZE,
+            batch_size=None if is_dataset else config.BATCH_SIZE,
             callbacks=callbacks,
             class_weight=class_weight_dict,  # CRÍTICO: Aplicar pesos
             verbose=config.VERBOSE
@@ -919,8 +887,14 @@ class NeuralTradingModel:
         if len(X.shape) == 2:
             X = np.expand_dims(X, axis=0)
         
-        # Predicción
-        probs = self.predict(X)[0]
+        # Predicción (función compilada, se recompila si cambió el modelo)
+        if config.USE_COMPILED_INFERENCE:
+            if self._infer_model is not self.model:
+                self._infer_fn = compile_inference_fn(self.model)
+                self._infer_model = self.model
+            probs = self._infer_fn(X)[0]
+        else:
+            probs = self.predict(X)[0]
         
         # Clase con mayor probabilidad
         predicted_class = np.argmax(probs)
@@ -996,6 +970,7 @@ class ContinuousLearner:
     def __init__(self):
         self.cache = DataCache()
         self.feature_extractor = FeatureExtractor()
+        self.feature_store = FeatureStore()
         self.model = None
         self.current_version = 0
         self.metrics_history = []
@@ -1021,7 +996,12 @@ class ContinuousLearner:
         return max(versions) if versions else 0
     
     def load_latest_model(self):
-        """Carga el modelo más reciente"""
+        """
+        Carga el modelo más reciente con su scaler y sus features
+
+        Returns:
+            bool: True si se cargó
+        """
         version = self.get_latest_version()
         if version == 0:
             print("⚠️ No hay modelos guardados")
@@ -1034,43 +1014,27 @@ class ContinuousLearner:
             print(f"❌ No se pudo cargar scaler v{version}")
             return False
         
-        X_train, y_train, X_val, y_val = self.prepare_training_data(symbols, timeframe)
+        # Features con las que se entrenó (guardadas en las métricas de la versión)
+        metrics = self.load_metrics(version) or {}
+        self.feature_extractor.set_model_features(metrics.get('features'))
         
-        # Crear modelo
-        input_shape = (X_train.shape[1], X_train.shape[2])  # (lookback, n_features)
+        # Cargar modelo (sin reentrenar: para eso está train_initial_model)
+        input_shape = (config.LOOKBACK_WINDOW, len(self.feature_extractor.feature_names))
         self.model = NeuralTradingModel(input_shape)
+        if not self.model.load(version):
+            print(f"❌ No se pudo cargar modelo v{version}")
+            self.model = None
+            return False
         
-        # Mostrar resumen
-        self.model.get_summary()
-        
-        # Entrenar
-        history = self.model.train(X_train, y_train, X_val, y_val)
-        
-        # Evaluar
-        accuracy = self.model.evaluate(X_val, y_val)
-        
-        # Guardar
-        self.current_version += 1
-        self.model.save(self.current_version)
-        self.feature_extractor.save_scaler(self.current_version)
-        
-        # Guardar métricas
-        self.save_metrics(self.current_version, {
-            'accuracy': accuracy,
-            'train_samples': len(X_train),
-            'val_samples': len(X_val),
-            'timestamp': datetime.now().isoformat(),
-            'symbols': symbols or config.DEFAULT_SYMBOLS,
-            'timeframe': timeframe
-        })
-        
-        print(f"\n✅ Modelo v{self.current_version} entrenado y guardado")
-        
-        return self.model
+        return True
     
     def prepare_training_data(self, symbols=None, timeframe='4h', start_date=None, end_date=None):
         """
         Prepara datos de entrenamiento BALANCEADOS y con SPLIT CORRECTO
+
+        Con USE_STREAMING_DATASET, X_train y X_val son tf.data.Dataset que
+        generan las ventanas por índice sobre las matrices 2-D de features
+        (no se materializa X_seq); si no, arrays (n, lookback, n_features).
         """
         import numpy as np
         import pandas as pd
@@ -1083,6 +1047,8 @@ class ContinuousLearner:
 
         symbol_data = {}
         min_samples = float('inf')
+        lookback = config.LOOKBACK_WINDOW
+        windows = TrainingWindows(lookback)
 
         # 1. Cargar y procesar todos los símbolos
         for symbol in symbols:
@@ -1092,6 +1058,7 @@ class ContinuousLearner:
             if df is None or len(df) < config.MIN_TRAIN_SAMPLES:
                 print(f"    ⚠️ Datos insuficientes")
                 continue
+            history = df
 
             # Filtrar por fechas si se especifican
             if start_date:
@@ -1137,53 +1104,65 @@ class ContinuousLearner:
             
             # Usar FeatureExtractor para procesar X correctamente
             # fit_scaler=True para ajustar el escalador con los datos de entrenamiento
-            X = self.feature_extractor.extract_features(df, fit_scaler=True)
+            # (features sin escalar desde el feature store si las velas son contiguas)
+            X_raw = None
+            if config.USE_FEATURE_STORE and not config.FILTER_LATERAL_MARKETS:
+                X_raw = self.feature_store.get_features(symbol, timeframe, history,
+                                                        self.feature_extractor, df=df)
+            if X_raw is not None:
+                X = self.feature_extractor.scale_features(X_raw, fit_scaler=True)
+            else:
+                X = self.feature_extractor.extract_features(df, fit_scaler=True)
 
             print(f"   🔍 Features extraídas: {self.feature_extractor.feature_names}")
 
 
-            # Crear secuencias
-            X_seq, y_seq = self.feature_extractor.create_sequences(X, y)
+            # Solo se guarda la matriz 2-D; las ventanas se generan por índice
+            # (ventana i = filas [i, i + lookback), label y[i + lookback])
+            n_seq = max(len(X) - lookback, 0)
+            offset = windows.add(X)
 
-            print(f"    ✅ {len(X_seq)} secuencias generadas")
+            print(f"    ✅ {n_seq} secuencias generadas")
 
-            symbol_data[symbol] = (X_seq, y_seq)
-            min_samples = min(min_samples, len(X_seq))
+            symbol_data[symbol] = (offset + np.arange(n_seq), y[lookback:])
+            min_samples = min(min_samples, n_seq)
 
         if not symbol_data:
             raise ValueError("No se pudieron cargar datos de ningún símbolo")
 
         print(f"\n⚖️ Balanceando a {min_samples} muestras por par (undersampling)")
 
-        X_train_list, y_train_list, X_val_list, y_val_list = [], [], [], []
+        train_starts_list, y_train_list, val_starts_list, y_val_list = [], [], [], []
 
-        # 2. Balancear y Split por símbolo
-        for symbol, (X, y) in symbol_data.items():
-            X_bal = X[-min_samples:]
+        # 2. Balancear y Split por símbolo (sobre índices de inicio de ventana)
+        for symbol, (starts, y) in symbol_data.items():
+            starts_bal = starts[-min_samples:]
             y_bal = y[-min_samples:]
 
-            split_idx = int(len(X_bal) * (1 - config.VALIDATION_SPLIT))
-
-            X_train_sym, y_train_sym = X_bal[:split_idx], y_bal[:split_idx]
-            X_val_sym, y_val_sym = X_bal[split_idx:], y_bal[split_idx:]
+            split_idx = int(len(starts_bal) * (1 - config.VALIDATION_SPLIT))
 
-            X_train_list.append(X_train_sym)
-            y_train_list.append(y_train_sym)
-            X_val_list.append(X_val_sym)
-            y_val_list.append(y_val_sym)
+            train_starts_list.append(starts_bal[:split_idx])
+            y_train_list.append(y_bal[:split_idx])
+            val_starts_list.append(starts_bal[split_idx:])
+            y_val_list.append(y_bal[split_idx:])
 
-            print(f"  {symbol}: Train {len(X_train_sym)} | Val {len(X_val_sym)}")
+            print(f"  {symbol}: Train {split_idx} | Val {len(starts_bal) - split_idx}")
 
-        # 3. Concatenar
-        X_train = np.concatenate(X_train_list, axis=0)
+        # 3. Concatenar índices y labels (las features no se copian)
+        train_starts = np.concatenate(train_starts_list)
         y_train = np.concatenate(y_train_list, axis=0)
-        X_val = np.concatenate(X_val_list, axis=0)
+        val_starts = np.concatenate(val_starts_list)
         y_val = np.concatenate(y_val_list, axis=0)
 
-        # 4. Shuffle (Solo Train)
-        indices = np.arange(len(X_train))
-        np.random.shuffle(indices)
-        X_train, y_train = X_train[indices], y_train[indices]
+        # 4. Shuffle (Solo Train): con tf.data se baraja en el pipeline en cada época
+        if config.USE_STREAMING_DATASET:
+            X_train = windows.dataset(train_starts, y_train, shuffle=True)
+            X_val = windows.dataset(val_starts, y_val)
+        else:
+            indices = np.random.permutation(len(train_starts))
+            train_starts, y_train = train_starts[indices], y_train[indices]
+            X_train = windows.take(train_starts)
+            X_val = windows.take(val_starts)
         # 5. Oversampling de BUY (para evitar sesgo)
         # DESACTIVADO: Ya usamos Class Weights agresivos. Usar ambos causa overfitting extremo.
         # if not config.USE_BINARY_CLASSIFICATION and config.NUM_CLASSES == 3:
@@ -1262,9 +1241,12 @@ class ContinuousLearner:
         print(f"   ℹ️ El balanceo se hará mediante CLASS_WEIGHTS durante entrenamiento")
 
         print(f"\n✅ Dataset Final Preparado:")
-        print(f"   Train: {len(X_train)} muestras (Mezclado)")
-        print(f"   Val:   {len(X_val)} muestras (Ordenado por par)")
-        print(f"   Shape: {X_train.shape}")
+        print(f"   Train: {len(y_train)} muestras (Mezclado)")
+        print(f"   Val:   {len(y_val)} muestras (Ordenado por par)")
+        print(f"   Shape: {(len(y_train),) + windows.window_shape}")
+        if config.USE_STREAMING_DATASET:
+            print(f"   Ventanas generadas con tf.data sobre {windows.features.shape} "
+                  f"({windows.features.nbytes / 1e6:.1f} MB)")
 
         # CALCULAR PESOS DE CLASES
         if config.USE_AUTO_CLASS_WEIGHTS:
@@ -1305,6 +1287,7 @@ class ContinuousLearner:
         print(f"   ⚠️ IMPORTANTE: BUY debe tener peso ALTO para ser aprendido correctamente")
 
         
+        # X_train/X_val son tf.data.Dataset (USE_STREAMING_DATASET) o arrays
         return X_train, y_train, X_val, y_val, class_weights_dict
     
     def train_initial_model(self, symbols=None, timeframe='4h', start_date=None, end_date=None, epochs=None):
@@ -1327,7 +1310,7 @@ class ContinuousLearner:
         )
         
         # Crear modelo
-        input_shape = (X_train.shape[1], X_train.shape[2])  # (lookback, n_features)
+        input_shape = (config.LOOKBACK_WINDOW, len(self.feature_extractor.feature_names))
         self.model = NeuralTradingModel(input_shape)
         
         # Mostrar resumen
@@ -1347,8 +1330,9 @@ class ContinuousLearner:
         # Guardar métricas
         self.save_metrics(self.current_version, {
             'accuracy': accuracy,
-            'train_samples': len(X_train),
-            'val_samples': len(X_val),
+            'train_samples': len(y_train),
+            'val_samples': len(y_val),
+            'features': list(self.feature_extractor.feature_names),
             'timestamp': datetime.now().isoformat(),
             'symbols': symbols or config.DEFAULT_SYMBOLS,
             'timeframe': timeframe
@@ -1385,11 +1369,19 @@ class NeuralStrategy:
         """
         self.cache = DataCache()
         self.feature_extractor = FeatureExtractor()
+        self.feature_store = FeatureStore()
         self.model = None
         self.version = version
         self.model_name = model_name
         self.input_shape = None
-        
+        self.streams = {}  # (symbol, timeframe) -> StreamingIndicatorEngine
+        self._infer_fn = None  # Inferencia compilada (ver compile_inference_fn)
+        self.signal_cache = OrderedDict()  # (modelo, symbol, timeframe, vela) -> señal
+        self.signal_cache_hits = 0
+        self.signal_cache_misses = 0
+        self.full_history_reads = 0  # Señales que no pudieron usar solo las últimas velas
+        self._full_history_warned = set()  # (symbol, timeframe) ya avisados
+
         # Cargar modelo
         if model_name is not None:
             self.load_model_by_name(model_name)
@@ -1410,9 +1402,12 @@ class NeuralStrategy:
         model, scaler, metadata = result
         self.model = model
         self.feature_extractor.scaler = scaler
+        # Solo se calculan las features con las que se entrenó el modelo
+        self.feature_extractor.set_model_features(metadata.get('features'))
         self.model_name = metadata.get('name')
         self.version = None  # Clear version when using named model
         self.input_shape = self.model.input_shape[1:]  # (lookback, features)
+        self.prepare_inference()
         
         print(f"✅ Modelo '{self.model_name}' cargado exitosamente")
         return True
@@ -1435,6 +1430,10 @@ class NeuralStrategy:
         if not self.feature_extractor.load_scaler(version):
             return False
         
+        # Features con las que se entrenó (guardadas en las métricas de la versión)
+        metrics = learner.load_metrics(version) or {}
+        self.feature_extractor.set_model_features(metrics.get('features'))
+        
         # Cargar modelo neuronal
         from tensorflow import keras
         model_path = Path(config.MODELS_DIR) / config.MODEL_NAME_FORMAT.format(version=version)
@@ -1452,10 +1451,35 @@ class NeuralStrategy:
         
         # Obtener input shape del modelo cargado
         self.input_shape = self.model.input_shape[1:]  # (lookback, features)
+        self.prepare_inference()
         
         print(f"✅ Estrategia neuronal v{version} lista")
         return True
     
+    def prepare_inference(self):
+        """Traza la función de inferencia compilada del modelo cargado"""
+        self._infer_fn = None
+        if self.model is None or not config.USE_COMPILED_INFERENCE:
+            return
+        try:
+            self._infer_fn = compile_inference_fn(self.model)
+        except Exception as e:
+            print(f"⚠️ No se pudo compilar la inferencia, se usará model.predict: {e}")
+    
+    def infer(self, X):
+        """
+        Probabilidades del modelo para un batch de ventanas
+        
+        Args:
+            X: Features (n_samples, lookback, n_features)
+        
+        Returns:
+            np.array (n_samples, n_classes)
+        """
+        if self._infer_fn is not None:
+            return self._infer_fn(X)
+        return self.model.predict(X, verbose=0)
+    
     def predict_signal(self, X):
         """
         Predice señal con etiqueta
@@ -1471,8 +1495,12 @@ class NeuralStrategy:
             X = np.expand_dims(X, axis=0)
         
         # Predicción
-        probs = self.model.predict(X, verbose=0)[0]
+        probs = self.infer(X)[0]
         
+        return self._signal_from_probs(probs)
+    
+    def _signal_from_probs(self, probs):
+        """Convierte las probabilidades de una muestra en señal (umbrales + filtros)"""
         # Clase con mayor probabilidad
         predicted_class = np.argmax(probs)
         confidence = probs[predicted_class]
@@ -1505,48 +1533,40 @@ class NeuralStrategy:
             }
         }
     
-    def get_signal(self, symbol, timeframe='4h'):
+    def get_signal(self, symbol, timeframe='4h', force_update=False):
         """
         Obtiene señal de trading para un símbolo
         
-        MODO PREDICCIÓN: Solo carga últimas N velas (eficiente)
+        MODO PREDICCIÓN: Solo carga las velas que necesitan las features del
+        modelo (ver FeatureExtractor.signal_candles).
+        La señal se memoriza por vela cerrada: hasta que cierre otra vela,
+        las llamadas repetidas solo leen las dos últimas velas (ni features
+        ni modelo).
         
         Args:
             symbol: Par de trading
             timeframe: Timeframe
+            force_update: Descargar velas nuevas aunque no hayan pasado los
+                5 minutos de DataCache.should_update (ej: justo tras un cierre)
         
         Returns:
             dict: {'signal': 'BUY'/'SELL'/'HOLD', 'confidence': float, ...}
         """
-        # Cargar solo últimas velas necesarias
-        df = self.cache.get_data(symbol, timeframe)
-        
-        if df is None or len(df) < config.LOOKBACK_WINDOW:
-            return {
-                'signal': 'HOLD',
-                'confidence': 0.0,
-                'error': 'Datos insuficientes'
-            }
-        
-        # Tomar solo últimas velas
-        df_recent = df.tail(config.LOOKBACK_WINDOW + 50)  # +50 para cálculo de indicadores
-        
-        # Extraer features
-        X = self.feature_extractor.extract_features(df_recent, fit_scaler=False)
-        
-        # Crear secuencia (solo última)
-        X_seq = self.feature_extractor.create_sequences(X)
-        
-        if len(X_seq) == 0:
-            return {
-                'signal': 'HOLD',
-                'confidence': 0.0,
-                'error': 'No se pudieron crear secuencias'
-            }
-        
-        # Predecir última secuencia
-        X_last = X_seq[-1:]
-        
+        key = self._peek_signal_key(symbol, timeframe, force_update=force_update)
+        cached = self._lookup_signal(key)
+        if cached is not None:
+            return cached
+
+        # Si se leyó la clave, las velas ya están actualizadas
+        df, error = self.load_signal_data(symbol, timeframe, force_update=force_update and key is None)
+        if error is not None:
+            return error
+
+        key = self._signal_key(symbol, timeframe, df)
+        X_last, error = self.build_signal_window(symbol, timeframe, df)
+        if error is not None:
+            return error
+
         # Verificar que modelo esté cargado
         if self.model is None:
             return {
@@ -1560,8 +1580,292 @@ class NeuralStrategy:
         result['symbol'] = symbol
         result['timestamp'] = datetime.now().isoformat()
         result['version'] = self.version
+        result['candle'] = key[-1].isoformat()
+
+        self._store_signal(key, result)
+        return dict(result)
+
+    def get_signals(self, symbols, timeframe='4h', force_update=False):
+        """
+        Obtiene señales de varios símbolos con una sola pasada del modelo
+
+        Construye la última ventana de cada símbolo (salvo las ya memorizadas
+        para su vela), las apila en un batch y llama a predict una vez.
+        Cada resultado es el mismo que daría get_signal.
+
+        Args:
+            symbols: Lista de pares
+            timeframe: Timeframe
+            force_update: Descargar velas nuevas de cada símbolo (ver get_signal)
+
+        Returns:
+            dict {symbol: dict de señal} en el mismo orden que symbols
+        """
+        results = {}
+        windows = []
+        ready = []
+
+        for symbol in symbols:
+            try:
+                peek_key = self._peek_signal_key(symbol, timeframe, force_update=force_update)
+                cached = self._lookup_signal(peek_key)
+                if cached is not None:
+                    results[symbol] = cached
+                    continue
+                df, error = self.load_signal_data(symbol, timeframe,
+                                                  force_update=force_update and peek_key is None)
+                if error is None:
+                    key = self._signal_key(symbol, timeframe, df)
+                    X_last, error = self.build_signal_window(symbol, timeframe, df)
+            except Exception as e:
+                error = {'signal': 'HOLD', 'confidence': 0.0, 'error': str(e)}
+
+            if error is None and self.model is None:
+                error = {'signal': 'HOLD', 'confidence': 0.0, 'error': 'Modelo no cargado'}
+            if error is not None:
+                results[symbol] = error
+                continue
+
+            windows.append(X_last)
+            ready.append((symbol, key))
+
+        if windows:
+            probs = self.infer(np.concatenate(windows, axis=0))
+            timestamp = datetime.now().isoformat()
+            for (symbol, key), symbol_probs in zip(ready, probs):
+                result = self._signal_from_probs(symbol_probs)
+                result['symbol'] = symbol
+                result['timestamp'] = timestamp
+                result['version'] = self.version
+                result['candle'] = key[-1].isoformat()
+                self._store_signal(key, result)
+                results[symbol] = dict(result)
+
+        return {symbol: results[symbol] for symbol in symbols}
+
+    # ================== MEMORIZACIÓN DE SEÑALES ==================
+
+    def _signal_key(self, symbol, timeframe, df):
+        """
+        Clave de la señal: (modelo, símbolo, timeframe, última vela usada)
+
+        La última secuencia termina en la penúltima vela de df (la última
+        puede seguir abierta), así que la señal solo cambia cuando cierra otra.
+        """
+        return (self.model_name, self.version, id(self.model),
+                symbol, timeframe, df['timestamp'].iloc[-2])
+
+    def _peek_signal_key(self, symbol, timeframe, force_update=False):
+        """
+        Clave de la señal leyendo solo las dos últimas velas
+
+        Permite consultar la memorización antes de cargar las velas de las
+        features (load_signal_data).
+
+        Args:
+            force_update: Descargar antes las velas nuevas (DataCache.get_tail)
+
+        Returns:
+            tuple (ver _signal_key) o None si no hay velas suficientes
+        """
+        df = self.cache.get_tail(symbol, timeframe, 2, force_update=force_update)
+        if df is None or len(df) < 2:
+            return None
+        return self._signal_key(symbol, timeframe, df)
+
+    def _lookup_signal(self, key):
+        cached = self.signal_cache.get(key)
+        if cached is None:
+            self.signal_cache_misses += 1
+            return None
+        self.signal_cache.move_to_end(key)
+        self.signal_cache_hits += 1
+        return dict(cached)
+
+    def _store_signal(self, key, result):
+        self.signal_cache[key] = dict(result)
+        self.signal_cache.move_to_end(key)
+        while len(self.signal_cache) > config.SIGNAL_CACHE_SIZE:
+            self.signal_cache.popitem(last=False)
+
+    def get_cached_signal(self, symbol, timeframe='4h'):
+        """
+        Última señal memorizada de un símbolo para el modelo actual (sin inferencia)
+
+        Returns:
+            dict de señal o None si aún no se calculó ninguna
+        """
+        model_id = (self.model_name, self.version, id(self.model))
+        for key in reversed(self.signal_cache):
+            if key[:3] == model_id and key[3] == symbol and key[4] == timeframe:
+                return dict(self.signal_cache[key])
+        return None
+
+    def signal_cache_info(self):
+        """Estadísticas de la memorización de señales (monitorización)"""
+        total = self.signal_cache_hits + self.signal_cache_misses
+        return {
+            'entries': len(self.signal_cache),
+            'max_entries': config.SIGNAL_CACHE_SIZE,
+            'hits': self.signal_cache_hits,
+            'misses': self.signal_cache_misses,
+            'hit_rate': self.signal_cache_hits / total if total > 0 else 0.0,
+            'full_history_reads': self.full_history_reads,
+        }
+
+    def load_signal_data(self, symbol, timeframe='4h', force_update=False):
+        """
+        Velas necesarias para la última señal de un símbolo
+
+        Se leen solo las últimas signal_candles() velas (los acumulados, OBV
+        y VWAP, se siembran en get_tail_window).
+
+        Args:
+            force_update: Descargar velas nuevas aunque DataCache.should_update
+                aún no lo pida
+
+        Returns:
+            tuple (df, None) o (None, dict HOLD con error)
+        """
+        # Cargar solo últimas velas necesarias (sin leer todo el histórico)
+        n_candles = self.feature_extractor.signal_candles()
+        df = self.cache.get_tail(symbol, timeframe, n_candles, force_update=force_update)
+        
+        if config.USE_STREAMING_FEATURES:
+            # El motor incremental necesita el histórico completo la primera vez
+            # (o si las velas nuevas no enlazan con la última procesada)
+            stream = self.streams.get((symbol, timeframe))
+            if (stream is None or stream.last_timestamp is None or df is None
+                    or df['timestamp'].iloc[0] > stream.last_timestamp):
+                df = self.cache.get_data(symbol, timeframe, force_update=force_update)
         
-        return result
+        if df is None or len(df) < config.LOOKBACK_WINDOW:
+            return None, {
+                'signal': 'HOLD',
+                'confidence': 0.0,
+                'error': 'Datos insuficientes'
+            }
+
+        return df, None
+
+    def build_signal_window(self, symbol, timeframe='4h', df=None):
+        """
+        Última secuencia normalizada de un símbolo lista para el modelo
+
+        Args:
+            df: Velas ya cargadas con load_signal_data (None = cargarlas)
+
+        Returns:
+            tuple (X_last (1, lookback, n_features), None) o (None, dict HOLD con error)
+        """
+        if df is None:
+            df, error = self.load_signal_data(symbol, timeframe)
+            if error is not None:
+                return None, error
+        
+        if config.USE_STREAMING_FEATURES:
+            # Features incrementales: solo se procesan las velas nuevas
+            X_last = self.get_stream_window(symbol, timeframe, df)
+        else:
+            X_last = self.get_tail_window(symbol, timeframe, df)
+
+        if X_last is None:
+            return None, {
+                'signal': 'HOLD',
+                'confidence': 0.0,
+                'error': 'No se pudieron crear secuencias'
+            }
+
+        return X_last, None
+
+    def get_tail_window(self, symbol, timeframe, df):
+        """
+        Última secuencia normalizada calculando las features sobre las últimas velas
+
+        Solo se usan las signal_candles() últimas velas de df: el calentamiento
+        justo para que la ventana coincida con el cálculo sobre el histórico
+        completo. Los acumulados (OBV, VWAP) se siembran con su valor en la
+        primera de esas velas, leído del feature store; si no lo tiene, se
+        recurre al histórico completo (ver get_full_history_features).
+
+        Returns:
+            np.array (1, lookback, n_features) o None si no hay velas suficientes
+        """
+        lookback = config.LOOKBACK_WINDOW
+        n_candles = self.feature_extractor.signal_candles()
+        df_recent = df.tail(n_candles)
+        # Con menos velas df es todo el histórico: los acumulados ya son exactos
+        seed_cols = self.feature_extractor.seed_columns() if len(df) >= n_candles else []
+
+        seeds = None
+        if seed_cols and config.USE_FEATURE_STORE:
+            seeds = self.feature_store.get_seeds(symbol, timeframe, df_recent, seed_cols)
+        if seed_cols and seeds is None:
+            X_raw = self.get_full_history_features(symbol, timeframe, df)
+        else:
+            X_raw = self.feature_extractor.extract_raw_features(df_recent, seeds=seeds)
+
+        if X_raw is None or len(X_raw) < lookback + 1:
+            return None
+
+        # Igual que create_sequences: la última secuencia termina en la vela anterior
+        X = self.feature_extractor.scale_features(X_raw[-lookback - 1:-1])
+        return X[np.newaxis]
+
+    def get_full_history_features(self, symbol, timeframe, df):
+        """
+        Features sin escalar sobre el histórico completo hasta la última vela de df
+
+        Alternativa de get_tail_window cuando no hay semillas de los
+        acumulados. Con el feature store activo lo actualiza, así que las
+        siguientes llamadas ya pueden sembrar. Se avisa una vez por
+        símbolo/timeframe y se cuenta en signal_cache_info().
+
+        Returns:
+            np.array (n_velas, n_features) o None si no hay histórico
+        """
+        self.full_history_reads += 1
+        if (symbol, timeframe) not in self._full_history_warned:
+            self._full_history_warned.add((symbol, timeframe))
+            print(f"⚠️ {symbol} {timeframe}: sin semillas de OBV/VWAP en el feature store, "
+                  f"calculando sobre el histórico completo")
+        history = self.cache.load_from_cache(symbol, timeframe)
+        if history is None:
+            return None
+        history = history[history['timestamp'] <= df['timestamp'].iloc[-1]]
+
+        X_raw = None
+        if config.USE_FEATURE_STORE:
+            X_raw = self.feature_store.get_features(symbol, timeframe, history, self.feature_extractor)
+        if X_raw is None:
+            X_raw = self.feature_extractor.extract_raw_features(history)
+        return X_raw
+
+    def get_stream_window(self, symbol, timeframe, df):
+        """
+        Última secuencia normalizada usando el motor incremental de features
+
+        La primera llamada por símbolo/timeframe recorre el histórico completo;
+        las siguientes solo procesan las velas nuevas de df.
+
+        Returns:
+            np.array (1, lookback, n_features) o None si no hay velas suficientes
+        """
+        key = (symbol, timeframe)
+        if key not in self.streams:
+            self.streams[key] = self.feature_extractor.create_stream()
+        stream = self.streams[key]
+        stream.update_from(df)
+
+        lookback = config.LOOKBACK_WINDOW
+        rows = stream.window()
+        if len(rows) < lookback + 1:
+            return None
+
+        # Igual que create_sequences: la última secuencia termina en la vela anterior
+        X = self.feature_extractor.scaler.transform(rows[-lookback - 1:-1])
+        X = np.clip(X, 0, 1)
+        return X[np.newaxis]
 
 
 # ==================== CLI ====================
@@ -1614,6 +1918,7 @@ if __name__ == '__main__':
                 'start_date': args.start_date or 'all',
                 'end_date': args.end_date or 'present',
                 'description': f"Model trained on {args.symbols or config.DEFAULT_SYMBOLS}",
+                'features': list(learner.feature_extractor.feature_names),
             }
             
             if manager.save_model(model.model, learner.feature_extractor.scaler, args.name, metadata):
@@ -1644,7 +1949,11 @@ if __name__ == '__main__':
         print(f"✅ Datos cargados: {len(df)} velas")
         
         fe = FeatureExtractor()
-        X = fe.extract_features(df, fit_scaler=True)
+        if config.USE_FEATURE_STORE:
+            X_raw = FeatureStore().get_features(args.symbol, args.timeframe, df, fe)
+            X = fe.scale_features(X_raw, fit_scaler=True)
+        else:
+            X = fe.extract_features(df, fit_scaler=True)
         
         print(f"✅ Features extraídas: {X.shape}")
         print(f"   Features: {fe.feature_names}")
@@ -0,0 +1,576 @@
+"""
+Streaming Indicators - Cálculo incremental de features vela a vela
+
+Contrapartida con estado de FeatureExtractor.calculate_technical_indicators,
+calculate_price_features y calculate_market_regime. Mantiene el estado de
+cada indicador (EMAs, medias móviles, varianzas, mín/máx, acumulados) y al
+llegar una vela cerrada actualiza todas las features en tiempo constante,
+sin recalcular el histórico.
+
+Las medias y varianzas móviles replican la aritmética de pandas (suma de
+Kahan y Welford con compensación), por lo que la fila producida coincide
+bit a bit con la del cálculo batch sobre el mismo histórico.
+
+Uso:
+    engine = StreamingIndicatorEngine(feature_names)
+    engine.warm_up(df)                # Histórico completo (una sola vez)
+    row = engine.update(new_candle)   # O(1) por vela nueva
+"""
+
+import copy
+import math
+from collections import deque
+
+import numpy as np
+
+from .config import config
+
+
+class _RollingMean:
+    """Media móvil online equivalente a pandas rolling(window).mean()"""
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_count = 0
+        self.prev_value = None
+
+    def update(self, val):
+        self.values.append(val)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.compensation_remove
+                t = self.sum_x + y
+                self.compensation_remove = t - self.sum_x - y
+                self.sum_x = t
+                if math.copysign(1.0, old) < 0:
+                    self.neg_ct -= 1
+
+        if self.prev_value is None:
+            self.prev_value = val
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.same_count += 1
+            else:
+                self.same_count = 1
+            self.prev_value = val
+
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.same_count >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            return result
+        return np.nan
+
+
+class _RollingStd:
+    """Desviación estándar móvil online equivalente a pandas rolling(window).std()"""
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_count = 0
+        self.prev_value = None
+
+    def update(self, val):
+        self.values.append(val)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                if self.nobs:
+                    prev_mean = self.mean_x - self.compensation_remove
+                    y = old - self.compensation_remove
+                    t = y - self.mean_x
+                    self.compensation_remove = t + self.mean_x - y
+                    self.mean_x = self.mean_x - t / self.nobs
+                    self.ssqdm_x = self.ssqdm_x - (old - prev_mean) * (old - self.mean_x)
+                else:
+                    self.mean_x = 0.0
+                    self.ssqdm_x = 0.0
+
+        if self.prev_value is None:
+            self.prev_value = val
+        if val == val:
+            if val == self.prev_value:
+                self.same_count += 1
+            else:
+                self.same_count = 1
+            self.prev_value = val
+            self.nobs += 1
+            prev_mean = self.mean_x - self.compensation_add
+            y = val - self.compensation_add
+            t = y - self.mean_x
+            self.compensation_add = t + self.mean_x - y
+            self.mean_x = self.mean_x + t / self.nobs
+            self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+        if self.nobs >= self.window and self.nobs > self.ddof:
+            if self.nobs == 1 or self.same_count >= self.nobs:
+                return 0.0
+            var = self.ssqdm_x / (self.nobs - self.ddof)
+            return math.sqrt(var) if var > 0 else 0.0
+        return np.nan
+
+
+class _RollingExtreme:
+    """Mínimo/máximo móvil equivalente a pandas rolling(window).min()/max()"""
+
+    def __init__(self, window, func, min_periods=None):
+        self.window = window
+        self.func = func
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque(maxlen=window)
+
+    def update(self, val):
+        self.values.append(val)
+        valid = [v for v in self.values if v == v]
+        if len(valid) >= self.min_periods and valid:
+            return self.func(valid)
+        return np.nan
+
+
+class _RollingMAD:
+    """Desviación media absoluta móvil (kernel usado por el CCI)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, val):
+        self.values.append(val)
+        if len(self.values) < self.window:
+            return np.nan
+        x = np.array(self.values)
+        if np.isnan(x).any():
+            return np.nan
+        return np.abs(x - x.sum() / len(x)).mean()
+
+
+class _Ewm:
+    """EMA online equivalente a pandas ewm(span, adjust=False).mean()"""
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        self.alpha = 1. / (1. + com)
+        self.old_wt_factor = 1. - self.alpha
+        self.old_wt = 1.
+        self.weighted = None
+
+    def update(self, cur):
+        if self.weighted is None:
+            self.weighted = cur
+            return cur
+        if self.weighted == self.weighted:
+            if cur == cur:
+                self.old_wt *= self.old_wt_factor
+                if self.weighted != cur:
+                    self.weighted = self.old_wt * self.weighted + self.alpha * cur
+                    self.weighted /= (self.old_wt + self.alpha)
+                self.old_wt = 1.
+        elif cur == cur:
+            self.weighted = cur
+        return self.weighted
+
+
+class StreamingIndicatorEngine:
+    """
+    Motor incremental de features para un símbolo/timeframe
+
+    Mantiene el estado de todos los indicadores configurados en NeuralConfig
+    y produce, por cada vela cerrada, la misma fila de features que
+    FeatureExtractor calcula en batch sobre el histórico completo.
+    """
+
+    def __init__(self, feature_names=None, window_size=None):
+        """
+        Args:
+            feature_names: Columnas (y orden) del vector de features.
+                           None = todas las columnas calculadas.
+            window_size: Nº de vectores recientes a conservar (default: LOOKBACK_WINDOW + 1)
+        """
+        self.columns = self.output_columns()
+        self.feature_names = list(feature_names) if feature_names else list(self.columns)
+        self.window_size = window_size or config.LOOKBACK_WINDOW + 1
+
+        self.last_timestamp = None
+        self.last_row = None
+        self.candles_seen = 0
+        self._rows = deque(maxlen=self.window_size)
+        self._last_valid = {}
+        self._prev_state = None
+
+        ind = config.TECHNICAL_INDICATORS
+        self._ema = {name: _Ewm(period) for name, period in ind.items()
+                     if name in ['ema_fast', 'ema_slow', 'ema_trend']}
+        self._ema_hist = {name: deque(maxlen=4) for name in self._ema}
+
+        self._prev_close = np.nan
+        self._prev_high = np.nan
+        self._prev_low = np.nan
+        self._prev_volume = np.nan
+
+        if 'rsi' in ind:
+            self._rsi_gain = _RollingMean(ind['rsi'])
+            self._rsi_loss = _RollingMean(ind['rsi'])
+        if 'atr' in ind:
+            self._atr = _RollingMean(ind['atr'])
+        if 'adx' in ind:
+            self._plus_dm = _RollingMean(ind['adx'])
+            self._minus_dm = _RollingMean(ind['adx'])
+            self._adx = _RollingMean(ind['adx'])
+            if 'atr' not in ind:
+                self._atr = _RollingMean(ind['adx'])
+        if self._has_macd():
+            self._macd_fast = _Ewm(ind['macd_fast'])
+            self._macd_slow = _Ewm(ind['macd_slow'])
+            self._macd_signal = _Ewm(ind['macd_signal'])
+        if 'bb_period' in ind and 'bb_std' in ind:
+            self._bb_mean = _RollingMean(ind['bb_period'])
+            self._bb_std = _RollingStd(ind['bb_period'])
+        if 'stoch_k' in ind and 'stoch_d' in ind:
+            self._stoch_low = _RollingExtreme(ind['stoch_k'], min)
+            self._stoch_high = _RollingExtreme(ind['stoch_k'], max)
+            self._stoch_d = _RollingMean(ind['stoch_d'])
+        if 'cci' in ind:
+            self._cci_mean = _RollingMean(ind['cci'])
+            self._cci_mad = _RollingMAD(ind['cci'])
+
+        self._vwap_pv = 0.0
+        self._vwap_v = 0.0
+        self._obv = None
+        self._volume_mean = _RollingMean(20)
+        self._volatility = _RollingStd(20)
+        self._vol_min = _RollingExtreme(50, min, min_periods=1)
+        self._vol_max = _RollingExtreme(50, max, min_periods=1)
+
+    @staticmethod
+    def _has_macd():
+        return all(k in config.TECHNICAL_INDICATORS for k in ['macd_fast', 'macd_slow', 'macd_signal'])
+
+    @classmethod
+    def output_columns(cls):
+        """Columnas que produce el motor, en el mismo orden que el cálculo batch"""
+        ind = config.TECHNICAL_INDICATORS
+        cols = []
+        for name in ind:
+            if name in ['ema_fast', 'ema_slow', 'ema_trend']:
+                cols += [name, f'{name}_slope']
+        if 'rsi' in ind:
+            cols.append('rsi')
+        if 'atr' in ind or 'adx' in ind:
+            cols.append('atr')
+        if 'adx' in ind:
+            cols.append('adx')
+        if cls._has_macd():
+            cols += ['macd_line', 'macd_signal', 'macd_histogram']
+        if 'bb_period' in ind and 'bb_std' in ind:
+            cols += ['bb_middle', 'bb_upper', 'bb_lower', 'bb_percent', 'bb_bandwidth']
+        if 'stoch_k' in ind and 'stoch_d' in ind:
+            cols += ['stoch_k', 'stoch_d']
+        if 'cci' in ind:
+            cols.append('cci')
+        if 'vwap' in config.VOLUME_FEATURES:
+            # Sumas del VWAP (internas: las guarda el feature store para sembrar)
+            cols += ['_vwap_pv', '_vwap_volume']
+        for name in ['vwap', 'obv', 'volume_ratio']:
+            if name in config.VOLUME_FEATURES:
+                cols.append(name)
+        for name in ['returns', 'log_returns', 'volatility', 'hl_ratio', 'oc_ratio', 'volume_change']:
+            if name in config.PRICE_FEATURES:
+                cols.append(name)
+        if 'ema_cross' in config.CROSS_FEATURES and 'ema_fast' in cols and 'ema_slow' in cols:
+            cols.append('ema_cross')
+        if 'price_to_ema_fast' in config.CROSS_FEATURES and 'ema_fast' in cols:
+            cols.append('price_to_ema_fast')
+        if 'price_to_ema_slow' in config.CROSS_FEATURES and 'ema_slow' in cols:
+            cols.append('price_to_ema_slow')
+        if 'ema_trend' in cols:
+            cols += ['dist_to_trend', 'trend_direction']
+        if 'atr' in cols:
+            cols.append('volatility_regime')
+        if 'adx' in cols:
+            cols.append('trend_strength')
+        return cols
+
+    def warm_up(self, df):
+        """
+        Inicializa el estado recorriendo un histórico OHLCV completo
+
+        Args:
+            df: DataFrame con columnas [timestamp, open, high, low, close, volume]
+
+        Returns:
+            self
+        """
+        cols = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        candles = list(df[cols].itertuples(index=False, name=None))
+        # Solo la última vela necesita snapshot (puede ser reemplazada)
+        for i, candle in enumerate(candles):
+            self.update(candle, _snapshot=(i == len(candles) - 1))
+        return self
+
+    def update_from(self, df):
+        """
+        Procesa solo las velas de df posteriores (o igual) a la última vista
+
+        Returns:
+            int: Nº de velas procesadas
+        """
+        if self.last_timestamp is None:
+            self.warm_up(df)
+            return len(df)
+        new = df[df['timestamp'] >= self.last_timestamp]
+        self.warm_up(new)
+        return len(new)
+
+    def update(self, candle, _snapshot=True):
+        """
+        Actualiza el estado con una vela y devuelve la fila de features
+
+        Una vela con el mismo timestamp que la última reemplaza a ésta
+        (vela aún abierta que cambió); velas anteriores se ignoran.
+
+        Args:
+            candle: Tupla (timestamp, open, high, low, close, volume) o dict/Series
+
+        Returns:
+            dict con todas las columnas calculadas, o None si la vela es antigua
+        """
+        if isinstance(candle, tuple):
+            ts, o, h, l, c, v = candle
+        else:
+            ts, o, h, l, c, v = (candle['timestamp'], candle['open'], candle['high'],
+                                 candle['low'], candle['close'], candle['volume'])
+
+        if self.last_timestamp is not None:
+            if ts < self.last_timestamp:
+                return None
+            if ts == self.last_timestamp:
+                if self._prev_state is None:
+                    return None
+                self._restore(self._prev_state)
+        self._prev_state = self._snapshot() if _snapshot else None
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row = self._compute(np.float64(o), np.float64(h), np.float64(l),
+                                np.float64(c), np.float64(v))
+
+        self.last_timestamp = ts
+        self.last_row = row
+        self.candles_seen += 1
+        self._rows.append(self._to_vector(row))
+        return row
+
+    def _compute(self, o, h, l, c, v):
+        ind = config.TECHNICAL_INDICATORS
+        row = {}
+        prev_c = self._prev_close
+
+        # EMAs + slope (delta de 3 periodos normalizado)
+        for name, ewm in self._ema.items():
+            ema = ewm.update(c)
+            hist = self._ema_hist[name]
+            hist.append(ema)
+            row[name] = ema
+            row[f'{name}_slope'] = ((ema - hist[0]) / ema) * 100 if len(hist) == 4 else np.nan
+
+        # RSI
+        if 'rsi' in ind:
+            delta = c - prev_c
+            gain = self._rsi_gain.update(delta if delta > 0 else 0.0)
+            loss = self._rsi_loss.update(-(delta if delta < 0 else 0.0))
+            rs = np.float64(gain) / loss
+            row['rsi'] = 100 - (100 / (1 + rs))
+
+        # ATR (True Range)
+        if 'atr' in ind or 'adx' in ind:
+            ranges = [h - l, np.abs(h - prev_c), np.abs(l - prev_c)]
+            true_range = max(r for r in ranges if r == r) if any(r == r for r in ranges) else np.nan
+            row['atr'] = np.float64(self._atr.update(true_range))
+
+        # ADX
+        if 'adx' in ind:
+            high_diff = h - self._prev_high
+            low_diff = -(l - self._prev_low)
+            plus_dm = high_diff if (high_diff > low_diff) and (high_diff > 0) else 0.0
+            minus_dm = low_diff if (low_diff > high_diff) and (low_diff > 0) else 0.0
+            plus_di = 100 * (np.float64(self._plus_dm.update(plus_dm)) / row['atr'])
+            minus_di = 100 * (np.float64(self._minus_dm.update(minus_dm)) / row['atr'])
+            dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+            row['adx'] = np.float64(self._adx.update(dx))
+
+        # MACD
+        if self._has_macd():
+            macd_line = self._macd_fast.update(c) - self._macd_slow.update(c)
+            macd_signal = self._macd_signal.update(macd_line)
+            row['macd_line'] = macd_line
+            row['macd_signal'] = macd_signal
+            row['macd_histogram'] = macd_line - macd_signal
+
+        # Bollinger Bands
+        if 'bb_period' in ind and 'bb_std' in ind:
+            std_dev = ind['bb_std']
+            middle = np.float64(self._bb_mean.update(c))
+            bb_std = np.float64(self._bb_std.update(c))
+            upper = middle + (bb_std * std_dev)
+            lower = middle - (bb_std * std_dev)
+            row['bb_middle'] = middle
+            row['bb_upper'] = upper
+            row['bb_lower'] = lower
+            row['bb_percent'] = (c - lower) / (upper - lower)
+            row['bb_bandwidth'] = (upper - lower) / middle
+
+        # Stochastic Oscillator
+        if 'stoch_k' in ind and 'stoch_d' in ind:
+            low_min = np.float64(self._stoch_low.update(l))
+            high_max = np.float64(self._stoch_high.update(h))
+            stoch_k = 100 * (c - low_min) / (high_max - low_min)
+            row['stoch_k'] = stoch_k
+            row['stoch_d'] = np.float64(self._stoch_d.update(stoch_k))
+
+        # CCI
+        if 'cci' in ind:
+            tp = (h + l + c) / 3
+            sma_tp = self._cci_mean.update(tp)
+            mad = self._cci_mad.update(tp)
+            row['cci'] = (tp - sma_tp) / (0.015 * np.float64(mad))
+
+        # VWAP acumulado
+        if 'vwap' in config.VOLUME_FEATURES:
+            self._vwap_pv = self._vwap_pv + ((h + l + c) / 3) * v
+            self._vwap_v = self._vwap_v + v
+            row['_vwap_pv'] = np.float64(self._vwap_pv)
+            row['_vwap_volume'] = np.float64(self._vwap_v)
+            row['vwap'] = row['_vwap_pv'] / row['_vwap_volume']
+
+        # OBV
+        if 'obv' in config.VOLUME_FEATURES:
+            if self._obv is None:
+                self._obv = 0
+            elif c > prev_c:
+                self._obv = self._obv + v
+            elif c < prev_c:
+                self._obv = self._obv - v
+            row['obv'] = np.float64(self._obv)
+
+        volume_mean = self._volume_mean.update(v)
+        if 'volume_ratio' in config.VOLUME_FEATURES:
+            row['volume_ratio'] = v / np.float64(volume_mean)
+
+        # Features de precio
+        returns = c / prev_c - 1
+        volatility = self._volatility.update(returns)
+        if 'returns' in config.PRICE_FEATURES:
+            row['returns'] = returns
+        if 'log_returns' in config.PRICE_FEATURES:
+            row['log_returns'] = np.log(c / prev_c)
+        if 'volatility' in config.PRICE_FEATURES:
+            row['volatility'] = np.float64(volatility)
+        if 'hl_ratio' in config.PRICE_FEATURES:
+            row['hl_ratio'] = (h - l) / c
+        if 'oc_ratio' in config.PRICE_FEATURES:
+            row['oc_ratio'] = (c - o) / o
+        if 'volume_change' in config.PRICE_FEATURES:
+            row['volume_change'] = v / self._prev_volume - 1
+
+        # Cross features
+        if 'ema_cross' in self.columns:
+            row['ema_cross'] = (row['ema_fast'] - row['ema_slow']) / c
+        if 'price_to_ema_fast' in self.columns:
+            row['price_to_ema_fast'] = (c - row['ema_fast']) / c
+        if 'price_to_ema_slow' in self.columns:
+            row['price_to_ema_slow'] = (c - row['ema_slow']) / c
+        if 'ema_trend' in row:
+            row['dist_to_trend'] = (c - row['ema_trend']) / row['ema_trend']
+
+        # Régimen de mercado
+        if 'ema_trend' in row:
+            row['trend_direction'] = float(c > row['ema_trend'])
+        if 'atr' in row:
+            vol_raw = row['atr'] / c
+            vol_min = np.float64(self._vol_min.update(vol_raw))
+            vol_max = np.float64(self._vol_max.update(vol_raw))
+            vol_range = vol_max - vol_min
+            if vol_range == 0:
+                vol_range = 1
+            regime = (vol_raw - vol_min) / vol_range
+            row['volatility_regime'] = regime if regime == regime else 0.5
+        if 'adx' in row:
+            row['trend_strength'] = float(row['adx'] > 25)
+
+        self._prev_close = c
+        self._prev_high = h
+        self._prev_low = l
+        self._prev_volume = v
+        return row
+
+    def _to_vector(self, row):
+        """
+        Convierte una fila en vector de features con la misma limpieza que
+        extract_features (inf → NaN → último valor válido → 0)
+        """
+        vector = np.empty(len(self.feature_names))
+        for i, name in enumerate(self.feature_names):
+            value = row[name]
+            if value == value and not math.isinf(value):
+                self._last_valid[name] = value
+            else:
+                value = self._last_valid.get(name, 0.0)
+            vector[i] = value
+        return vector
+
+    def window(self, size=None):
+        """
+        Devuelve los últimos vectores de features (sin escalar)
+
+        Args:
+            size: Nº de filas (default: todas las conservadas)
+
+        Returns:
+            np.array (n_rows, n_features)
+        """
+        rows = list(self._rows)
+        if size is not None:
+            rows = rows[-size:]
+        if not rows:
+            return np.empty((0, len(self.feature_names)))
+        return np.vstack(rows)
+
+    # Atributos que no cambian vela a vela (no se copian en el snapshot)
+    _STATIC_ATTRS = ('_prev_state', '_rows', 'columns', 'feature_names', 'window_size')
+
+    def _snapshot(self):
+        state = {k: v for k, v in self.__dict__.items() if k not in self._STATIC_ATTRS}
+        # Los vectores de _rows no se modifican, basta copiar la deque
+        return copy.deepcopy(state), deque(self._rows, maxlen=self.window_size)
+
+    def _restore(self, snapshot):
+        state, rows = snapshot
+        self.__dict__.update(copy.deepcopy(state))
+        self._rows = deque(rows, maxlen=self.window_size)
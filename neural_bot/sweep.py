@@ -0,0 +1,181 @@
+"""
+Risk Sweep - Barrido de parámetros de riesgo sobre predicciones fijas
+
+Las predicciones del modelo no dependen de SL/TP, trailing ni umbrales de
+confianza, así que se calculan una sola vez por símbolo (o se leen de la
+caché de predicciones) y cada combinación de parámetros solo ejecuta el
+simulador NumPy. Las combinaciones se reparten en bloques entre procesos.
+
+Uso:
+    grid = build_grid({'stop_loss_pct': parse_grid('-0.02:-0.06:-0.01'),
+                       'take_profit_pct': parse_grid('0.04,0.08,0.12')})
+    table = run_sweep(series, grid, capital_per_pair=50, workers=4)
+"""
+
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .backtest import NeuralBacktest
+from .config import config
+from .simulator import simulate_trades
+
+
+# Parámetros de simulate_trades que se pueden barrer -> atributo de Config
+RISK_PARAMS = {
+    'stop_loss_pct': 'STOP_LOSS_PCT',
+    'take_profit_pct': 'TAKE_PROFIT_PCT',
+    'trailing_stop_pct': 'TRAILING_STOP_PCT',
+    'trailing_activation_pct': 'TRAILING_ACTIVATION_PCT',
+    'min_confidence_buy': 'MIN_CONFIDENCE_BUY',
+    'min_confidence_sell': 'MIN_CONFIDENCE_SELL',
+}
+
+# Columnas de métricas y si un valor mayor es mejor (para ordenar)
+SWEEP_METRICS = {
+    'roi_net': True,
+    'sharpe_ratio': True,
+    'max_drawdown': False,
+    'win_rate': True,
+    'total_trades': True,
+}
+
+# Combinaciones por tarea enviada a cada proceso
+SWEEP_CHUNK_SIZE = 16
+
+
+def parse_grid(text):
+    """
+    Valores de un parámetro desde texto
+
+    Acepta una lista separada por comas ("0.02,0.04,0.08") o un rango
+    inicio:fin:paso con el fin incluido ("0.02:0.10:0.02").
+
+    Returns:
+        list de floats
+    """
+    text = text.strip()
+    if ':' in text:
+        start, stop, step = (float(v) for v in text.split(':'))
+        if step == 0:
+            raise ValueError(f"Paso 0 en el rango '{text}'")
+        count = int(round((stop - start) / step)) + 1
+        if count < 1:
+            raise ValueError(f"Rango vacío '{text}'")
+        return [round(start + step * k, 10) for k in range(count)]
+    return [float(v) for v in text.split(',') if v.strip()]
+
+
+def build_grid(grids):
+    """
+    Producto cartesiano de los valores de cada parámetro
+
+    Args:
+        grids: dict {parámetro de RISK_PARAMS: lista de valores}; los que
+            falten se fijan al valor actual de Config
+
+    Returns:
+        list de dicts {parámetro: valor}, uno por combinación
+    """
+    unknown = set(grids) - set(RISK_PARAMS)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+
+    names = list(RISK_PARAMS)
+    values = [grids.get(name) or [getattr(config, RISK_PARAMS[name])] for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def evaluate_combination(series, params, capital_per_pair):
+    """
+    Simula una combinación de parámetros en todos los símbolos
+
+    Args:
+        series: Lista de (symbol, timestamps, closes, probs)
+        params: dict de parámetros de riesgo
+        capital_per_pair: Capital por símbolo
+
+    Returns:
+        dict con los parámetros y las métricas agregadas (como el resumen
+        de backtest_multiple: medias por símbolo y trades totales)
+    """
+    metrics = []
+    for symbol, timestamps, closes, probs in series:
+        trades, equity = simulate_trades(timestamps, closes, probs, capital_per_pair, symbol=symbol, **params)
+        metrics.append(NeuralBacktest.calculate_metrics(trades, equity, capital_per_pair))
+
+    row = dict(params)
+    row.update({
+        'roi_net': np.mean([m['roi_net'] for m in metrics]),
+        'sharpe_ratio': np.mean([m['sharpe_ratio'] for m in metrics]),
+        'max_drawdown': np.mean([m['max_drawdown'] for m in metrics]),
+        'worst_drawdown': max(m['max_drawdown'] for m in metrics),
+        'win_rate': np.mean([m['win_rate'] for m in metrics]),
+        'total_trades': sum(m['total_trades'] for m in metrics),
+    })
+    return row
+
+
+# Datos de cada proceso del pool (se envían una sola vez en el initializer)
+_worker_series = None
+_worker_capital = None
+
+
+def _init_sweep_worker(series, capital_per_pair):
+    global _worker_series, _worker_capital
+    _worker_series = series
+    _worker_capital = capital_per_pair
+
+
+def _evaluate_chunk(combos):
+    return [evaluate_combination(_worker_series, params, _worker_capital) for params in combos]
+
+
+def run_sweep(series, grid, capital_per_pair, workers=1, sort_by='roi_net'):
+    """
+    Evalúa todas las combinaciones y las ordena
+
+    Args:
+        series: Lista de (symbol, timestamps, closes, probs) con las
+            predicciones ya calculadas
+        grid: Lista de combinaciones (build_grid)
+        capital_per_pair: Capital por símbolo
+        workers: Procesos en paralelo (1 = en este proceso)
+        sort_by: Métrica de SWEEP_METRICS para el ranking
+
+    Returns:
+        DataFrame con una fila por combinación, columna 'rank' (1 = mejor)
+    """
+    if sort_by not in SWEEP_METRICS:
+        raise ValueError(f"Métrica de orden desconocida: {sort_by}")
+
+    series = [(symbol, np.asarray(ts), np.asarray(closes), np.asarray(probs))
+              for symbol, ts, closes, probs in series]
+    chunks = [grid[i:i + SWEEP_CHUNK_SIZE] for i in range(0, len(grid), SWEEP_CHUNK_SIZE)]
+
+    rows = []
+    if workers > 1 and len(chunks) > 1:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=context,
+            initializer=_init_sweep_worker,
+            initargs=(series, capital_per_pair)
+        ) as executor:
+            for done, chunk_rows in enumerate(executor.map(_evaluate_chunk, chunks), 1):
+                rows.extend(chunk_rows)
+                if done % 10 == 0 or done == len(chunks):
+                    print(f"   Progreso: {len(rows)}/{len(grid)} combinaciones")
+    else:
+        for params in grid:
+            rows.append(evaluate_combination(series, params, capital_per_pair))
+            if len(rows) % 100 == 0:
+                print(f"   Progreso: {len(rows)}/{len(grid)} combinaciones")
+
+    table = pd.DataFrame(rows)
+    table = table.sort_values(sort_by, ascending=not SWEEP_METRICS[sort_by], kind='stable')
+    table.insert(0, 'rank', range(1, len(table) + 1))
+    return table.reset_index(drop=True)
@@ -0,0 +1,132 @@
+"""
+Training Windows - Ventanas de entrenamiento generadas por índice con tf.data
+
+En lugar de materializar X_seq (n_ventanas, lookback, n_features), guarda
+solo las matrices 2-D de features de cada símbolo (float32, concatenadas) y
+describe cada ventana por su fila inicial. El pipeline tf.data baraja los
+índices de inicio, forma los batches de índices y reúne las ventanas con
+tf.gather justo antes de entregarlas al modelo (con prefetch), así que la
+memoria es filas x features en vez de filas x lookback x features.
+
+La ventana con inicio s contiene las filas [s, s + lookback) y su label es
+el de la fila s + lookback (igual que FeatureExtractor.create_sequences).
+
+Uso:
+    windows = TrainingWindows()
+    offset = windows.add(X)            # una vez por símbolo
+    starts = offset + np.arange(n_seq)
+    train_ds = windows.dataset(starts, labels, shuffle=True)
+"""
+
+import numpy as np
+import tensorflow as tf
+
+from .config import config
+
+
+class TrainingWindows:
+    """Matrices de features por símbolo + ventanas deslizantes bajo demanda"""
+
+    def __init__(self, lookback=None):
+        """
+        Args:
+            lookback: Filas por ventana (default: Config.LOOKBACK_WINDOW)
+        """
+        self.lookback = lookback or config.LOOKBACK_WINDOW
+        self._blocks = []
+        self._rows = 0
+        self._X = None
+        self._X_tensor = None
+
+    def add(self, X):
+        """
+        Añade la matriz de features de un símbolo
+
+        Args:
+            X: Features normalizadas (n_samples, n_features)
+
+        Returns:
+            int: Fila global donde empieza este símbolo (sumar a los índices
+            de ventana locales)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if self._blocks and X.shape[1] != self._blocks[0].shape[1]:
+            raise ValueError(f"Nº de features distinto entre símbolos: {X.shape[1]} vs {self._blocks[0].shape[1]}")
+
+        offset = self._rows
+        self._blocks.append(X)
+        self._rows += len(X)
+        self._X = None
+        self._X_tensor = None
+        return offset
+
+    @property
+    def features(self):
+        """Matriz 2-D con las filas de todos los símbolos (float32)"""
+        if self._X is None:
+            if len(self._blocks) == 1:
+                self._X = self._blocks[0]
+            else:
+                self._X = np.concatenate(self._blocks, axis=0)
+            # Los bloques ya están en _X; no mantener dos copias
+            self._blocks = [self._X]
+        return self._X
+
+    @property
+    def n_features(self):
+        return self.features.shape[1]
+
+    @property
+    def window_shape(self):
+        """(lookback, n_features): input_shape del modelo"""
+        return (self.lookback, self.n_features)
+
+    def take(self, starts):
+        """
+        Materializa en NumPy las ventanas indicadas
+
+        Args:
+            starts: Índices globales de inicio de ventana
+
+        Returns:
+            np.ndarray (len(starts), lookback, n_features) float32
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        return self.features[starts[:, None] + np.arange(self.lookback)]
+
+    def dataset(self, starts, labels, batch_size=None, shuffle=False, seed=None):
+        """
+        Pipeline tf.data que produce batches (ventanas, labels)
+
+        Args:
+            starts: Índices globales de inicio de ventana
+            labels: Label de cada ventana
+            batch_size: Tamaño de batch (default: Config.BATCH_SIZE)
+            shuffle: Barajar los índices (de nuevo en cada época)
+            seed: Semilla del barajado (default: Config.RANDOM_SEED)
+
+        Returns:
+            tf.data.Dataset de (batch, lookback, n_features), (batch,)
+        """
+        batch_size = batch_size or config.BATCH_SIZE
+        seed = config.RANDOM_SEED if seed is None else seed
+
+        if self._X_tensor is None:
+            self._X_tensor = tf.convert_to_tensor(self.features)
+        X = self._X_tensor
+        offsets = tf.range(self.lookback, dtype=tf.int64)
+
+        def gather_windows(batch_starts, batch_labels):
+            return tf.gather(X, batch_starts[:, None] + offsets), batch_labels
+
+        ds = tf.data.Dataset.from_tensor_slices((
+            np.asarray(starts, dtype=np.int64),
+            np.asarray(labels)
+        ))
+        if shuffle:
+            # El buffer solo contiene pares (inicio, label): barajado completo
+            ds = ds.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+
+        return (ds.batch(batch_size)
+                  .map(gather_windows, num_parallel_calls=tf.data.AUTOTUNE)
+                  .prefetch(tf.data.AUTOTUNE))
@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class PriceService:
+    """
+    Precios actuales compartidos por el bot con una sola petición por ciclo.
+
+    Pide los tickers de todos los símbolos configurados en una única llamada
+    bulk (fetch_tickers) y los guarda con un TTL corto, de modo que análisis,
+    chequeos de stops y cálculos de equity reutilizan el mismo precio.
+    """
+
+    def __init__(self, exchange, symbols, ttl=5.0):
+        """
+        Args:
+            exchange: Objeto tipo ccxt con fetch_tickers/fetch_ticker
+                (ej: ccxt.binance o data_cache.CsvExchange para pruebas)
+            symbols: Símbolos que se piden siempre juntos
+            ttl: Segundos que un precio se considera vigente
+        """
+        self.exchange = exchange
+        self.symbols = list(symbols)
+        self.ttl = ttl
+        self.requests = 0
+        self._prices = {}  # symbol -> (precio, time.monotonic())
+        self._lock = threading.Lock()
+
+    def refresh(self, symbols=None):
+        """
+        Descarga los precios de todos los símbolos en una sola petición
+
+        Args:
+            symbols: Símbolos adicionales a los configurados
+
+        Returns:
+            dict {symbol: precio} con los precios descargados
+        """
+        wanted = list(dict.fromkeys(self.symbols + list(symbols or [])))
+
+        try:
+            self.requests += 1
+            tickers = self.exchange.fetch_tickers(wanted)
+        except Exception as e:
+            print(f"❌ Error precios {', '.join(wanted)}: {e}")
+            return {}
+
+        now = time.monotonic()
+        prices = {}
+        with self._lock:
+            for symbol in wanted:
+                ticker = tickers.get(symbol)
+                if ticker and ticker.get('last') is not None:
+                    prices[symbol] = ticker['last']
+                    self._prices[symbol] = (ticker['last'], now)
+        return prices
+
+    def get_prices(self, symbols=None):
+        """
+        Precios vigentes (refresca en bloque si alguno está caducado)
+
+        Returns:
+            dict {symbol: precio o None}
+        """
+        symbols = list(symbols) if symbols is not None else self.symbols
+        now = time.monotonic()
+
+        with self._lock:
+            prices = {s: self._prices[s][0] for s in symbols
+                      if s in self._prices and now - self._prices[s][1] <= self.ttl}
+
+        # Si la petición falla no se devuelve un precio caducado
+        stale = [s for s in symbols if s not in prices]
+        if stale:
+            prices.update(self.refresh(stale))
+
+        return {s: prices.get(s) for s in symbols}
+
+    def get_price(self, symbol):
+        """Precio vigente de un símbolo (None si no se pudo obtener)"""
+        return self.get_prices([symbol])[symbol]
+
+    def invalidate(self):
+        """Descarta los precios guardados (el siguiente acceso vuelve a pedirlos)"""
+        with self._lock:
+            self._prices.clear()
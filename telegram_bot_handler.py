@@ -8,18 +8,77 @@ Incluye reportes detallados de rendimiento y gestión de posiciones.
 
 import os
 import json
-import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
 import time
 
+from price_service import PriceService
+from trade_stats import TradeStatsIndex
+
 load_dotenv()
 
 
+class BinanceTickerClient:
+    """Cliente mínimo de precios de Binance (REST) sobre una sesión HTTP reutilizable"""
+    
+    API_URL = 'https://api.binance.com/api/v3/ticker/price'
+    
+    def __init__(self, session):
+        self.session = session
+        self.invalid_symbols = set()  # Rechazados por Binance (no se vuelven a pedir)
+    
+    @staticmethod
+    def _rejected(response):
+        """Petición rechazada por los parámetros (4xx que no es límite de peticiones)"""
+        return 400 <= response.status_code < 500 and response.status_code not in (418, 429)
+    
+    def fetch_tickers(self, symbols):
+        """
+        Precios de varios símbolos en una sola petición (formato ccxt: {symbol: {'last': precio}})
+        
+        Binance rechaza la petición entera (HTTP 400) si algún símbolo no
+        existe: entonces se pide cada uno por separado y se devuelven los
+        precios de los válidos.
+        """
+        market_ids = {symbol.replace('/', ''): symbol for symbol in symbols
+                      if symbol not in self.invalid_symbols}
+        if not market_ids:
+            return {}
+        response = self.session.get(
+            self.API_URL,
+            params={'symbols': json.dumps(list(market_ids), separators=(',', ':'))},
+            timeout=5
+        )
+        if self._rejected(response):
+            return self._fetch_each(market_ids)
+        response.raise_for_status()
+        return {
+            market_ids[item['symbol']]: {'last': float(item['price'])}
+            for item in response.json()
+            if item['symbol'] in market_ids
+        }
+    
+    def _fetch_each(self, market_ids):
+        """Precios símbolo a símbolo, descartando (y recordando) los que Binance rechaza"""
+        tickers = {}
+        for market_id, symbol in market_ids.items():
+            response = self.session.get(self.API_URL, params={'symbol': market_id}, timeout=5)
+            if self._rejected(response):
+                print(f"⚠️ Binance rechaza {symbol} ({response.status_code}): {response.text[:200]}")
+                self.invalid_symbols.add(symbol)
+                continue
+            response.raise_for_status()
+            tickers[symbol] = {'last': float(response.json()['price'])}
+        return tickers
+
+
 class TelegramBotHandler:
     """Manejador de comandos interactivos de Telegram"""
     
+    PRICE_TTL = 10  # Segundos de validez de los precios entre comandos
+    
     def __init__(self):
         """Inicializa el bot de comandos"""
         self.token = os.getenv('TELEGRAM_BOT_TOKEN')
@@ -31,6 +90,17 @@ class TelegramBotHandler:
         self.api_url = f"https://api.telegram.org/bot{self.token}"
         self.last_update_id = 0
         
+        # Sesión HTTP con pool de conexiones (Telegram + Binance)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        
+        # Precios compartidos entre comandos (una petición bulk, TTL corto)
+        self.prices = PriceService(BinanceTickerClient(self.session), [], ttl=self.PRICE_TTL)
+        
+        # Estadísticas incrementales del historial de trades (por fichero)
+        self.trade_stats = {}
+        
         print("🤖 Bot de Telegram Interactivo iniciado")
         print(f"✅ Usuarios autorizados: {len(self.authorized_users)}")
     
@@ -62,7 +132,7 @@ class TelegramBotHandler:
             if reply_markup:
                 payload['reply_markup'] = reply_markup
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/sendMessage",
                 json=payload,
                 timeout=10
@@ -124,41 +194,17 @@ class TelegramBotHandler:
             print(f"❌ Error leyendo estado de {bot_name}: {e}")
             return None
     
-    def get_trades_df(self, bot_name='neural'):
-        """Lee el DataFrame de trades de un bot"""
-        try:
-            # Actualizado para usar el ID 'MULTI' por defecto
-            file_map = {
-                'neural': 'trades_neural_MULTI.csv'
-            }
-            
-            filename = file_map.get(bot_name, 'trades_neural_MULTI.csv')
-            
-            if not os.path.exists(filename):
-                return None
-            
-            df = pd.read_csv(filename)
-            # Intentar parsear timestamp con manejo de errores
-            try:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-            except:
-                pass
-            return df
-        except Exception as e:
-            print(f"❌ Error leyendo historial de {bot_name}: {e}")
-            return None
-    
     def get_current_price(self, symbol):
-        """Obtiene el precio actual de un símbolo desde Binance"""
-        try:
-            url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol.replace('/', '')}"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return float(data['price'])
-        except Exception as e:
-            print(f"❌ Error obteniendo precio de {symbol}: {e}")
-        return None
+        """Obtiene el precio actual de un símbolo desde Binance (caché con TTL)"""
+        return self.prices.get_price(symbol)
+    
+    def get_open_position_prices(self, bot_state):
+        """Precios de todos los símbolos con posición abierta en una sola petición"""
+        positions = (bot_state or {}).get('positions', {})
+        open_symbols = [symbol for symbol, position in positions.items() if position]
+        if not open_symbols:
+            return {}
+        return self.prices.get_prices(open_symbols)
     
     def calculate_total_equity(self, bot_state):
         """Calcula el equity total de un bot"""
@@ -170,10 +216,11 @@ class TelegramBotHandler:
         
         positions_value = 0
         positions = bot_state.get('positions', {})
+        prices = self.get_open_position_prices(bot_state)
         
         for symbol, position in positions.items():
             if position:
-                current_price = self.get_current_price(symbol)
+                current_price = prices.get(symbol)
                 if current_price:
                     qty = position.get('size', position.get('qty', 0))
                     if qty > 0:
@@ -225,7 +272,16 @@ class TelegramBotHandler:
                 
                 text += f"<b>{label}</b>: ✅ Activo\n"
                 text += f"  💰 Equity: ${equity:.2f}\n"
-                text += f"  📅 Update: {last_update}\n\n"
+                text += f"  📅 Update: {last_update}\n"
+                
+                # Últimas señales calculadas por el bot (sin lanzar inferencia)
+                for symbol, sig in state.get('signals', {}).items():
+                    sym_clean = symbol.replace('/USDT', '')
+                    if sig.get('error'):
+                        text += f"  ⚪ {sym_clean}: {sig.get('signal', 'HOLD')} ({sig['error']})\n"
+                    else:
+                        text += f"  🔹 {sym_clean}: {sig.get('signal')} ({sig.get('confidence', 0):.2f})\n"
+                text += "\n"
             else:
                 text += f"<b>{label}</b>: ❌ Inactivo/Sin datos\n\n"
         
@@ -246,6 +302,7 @@ class TelegramBotHandler:
                 continue
                 
             positions = state.get('positions', {})
+            prices = self.get_open_position_prices(state)
             bot_has_pos = False
             
             bot_text = f"\n<b>{label}:</b>\n"
@@ -259,7 +316,7 @@ class TelegramBotHandler:
                     entry_price = pos.get('entry_price', 0)
                     qty = pos.get('size', pos.get('qty', 0))
                     
-                    current_price = self.get_current_price(symbol)
+                    current_price = prices.get(symbol)
                     
                     sym_clean = symbol.replace('/USDT', '')
                     text_pos = f"  🪙 <b>{sym_clean}</b>"
@@ -288,41 +345,52 @@ class TelegramBotHandler:
         text = "📊 <b>REPORTES Y GANANCIAS</b>\n\nSelecciona el bot para ver su historial detallado y beneficios:"
         self.send_message(chat_id, text, self.get_reports_keyboard())
 
+    def get_trade_stats(self, bot_name='neural'):
+        """Índice incremental de estadísticas de trades de un bot (actualizado)"""
+        # Actualizado para usar el ID 'MULTI' por defecto
+        file_map = {
+            'neural': 'trades_neural_MULTI.csv'
+        }
+        filename = file_map.get(bot_name, 'trades_neural_MULTI.csv')
+        
+        if filename not in self.trade_stats:
+            self.trade_stats[filename] = TradeStatsIndex(filename)
+        index = self.trade_stats[filename]
+        
+        try:
+            index.update()
+        except Exception as e:
+            print(f"❌ Error leyendo historial de {bot_name}: {e}")
+            return None
+        return index
+    
     def generate_bot_report(self, bot_name):
-        """Genera reporte detallado para un bot"""
-        df = self.get_trades_df(bot_name)
+        """Genera reporte detallado para un bot
+        
+        Usa los acumulados incrementales de TradeStatsIndex: solo se leen las
+        operaciones nuevas desde el último reporte.
+        """
+        index = self.get_trade_stats(bot_name)
         
         label_map = {'neural': '🧠 Neural Bot'}
         label = label_map.get(bot_name, bot_name.upper())
         
-        if df is None or df.empty:
+        if index is None or index.rows == 0:
             return f"<b>{label}</b>\n\n❌ No hay historial de operaciones registrado."
         
-        # Normalizar columnas
-        # ADX/EMA usan 'pnl', Neural usa 'pnl' (pero a veces 'profit' en backtest, aquí es prod)
-        # Neural usa 'type'='SELL' para cierres. ADX 'type'='sell'. EMA 'side'='sell'.
-        
-        # Filtrar solo ventas/cierres (donde se realiza el PnL)
-        if 'side' in df.columns: # EMA
-            closed_trades = df[df['side'] == 'sell']
-        elif 'type' in df.columns: # ADX y Neural
-            closed_trades = df[df['type'].str.upper() == 'SELL']
-        else:
-            closed_trades = pd.DataFrame()
-            
-        if closed_trades.empty:
+        totals = index.totals
+        if totals['trades'] == 0:
             return f"<b>{label}</b>\n\nℹ️ Se han registrado entradas pero ninguna operación cerrada aún."
             
         # Estadísticas Generales
-        total_pnl = closed_trades['pnl'].sum()
+        total_pnl = totals['pnl']
         
-        # Calcular Gross y Fees si existen
-        total_fees = closed_trades['fees'].sum() if 'fees' in closed_trades.columns else 0.0
-        total_gross = closed_trades['gross_pnl'].sum() if 'gross_pnl' in closed_trades.columns else total_pnl
+        # Gross y Fees si existen
+        total_fees = totals['fees'] if totals['has_fees'] else 0.0
+        total_gross = totals['gross_pnl'] if totals['has_gross'] else total_pnl
         
-        total_trades = len(closed_trades)
-        wins = len(closed_trades[closed_trades['pnl'] > 0])
-        win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
+        total_trades = totals['trades']
+        win_rate = index.win_rate(totals)
         
         text = f"<b>{label} - REPORTE DE RENDIMIENTO</b>\n"
         text += f"━━━━━━━━━━━━━━━━\n"
@@ -333,18 +401,16 @@ class TelegramBotHandler:
         else:
              text += f"💰 <b>Beneficio Total: ${total_pnl:+.2f}</b>\n"
         text += f"🔢 Operaciones: {total_trades}\n"
-        text += f"🎯 Win Rate: {win_rate:.1f}%\n\n"
+        text += f"🎯 Win Rate: {win_rate:.1f}%\n"
+        text += f"🔥 Rachas: máx. {totals['best_win_streak']} ganadas / {totals['worst_loss_streak']} perdidas\n\n"
         
         text += f"<b>📊 DESGLOSE POR PAR:</b>\n"
         
-        # Agrupar por símbolo
-        grouped = closed_trades.groupby('symbol')
-        
-        for symbol, group in grouped:
-            sym_pnl = group['pnl'].sum()
-            sym_trades = len(group)
-            sym_wins = len(group[group['pnl'] > 0])
-            sym_wr = (sym_wins / sym_trades * 100) if sym_trades > 0 else 0
+        for symbol in sorted(index.symbols):
+            stats = index.symbols[symbol]
+            sym_pnl = stats['pnl']
+            sym_trades = stats['trades']
+            sym_wr = index.win_rate(stats)
             
             sym_clean = symbol.replace('/USDT', '')
             emoji = '🟢' if sym_pnl >= 0 else '🔴'
@@ -353,9 +419,7 @@ class TelegramBotHandler:
             text += f"   └ Trades: {sym_trades} (WR: {sym_wr:.0f}%)\n"
             
             # Última operación del par
-            last_trade = group.iloc[-1]
-            last_date = last_trade['timestamp'].strftime('%d/%m')
-            text += f"   └ Última: {last_date} (${last_trade['pnl']:+.2f})\n"
+            text += f"   └ Última: {index.last_date(stats)} (${stats['last_pnl']:+.2f})\n"
 
         return text
 
@@ -386,7 +450,7 @@ class TelegramBotHandler:
         
         # Responder al callback
         try:
-            requests.post(
+            self.session.post(
                 f"{self.api_url}/answerCallbackQuery",
                 json={'callback_query_id': callback_query['id']},
                 timeout=5
@@ -421,7 +485,7 @@ class TelegramBotHandler:
     def get_updates(self):
         """Obtiene actualizaciones pendientes"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.api_url}/getUpdates",
                 params={'offset': self.last_update_id + 1, 'timeout': 30},
                 timeout=35
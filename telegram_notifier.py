@@ -1,4 +1,8 @@
 import os
+import atexit
+import queue
+import threading
+import time
 import requests
 from datetime import datetime
 
@@ -6,18 +10,49 @@ class TelegramNotifier:
     """
     Gestor de notificaciones de Telegram para el bot de trading.
     Usa la API de Telegram directamente (sin librerías externas pesadas).
+    
+    Por defecto los mensajes se encolan (cola acotada en memoria) y un hilo
+    en segundo plano los envía con reintentos y backoff, agrupando ráfagas
+    en un solo mensaje; así el bucle de trading no espera a la API.
+    
+    Si la cola se llena se descarta (y se avisa por consola) el mensaje de
+    estado más antiguo, sin bloquear al que envía. Los avisos prioritarios
+    (compras, ventas, errores y alertas de riesgo) solo se descartan si la
+    cola está llena únicamente de avisos prioritarios.
     """
     
-    def __init__(self):
-        """Inicializa el notificador de Telegram"""
+    MAX_MESSAGE_LENGTH = 4096     # Límite de Telegram por mensaje
+    COALESCE_SEPARATOR = "\n\n━━━━━━━━━━━━━━━━━━━━\n\n"
+    
+    def __init__(self, async_send=True, max_queue=100, max_retries=5, coalesce_window=1.0):
+        """
+        Inicializa el notificador de Telegram
+        
+        Args:
+            async_send: Encolar y enviar en segundo plano (False = envío síncrono)
+            max_queue: Máximo de mensajes pendientes (se descarta el más antiguo
+                de estado, ver priority)
+            max_retries: Reintentos por mensaje ante errores de red / 429 / 5xx
+            coalesce_window: Segundos que se espera para agrupar una ráfaga
+        """
         self.token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
         self.enabled = bool(self.token and self.chat_id)
         
+        self.async_send = async_send
+        self.max_retries = max_retries
+        self.coalesce_window = coalesce_window
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        
         if self.enabled:
             self.api_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+            if self.async_send:
+                atexit.register(self.flush)  # No perder avisos al salir
     
-    def send_message(self, text, silent=False, buttons=None):
+    def send_message(self, text, silent=False, buttons=None, priority=False):
         """
         Envía un mensaje a Telegram.
         
@@ -25,13 +60,177 @@ class TelegramNotifier:
             text: Texto del mensaje (soporta HTML)
             silent: Si es True, la notificación es silenciosa
             buttons: Lista de botones inline [[{'text': 'Label', 'url': 'URL'}]]
+            priority: Aviso de trading (compra/venta, error, riesgo): con la
+                cola llena desplaza a los mensajes de estado
         
         Returns:
-            bool: True si se envió correctamente
+            bool: True si se envió (o encoló) correctamente
         """
         if not self.enabled:
             return False
+        
+        if not self.async_send:
+            return self._post(text, silent, buttons)
+        
+        self._ensure_worker()
+        message = (text, silent, buttons, priority)
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return True
+            except queue.Full:
+                if not self._discard_oldest(priority):
+                    self.dropped += 1
+                    print(f"⚠️ Cola de Telegram llena de avisos prioritarios: descartado mensaje de estado "
+                          f"({self.dropped} en total)")
+                    return False
+    
+    def _discard_oldest(self, priority):
+        """
+        Hace sitio en la cola llena descartando el mensaje de estado más antiguo
+        
+        Args:
+            priority: El mensaje que se quiere encolar es prioritario (si no
+                hay mensajes de estado se descarta el aviso más antiguo)
+        
+        Returns:
+            bool: False si no se descartó nada (solo hay avisos prioritarios
+            y el nuevo mensaje es de estado)
+        """
+        with self._queue.mutex:
+            pending = self._queue.queue
+            queued = [i for i, item in enumerate(pending) if item is not None]
+            status = [i for i in queued if not pending[i][3]]
+            if not queued:
+                return True
+            if not status and not priority:
+                return False
+            index = (status or queued)[0]
+            dropped = pending[index]
+            del pending[index]
+            self._queue.not_full.notify()
+        self._queue.task_done()
+        
+        self.dropped += 1
+        kind = 'aviso prioritario' if dropped[3] else 'mensaje de estado'
+        preview = dropped[0][:60].replace('\n', ' ')
+        print(f"⚠️ Cola de Telegram llena: descartado {kind} \"{preview}\" ({self.dropped} en total)")
+        return True
+    
+    def flush(self, timeout=15.0):
+        """
+        Espera a que se envíen los mensajes pendientes
+        
+        Returns:
+            bool: True si la cola quedó vacía dentro del timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks > 0:
+            if time.monotonic() >= deadline or self._worker is None or not self._worker.is_alive():
+                return False
+            time.sleep(0.05)
+        return True
+    
+    def close(self, timeout=15.0):
+        """Envía lo pendiente y detiene el hilo de envío"""
+        flushed = self.flush(timeout)
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            worker.join(timeout=1.0)
+        self._worker = None
+        return flushed
+    
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, name='telegram-notifier', daemon=True)
+                self._worker.start()
+    
+    def _run_worker(self):
+        """Consume la cola: agrupa ráfagas y envía con reintentos"""
+        while True:
+            message = self._queue.get()
+            if message is None:
+                self._queue.task_done()
+                return
+            
+            batch = [message]
+            pending_stop = False
+            deadline = time.monotonic() + self.coalesce_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    extra = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if extra is None:
+                    pending_stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(extra)
             
+            for text, silent, buttons in self._coalesce(batch):
+                self._post_with_retry(text, silent, buttons)
+            for _ in batch:
+                self._queue.task_done()
+            if pending_stop:
+                return
+    
+    def _coalesce(self, batch):
+        """Une mensajes consecutivos con mismos botones/silencio sin pasar el límite"""
+        merged = []
+        for text, silent, buttons, _ in batch:
+            if merged:
+                last_text, last_silent, last_buttons = merged[-1]
+                joined = last_text + self.COALESCE_SEPARATOR + text
+                if (last_silent == silent and last_buttons == buttons
+                        and len(joined) <= self.MAX_MESSAGE_LENGTH):
+                    merged[-1] = (joined, silent, buttons)
+                    continue
+            merged.append((text, silent, buttons))
+        return merged
+    
+    def _post_with_retry(self, text, silent=False, buttons=None):
+        """Envía con backoff exponencial (respeta retry_after en 429)"""
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            result = self._post(text, silent, buttons, return_response=True)
+            if result is True:
+                return True
+            
+            retry_after = None
+            if result is not None:
+                if result.status_code == 429:
+                    try:
+                        retry_after = result.json().get('parameters', {}).get('retry_after')
+                    except ValueError:
+                        pass
+                elif result.status_code < 500:
+                    # Error del mensaje (400, 403...): reintentar no sirve
+                    print(f"⚠️ Telegram rechazó el mensaje ({result.status_code}): {result.text[:200]}")
+                    return False
+            
+            if attempt < self.max_retries:
+                time.sleep(retry_after if retry_after else delay)
+                delay = min(delay * 2, 30.0)
+        
+        print(f"⚠️ Mensaje de Telegram descartado tras {self.max_retries} reintentos")
+        return False
+    
+    def _post(self, text, silent=False, buttons=None, return_response=False):
+        """
+        POST síncrono a la API de Telegram
+        
+        Returns:
+            bool, o con return_response=True: True si OK, la respuesta si falló
+            por HTTP, None si hubo error de red
+        """
         try:
             payload = {
                 'chat_id': self.chat_id,
@@ -49,10 +248,12 @@ class TelegramNotifier:
                 json=payload,
                 timeout=10
             )
-            return response.status_code == 200
+            if response.status_code == 200:
+                return True
+            return response if return_response else False
         except Exception as e:
             print(f"⚠️ Error enviando mensaje a Telegram: {e}")
-            return False
+            return None if return_response else False
     
     def notify_startup(self, mode, symbols, capital, strategy_name='ADX'):
         """Notificación de inicio del bot."""
@@ -157,7 +358,7 @@ class TelegramNotifier:
             {'text': '📈 TradingView', 'url': tradingview_url}
         ]]
         
-        self.send_message(text, buttons=buttons)
+        self.send_message(text, buttons=buttons, priority=True)
     
     def notify_sell(self, symbol, price, qty, reason, net_pnl, roi, gross_pnl=None, fees=None, entry_price=None, duration=None, strategy_name=''):
         """
@@ -257,7 +458,7 @@ class TelegramNotifier:
             {'text': '📋 Ver Historial', 'url': f'{dashboard_url}#trades'}
         ]]
         
-        self.send_message(text, buttons=buttons)
+        self.send_message(text, buttons=buttons, priority=True)
     
     def notify_cycle_complete(self, total_equity, initial_capital, roi, positions_count):
         """
@@ -298,7 +499,7 @@ class TelegramNotifier:
 
 ⚠️ Revisa los logs del bot"""
         
-        self.send_message(text)
+        self.send_message(text, priority=True)
     
     def notify_update(self, old_version, new_version):
         """
@@ -382,7 +583,7 @@ class TelegramNotifier:
             {'text': '📊 Ver Dashboard', 'url': dashboard_url}
         ]]
         
-        self.send_message(text, buttons=buttons)
+        self.send_message(text, buttons=buttons, priority=True)
     
     def notify_strong_signal(self, symbol, adx, price, reason=''):
         """
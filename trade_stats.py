@@ -0,0 +1,233 @@
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+class TradeStatsIndex:
+    """
+    Estadísticas incrementales del historial de trades (CSV append-only).
+
+    En cada update() solo se leen los bytes añadidos desde el último offset y
+    se actualizan los acumulados totales y por símbolo (PnL, fees, win rate,
+    rachas). El offset y los acumulados se guardan en un checkpoint JSON, así
+    que el coste de un reporte no crece con los años de historial.
+
+    El checkpoint guarda también el inode del fichero y un hash de los
+    últimos bytes antes del offset: si el log se rotó o se reemplazó por
+    otro (aunque sea más largo y con la misma cabecera) se reconstruye.
+    """
+
+    CHECKPOINT_VERSION = 2
+    PREFIX_HASH_BYTES = 4096  # Bytes antes del offset que se comprueban
+
+    # Orden de columnas que escribe NeuralBot.log_trade (por si la cabecera
+    # del CSV es de una versión anterior con menos columnas)
+    LOG_COLUMNS = [
+        'timestamp', 'symbol', 'type', 'reason', 'entry_price', 'exit_price', 'qty',
+        'pnl', 'gross_pnl', 'fees', 'net_pnl', 'pnl_percent', 'duration'
+    ]
+
+    def __init__(self, trades_file, checkpoint_file=None):
+        """
+        Args:
+            trades_file: CSV de trades (ej: trades_neural_MULTI.csv)
+            checkpoint_file: JSON del checkpoint (default: <trades>.stats.json)
+        """
+        self.trades_file = Path(trades_file)
+        self.checkpoint_file = Path(checkpoint_file) if checkpoint_file else \
+            self.trades_file.with_suffix('.stats.json')
+        self._reset()
+        self._load_checkpoint()
+
+    def _reset(self):
+        self.offset = 0
+        self.header = None
+        self.inode = None
+        self.prefix_hash = None
+        self.rows = 0
+        self.totals = self._empty_bucket()
+        self.symbols = {}
+
+    @staticmethod
+    def _empty_bucket():
+        return {
+            'trades': 0,
+            'wins': 0,
+            'pnl': 0.0,
+            'gross_pnl': 0.0,
+            'fees': 0.0,
+            'has_gross': False,
+            'has_fees': False,
+            'streak': 0,            # >0 racha de ganancias, <0 de pérdidas
+            'best_win_streak': 0,
+            'worst_loss_streak': 0,
+            'last_timestamp': None,
+            'last_pnl': None,
+        }
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_file.exists():
+            return
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != self.CHECKPOINT_VERSION:
+                return
+            self.offset = data['offset']
+            self.header = data['header']
+            self.inode = data['inode']
+            self.prefix_hash = data['prefix_hash']
+            self.rows = data['rows']
+            self.totals = data['totals']
+            self.symbols = data['symbols']
+        except Exception as e:
+            print(f"⚠️ Checkpoint de trades inválido ({e}), se reconstruye")
+            self._reset()
+
+    def _save_checkpoint(self):
+        data = {
+            'version': self.CHECKPOINT_VERSION,
+            'offset': self.offset,
+            'header': self.header,
+            'inode': self.inode,
+            'prefix_hash': self.prefix_hash,
+            'rows': self.rows,
+            'totals': self.totals,
+            'symbols': self.symbols,
+        }
+        tmp_file = self.checkpoint_file.with_name(self.checkpoint_file.name + '.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def update(self):
+        """
+        Procesa las líneas nuevas del CSV desde el último offset
+
+        Si el fichero se truncó, se reemplazó (otro inode o bytes distintos
+        antes del offset) o cambió su cabecera, se reconstruye desde el principio.
+
+        Returns:
+            int: Nº de filas nuevas procesadas
+        """
+        if not self.trades_file.exists():
+            if self.offset:
+                self._reset()
+            return 0
+
+        with open(self.trades_file, 'rb') as f:
+            first_line = f.readline()
+            header = next(csv.reader([first_line.decode('utf-8')]), None) if first_line else None
+            stat = os.fstat(f.fileno())
+
+            if (stat.st_size < self.offset or (self.header is not None and header != self.header)
+                    or not self._same_file(f, stat)):
+                self._reset()
+
+            if self.offset == 0:
+                if not first_line.endswith(b'\n'):
+                    return 0  # Cabecera aún incompleta
+                self.header = header
+                self.offset = len(first_line)
+                self.inode = stat.st_ino
+                self.prefix_hash = self._prefix_hash(f, self.offset)
+
+            f.seek(self.offset)
+            data = f.read()
+
+            # Solo líneas completas: una escritura a medias se procesa la próxima vez
+            end = data.rfind(b'\n') + 1
+            if end == 0:
+                return 0
+            self.prefix_hash = self._prefix_hash(f, self.offset + end)
+
+        new_rows = 0
+        for fields in csv.reader(data[:end].decode('utf-8').splitlines()):
+            if not fields:
+                continue
+            self._add_row(self._to_record(fields))
+            new_rows += 1
+
+        self.offset += end
+        self.rows += new_rows
+        self._save_checkpoint()
+        return new_rows
+
+    def _same_file(self, f, stat):
+        """True si los bytes ya procesados son los del checkpoint"""
+        if self.offset == 0:
+            return True
+        return stat.st_ino == self.inode and self._prefix_hash(f, self.offset) == self.prefix_hash
+
+    def _prefix_hash(self, f, offset):
+        """Hash de los PREFIX_HASH_BYTES bytes anteriores a offset"""
+        start = max(0, offset - self.PREFIX_HASH_BYTES)
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+    def _to_record(self, fields):
+        if len(fields) == len(self.header):
+            return dict(zip(self.header, fields))
+        if len(fields) == len(self.LOG_COLUMNS):
+            return dict(zip(self.LOG_COLUMNS, fields))
+        return dict(zip(self.header, fields))
+
+    def _add_row(self, record):
+        # Solo ventas/cierres (donde se realiza el PnL)
+        if 'side' in record:  # EMA
+            if record['side'] != 'sell':
+                return
+        elif str(record.get('type', '')).upper() != 'SELL':  # ADX y Neural
+            return
+
+        pnl = self._to_float(record.get('pnl'))
+        gross = self._to_float(record.get('gross_pnl'), None)
+        fees = self._to_float(record.get('fees'), None)
+
+        symbol = record.get('symbol', '')
+        if symbol not in self.symbols:
+            self.symbols[symbol] = self._empty_bucket()
+
+        for bucket in (self.totals, self.symbols[symbol]):
+            bucket['trades'] += 1
+            bucket['pnl'] += pnl
+            if gross is not None:
+                bucket['gross_pnl'] += gross
+                bucket['has_gross'] = True
+            if fees is not None:
+                bucket['fees'] += fees
+                bucket['has_fees'] = True
+
+            if pnl > 0:
+                bucket['wins'] += 1
+                bucket['streak'] = bucket['streak'] + 1 if bucket['streak'] > 0 else 1
+                bucket['best_win_streak'] = max(bucket['best_win_streak'], bucket['streak'])
+            else:
+                bucket['streak'] = bucket['streak'] - 1 if bucket['streak'] < 0 else -1
+                bucket['worst_loss_streak'] = max(bucket['worst_loss_streak'], -bucket['streak'])
+
+            bucket['last_timestamp'] = record.get('timestamp')
+            bucket['last_pnl'] = pnl
+
+    @staticmethod
+    def _to_float(value, default=0.0):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return default
+        return value if value == value else default  # NaN -> default
+
+    @staticmethod
+    def win_rate(bucket):
+        return (bucket['wins'] / bucket['trades'] * 100) if bucket['trades'] > 0 else 0
+
+    @staticmethod
+    def last_date(bucket, fmt='%d/%m'):
+        """Fecha de la última operación formateada (o el texto original)"""
+        try:
+            return datetime.fromisoformat(bucket['last_timestamp']).strftime(fmt)
+        except (TypeError, ValueError):
+            return str(bucket['last_timestamp'])